@@ -1,43 +1,172 @@
 import math
+import os
 import random
 import string
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ngramas import (
+    QuadgramCountObjective,
+    QuadgramTable,
+    QuadgramWindowBuffer,
+    SCORE_MANY_ELEMENTS,
+    as_messages,
+    count_quadgrams,
+    encode_letters,
+    load_quadgram_table,
+)
+from recozimento import AnnealingSchedule
+from retomada import Checkpoint, problem_signature, restore_rng, rng_state
+from telemetria import ProgressPrinter, Telemetry, TraceRecorder, timed
+from vizinhanca import anneal, hill_climb
 
 ALPHABET = string.ascii_uppercase
 
+# trocas aleatórias usadas para calibrar a temperatura inicial do recozimento
+CALIBRATION_SAMPLES = 200
+# aceitação inicial quando a busca parte de uma chave conhecida (initial_key):
+# fria o bastante para não se afastar dela
+WARM_START_ACCEPTANCE = 0.0001
+# acima disso o recozimento redecifra o texto inteiro por iteração (numpy)
+# em vez de reavaliar só as janelas afetadas pela troca
+INCREMENTAL_MAX_LETTERS = 200
+
+ENGLISH_LETTER_FREQUENCIES = {
+    'A': 0.08167,
+    'B': 0.01492,
+    'C': 0.02782,
+    'D': 0.04253,
+    'E': 0.12702,
+    'F': 0.02228,
+    'G': 0.02015,
+    'H': 0.06094,
+    'I': 0.06966,
+    'J': 0.00153,
+    'K': 0.00772,
+    'L': 0.04025,
+    'M': 0.02406,
+    'N': 0.06749,
+    'O': 0.07507,
+    'P': 0.01929,
+    'Q': 0.00095,
+    'R': 0.05987,
+    'S': 0.06327,
+    'T': 0.09056,
+    'U': 0.02758,
+    'V': 0.00978,
+    'W': 0.02360,
+    'X': 0.00150,
+    'Y': 0.01974,
+    'Z': 0.00074,
+}
+
+# Chave de substituição compilada para os laços de busca: a permutação (letra
+# cifrada -> letra clara) fica num bytearray trocado e desfeito no lugar, com
+# uma visão numpy do mesmo buffer para decifrar textos já codificados sem
+# alocar (np.take com `out`). A tabela de str.translate, que decifra o texto
+# completo preservando caixa e pontuação, só é montada quando pedida e vale
+# até a próxima troca.
+class CompiledKey:
+    __slots__ = ("codes", "array", "_last_i", "_last_j", "_table")
+
+    def __init__(self, key: Sequence[str]):
+        self.codes = bytearray(ord(ch) - ord('A') for ch in key)
+        self.array = np.frombuffer(self.codes, dtype=np.uint8)
+        self._last_i = self._last_j = 0
+        self._table: Optional[dict] = None
+
+    def copy(self) -> "CompiledKey":
+        return CompiledKey(self.key())
+
+    def assign(self, other: "CompiledKey"):
+        self.codes[:] = other.codes
+        self._table = None
+
+    def swap(self, i: int, j: int):
+        codes = self.codes
+        codes[i], codes[j] = codes[j], codes[i]
+        self._last_i, self._last_j = i, j
+        self._table = None
+
+    def undo(self):
+        # desfaz a última troca
+        self.swap(self._last_i, self._last_j)
+
+    def key(self) -> List[str]:
+        return [ALPHABET[c] for c in self.codes]
+
+    def text(self) -> str:
+        return bytes(c + ord('A') for c in self.codes).decode("ascii")
+
+    def translation_table(self) -> dict:
+        if self._table is None:
+            plain = self.text()
+            self._table = str.maketrans(ALPHABET + ALPHABET.lower(), plain + plain.lower())
+        return self._table
+
+    def decrypt(self, ciphertext: str) -> str:
+        return ciphertext.translate(self.translation_table())
+
+    def decrypt_codes(self, letters: np.ndarray, out: np.ndarray) -> np.ndarray:
+        # `letters`: códigos 0-25 do texto cifrado (encode_letters); `out`: buffer uint8 do mesmo tamanho
+        return np.take(self.array, letters, out=out)
+
+
+def random_pair(rng: random.Random) -> Tuple[int, int]:
+    # duas posições distintas da chave, sem montar a lista de rng.sample
+    i = rng.randrange(26)
+    j = rng.randrange(25)
+    return i, j + (j >= i)
+
+
+def substitution_key_scorer(table, messages: List[np.ndarray]) -> Callable[[np.ndarray], np.ndarray]:
+    # score de uma matriz de chaves (n_chaves, 26), somado entre as mensagens
+    # (letras já codificadas): cada linha decifra o texto por indexação,
+    # chaves[:, letras], em blocos de até SCORE_MANY_ELEMENTS códigos. Mesma
+    # interface de artefato2.transposition_key_scorer (ver vizinhanca.py)
+    messages = [letters for letters in messages if len(letters)]
+
+    def score_keys(keys: np.ndarray) -> np.ndarray:
+        scores = np.zeros(len(keys), dtype=np.float64)
+        for letters in messages:
+            rows = max(1, SCORE_MANY_ELEMENTS // len(letters))
+            for start in range(0, len(keys), rows):
+                scores[start:start + rows] += table.score_batch(keys[start:start + rows, letters])
+        return scores
+
+    return score_keys
+
+
 class SubstitutionCipher:
     def __init__(self, key: List[str]):
         if len(key) != 26 or sorted(key) != list(ALPHABET):
             raise ValueError("Key deve ser uma permutação de A-Z.")
         self.key = key
-        self._mapping = {chr(ord('A') + i): self.key[i] for i in range(26)}
+        self._compiled = CompiledKey(key)
 
     @staticmethod
-    def random_key() -> List[str]:
+    def random_key(rng: Optional[random.Random] = None) -> List[str]:
         key = list(ALPHABET)
-        random.shuffle(key)
+        (rng or random).shuffle(key)
         return key
 
     @staticmethod
-    def neighbour_key(key: List[str]) -> List[str]:
+    def neighbour_key(key: List[str], rng: Optional[random.Random] = None) -> List[str]:
         new_key = key[:]
-        i, j = random.sample(range(26), 2)
+        i, j = (rng or random).sample(range(26), 2)
         new_key[i], new_key[j] = new_key[j], new_key[i]
         return new_key
 
     def decrypt(self, ciphertext: str) -> str:
-        self._mapping = {chr(ord('A') + i): self.key[i] for i in range(26)}
-        mapping = self._mapping
-
-        out_chars = []
-        for ch in ciphertext:
-            cu = ch.upper()
-            if 'A' <= cu <= 'Z':
-                plain_char = mapping[cu]
-                out_chars.append(plain_char if ch.isupper() else plain_char.lower())
-            else:
-                out_chars.append(ch)
-        return "".join(out_chars)
+        return self._compiled.decrypt(ciphertext)
+
+    def encrypt(self, plaintext: str) -> str:
+        # inverso de decrypt: a letra clara key[i] vira a letra cifrada i
+        plain = "".join(self.key)
+        table = str.maketrans(plain + plain.lower(), ALPHABET + ALPHABET.lower())
+        return plaintext.translate(table)
 
     @staticmethod
     def pretty_print_key(key: List[str]) -> str:
@@ -47,106 +176,100 @@ class SubstitutionCipher:
 
 class EnglishScorer:
 
-    def __init__(self, quadgram_file: Optional[str] = None):
-        self.using_quadgrams = False
-        self.quadgram_scores: Dict[str, float] = {}
-        self.quadgram_floor: float = 0.0
+    def __init__(
+        self,
+        quadgram_file: Optional[str] = None,
+        verbose: bool = True,
+        table: Optional[QuadgramTable] = None,
+        model=None,
+    ):
+        # `table`: quadgramas já carregados (ex.: de outro idioma, via
+        # modelos.ModelRegistry); `model`: qualquer objeto com score_codes
+        # (ex.: modelos.MixedModel) usado em score() no lugar dos quadgramas.
+        # A busca incremental e a subida de encosta usam sempre os quadgramas.
+        # O arquivo de quadgramas só é lido no primeiro uso do scorer.
+        self.verbose = verbose
+        self.model = model
 
         self.letter_log_probs: Dict[str, float] = {}
         self.letter_floor: float = 0.0
+        # log-probabilidade por código de letra, para pontuar textos já codificados
+        self._letter_array = np.zeros(len(ALPHABET), dtype=np.float64)
+
+        self._quadgram_file = quadgram_file
+        self._quadgrams: Optional[QuadgramTable] = table
+        self._using_quadgrams = table is not None
+        self._loaded = table is not None or quadgram_file is None
+        if table is None and quadgram_file is None:
+            self._setup_letter_model()
 
-        if quadgram_file is not None:
-            try:
-                self._load_quadgrams(quadgram_file)
-                self.using_quadgrams = True
-                print(f"[INFO] Quadgramas carregados de: {quadgram_file}")
-            except Exception as e:
-                print(f"[WARN] Falha ao carregar quadgramas ({e}).")
-                print("[INFO] Usando fallback de frequência de letras.")
-                self._setup_letter_model()
-        else:
+    @property
+    def quadgrams(self) -> Optional[QuadgramTable]:
+        self._ensure_loaded()
+        return self._quadgrams
+
+    @property
+    def using_quadgrams(self) -> bool:
+        self._ensure_loaded()
+        return self._using_quadgrams
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            self._load_quadgrams(self._quadgram_file)
+            self._using_quadgrams = True
+            if self.verbose:
+                print(f"[INFO] Quadgramas carregados de: {self._quadgram_file}")
+        except Exception as e:
+            print(f"[WARN] Falha ao carregar quadgramas ({e}).")
+            print("[INFO] Usando fallback de frequência de letras.")
             self._setup_letter_model()
 
     def _load_quadgrams(self, filepath: str):
-        counts: Dict[str, int] = {}
-        total = 0
-
-        with open(filepath, "r", encoding="utf-8") as f:
-            for line in f:
-                parts = line.strip().split()
-                if len(parts) != 2:
-                    continue
-                quad, count = parts[0].upper(), int(parts[1])
-                if len(quad) != 4:
-                    continue
-                counts[quad] = count
-                total += count
-
-        if total == 0:
-            raise ValueError("Arquivo de quadgramas vazio ou inválido.")
-
-        self.quadgram_scores = {
-            quad: math.log10(count / total)
-            for quad, count in counts.items()
-        }
-        self.quadgram_floor = math.log10(0.01 / total)
+        self._quadgrams = load_quadgram_table(filepath)
 
     def _setup_letter_model(self):
-        freqs = {
-            'A': 0.08167,
-            'B': 0.01492,
-            'C': 0.02782,
-            'D': 0.04253,
-            'E': 0.12702,
-            'F': 0.02228,
-            'G': 0.02015,
-            'H': 0.06094,
-            'I': 0.06966,
-            'J': 0.00153,
-            'K': 0.00772,
-            'L': 0.04025,
-            'M': 0.02406,
-            'N': 0.06749,
-            'O': 0.07507,
-            'P': 0.01929,
-            'Q': 0.00095,
-            'R': 0.05987,
-            'S': 0.06327,
-            'T': 0.09056,
-            'U': 0.02758,
-            'V': 0.00978,
-            'W': 0.02360,
-            'X': 0.00150,
-            'Y': 0.01974,
-            'Z': 0.00074,
-        }
+        freqs = ENGLISH_LETTER_FREQUENCIES
         total = sum(freqs.values())
         self.letter_log_probs = {
             ch: math.log10(freq / total)
             for ch, freq in freqs.items()
         }
         self.letter_floor = math.log10(0.0001 / total)
-        print("[INFO] Usando modelo de frequência de letras (sem quadgramas).")
+        self._letter_array = np.array(
+            [self.letter_log_probs.get(ch, self.letter_floor) for ch in ALPHABET], dtype=np.float64
+        )
+        if self.verbose:
+            print("[INFO] Usando modelo de frequência de letras (sem quadgramas).")
 
     def score(self, text: str) -> float:
         filtered = "".join(ch for ch in text.upper() if 'A' <= ch <= 'Z')
         if not filtered:
             return -1e9
 
+        if self.model is not None:
+            return self.model.score_codes(encode_letters(filtered))
         if self.using_quadgrams:
             return self._score_quadgrams(filtered)
         else:
             return self._score_letters(filtered)
 
+    def score_codes(self, codes: np.ndarray) -> float:
+        # mesmo resultado de score(), para um texto só de letras já codificado (0-25)
+        if len(codes) == 0:
+            return -1e9
+        if self.model is not None:
+            return self.model.score_codes(codes)
+        if self.using_quadgrams and len(codes) >= 4:
+            return self.quadgrams.score_codes(codes)
+        return float(self._letter_array[codes].sum())
+
     def _score_quadgrams(self, text: str) -> float:
-        score = 0.0
         if len(text) < 4:
             return self._score_letters(text)
-
-        for i in range(len(text) - 3):
-            quad = text[i:i+4]
-            score += self.quadgram_scores.get(quad, self.quadgram_floor)
-        return score
+        return self.quadgrams.score_codes(encode_letters(text))
 
     def _score_letters(self, text: str) -> float:
         score = 0.0
@@ -154,70 +277,521 @@ class EnglishScorer:
             score += self.letter_log_probs.get(ch, self.letter_floor)
         return score
 
+# Mantém o score de quadgramas de uma chave e reavalia só as janelas
+# afetadas por uma troca de duas letras da chave. A troca, o desfazer e as
+# janelas de cada par de letras (calculadas uma vez) não alocam nada por
+# iteração: os scores novos vão para um buffer reaproveitado. Com uma lista de
+# mensagens (mesma chave), as letras são concatenadas e as janelas que cruzam
+# a junção de duas mensagens ficam de fora.
+class IncrementalQuadgramState:
+    def __init__(self, ciphertext: Union[str, Sequence[str]], scorer: EnglishScorer):
+        self.table = scorer.quadgrams.flat
+        self.cipher_letters: List[int] = []
+        self._valid_windows: List[int] = []
+        for message in as_messages(ciphertext):
+            letters = encode_letters(message).tolist()
+            start = len(self.cipher_letters)
+            self._valid_windows.extend(range(start, start + len(letters) - 3))
+            self.cipher_letters.extend(letters)
+        n_windows = max(0, len(self.cipher_letters) - 3)
+        valid = set(self._valid_windows)
+
+        # posições de cada letra cifrada e janelas de quadgrama que a contêm
+        self.positions: List[List[int]] = [[] for _ in range(26)]
+        for pos, c in enumerate(self.cipher_letters):
+            self.positions[c].append(pos)
+
+        self.windows: List[frozenset] = []
+        for c in range(26):
+            starts = set()
+            for pos in self.positions[c]:
+                starts.update(range(max(0, pos - 3), min(pos, n_windows - 1) + 1))
+            self.windows.append(frozenset(starts & valid))
+        self._pair_windows: Dict[int, Tuple[int, ...]] = {}
+        self._new_scores = [0.0] * n_windows
+
+        self.key = CompiledKey(ALPHABET)
+        self.plain: List[int] = []
+        self.window_scores: List[float] = []
+        self.total = 0.0
+        self._pending: Tuple[int, ...] = ()
+
+    def reset(self, key: Sequence[str]) -> float:
+        self.key = CompiledKey(key)
+        codes = self.key.codes
+        self.plain = [codes[c] for c in self.cipher_letters]
+        self.window_scores = [0.0] * max(0, len(self.plain) - 3)
+        for w in self._valid_windows:
+            self.window_scores[w] = self._window_score(w)
+        self.total = sum(self.window_scores)
+        self._pending = ()
+        return self.total
+
+    def _window_score(self, w: int) -> float:
+        p = self.plain
+        return self.table[((p[w] * 26 + p[w + 1]) * 26 + p[w + 2]) * 26 + p[w + 3]]
+
+    def _windows_of(self, i: int, j: int) -> Tuple[int, ...]:
+        pair = i * 26 + j if i < j else j * 26 + i
+        windows = self._pair_windows.get(pair)
+        if windows is None:
+            windows = tuple(sorted(self.windows[i] | self.windows[j]))
+            self._pair_windows[pair] = windows
+        return windows
+
+    def _apply_swap(self, i: int, j: int):
+        self.key.swap(i, j)
+        codes = self.key.codes
+        plain = self.plain
+        code = codes[i]
+        for pos in self.positions[i]:
+            plain[pos] = code
+        code = codes[j]
+        for pos in self.positions[j]:
+            plain[pos] = code
+
+    # aplica key[i] <-> key[j] e devolve o delta; seguir com accept() ou reject()
+    def try_swap(self, i: int, j: int) -> float:
+        self._apply_swap(i, j)
+        windows = self._windows_of(i, j)
+        p = self.plain
+        table = self.table
+        old_scores = self.window_scores
+        new_scores = self._new_scores
+        delta = 0.0
+        k = 0
+        for w in windows:
+            s = table[((p[w] * 26 + p[w + 1]) * 26 + p[w + 2]) * 26 + p[w + 3]]
+            new_scores[k] = s
+            delta += s - old_scores[w]
+            k += 1
+        self._pending = windows
+        return delta
+
+    def accept(self, delta: float):
+        scores = self.window_scores
+        new_scores = self._new_scores
+        k = 0
+        for w in self._pending:
+            scores[w] = new_scores[k]
+            k += 1
+        self.total += delta
+        self._pending = ()
+
+    def reject(self):
+        key = self.key
+        self._apply_swap(key._last_i, key._last_j)
+        self._pending = ()
+
+
 class SimulatedAnnealingDecoder:
+    # `ciphertext` pode ser uma lista de mensagens cifradas com a mesma chave
+    # (modo de profundidade): cada chave é pontuada pela soma dos scores das
+    # mensagens, sem janelas entre uma e outra, e run() devolve a lista dos
+    # textos decifrados.
     def __init__(
         self,
-        ciphertext: str,
+        ciphertext: Union[str, Sequence[str]],
         scorer: EnglishScorer,
-        initial_temp: float = 15.0,
-        final_temp: float = 2.0,
+        initial_temp: Optional[float] = None,
+        final_temp: Optional[float] = None,
         cooling_rate: float = 0.97,
         iterations_per_temp: int = 500,
         random_seed: Optional[int] = None,
+        incremental: Optional[bool] = None,
+        batch: bool = False,
+        should_stop: Optional[Callable[[], bool]] = None,
+        plateau_levels: Optional[int] = 15,
+        target_per_char: Optional[float] = None,
+        max_iterations: Optional[int] = None,
+        schedule: Optional[AnnealingSchedule] = None,
+        telemetry: Optional[Telemetry] = None,
+        initial_key: Optional[List[str]] = None,
+        checkpoint: Optional[Checkpoint] = None,
     ):
         self.ciphertext = ciphertext
+        self.messages = as_messages(ciphertext)
         self.scorer = scorer
-        self.initial_temp = initial_temp
-        self.final_temp = final_temp
-        self.cooling_rate = cooling_rate
-        self.iterations_per_temp = iterations_per_temp
-
-        if random_seed is not None:
-            random.seed(random_seed)
+        # chave de partida (ex.: vinda do cache de resultados); sem ela, aleatória
+        self.initial_key = list(initial_key) if initial_key is not None else None
+        # sem initial_temp, a temperatura inicial é calibrada pelas trocas
+        # aleatórias da chave inicial (ver recozimento.py)
+        self.schedule = schedule or AnnealingSchedule(
+            initial_temp=initial_temp,
+            final_temp=final_temp,
+            cooling_rate=cooling_rate,
+            iterations_per_temp=iterations_per_temp,
+            initial_acceptance=WARM_START_ACCEPTANCE if initial_key is not None else 0.2,
+            plateau_levels=plateau_levels,
+            target_per_char=target_per_char,
+            max_iterations=max_iterations,
+        )
+
+        # o modo incremental só vale para o score por quadgramas (e não para
+        # um `model` do scorer); sem escolha explícita, é usado nos textos
+        # curtos, onde reavaliar só as janelas afetadas ganha de redecifrar
+        # tudo de uma vez com numpy
+        self.n_letters = sum(1 for message in self.messages for ch in message.upper() if 'A' <= ch <= 'Z')
+        if incremental is None:
+            incremental = self.n_letters <= INCREMENTAL_MAX_LETTERS
+        self.incremental = incremental and scorer.using_quadgrams and scorer.model is None and self.n_letters >= 4
+        # em lote, cada passo decifra e pontua de uma vez várias chaves
+        # vizinhas (vizinhanca.py); precisa de um modelo com score_batch
+        self._batch_table = scorer.model if scorer.model is not None else scorer.quadgrams
+        self.batch = batch and hasattr(self._batch_table, "score_batch") and self.n_letters >= 4
+        if self.batch:
+            self.incremental = False
+
+        # gerador próprio: cadeias com sementes distintas não interferem entre si
+        self.rng = random.Random(random_seed)
+        # consultado uma vez por nível de temperatura para interromper a busca
+        self.should_stop = should_stop
+        # iterações executadas na última chamada de run()
+        self.iterations_run = 0
+        self.telemetry = telemetry
+        # ponto de retomada gravado entre níveis (retomada.py); se o arquivo
+        # já existe, run() continua de onde ele parou
+        self.checkpoint = checkpoint
 
     def run(self) -> Tuple[List[str], float, str]:
-        current_key = SubstitutionCipher.random_key()
-        cipher = SubstitutionCipher(current_key)
-        current_plain = cipher.decrypt(self.ciphertext)
-        current_score = self.scorer.score(current_plain)
-
-        best_key = current_key[:]
-        best_score = current_score
-        best_plain = current_plain
-
-        T = self.initial_temp
-
-        while T > self.final_temp:
-            for _ in range(self.iterations_per_temp):
-                new_key = SubstitutionCipher.neighbour_key(current_key)
-                cipher_candidate = SubstitutionCipher(new_key)
-                new_plain = cipher_candidate.decrypt(self.ciphertext)
-                new_score = self.scorer.score(new_plain)
-
-                delta = new_score - current_score
-                if delta > 0:
-                    accept = True
+        telemetry = self.telemetry
+        if telemetry is not None:
+            telemetry.start(
+                "substitution_annealing",
+                letters=self.n_letters,
+                incremental=self.incremental,
+                batch=self.batch,
+                iterations_per_temp=self.schedule.iterations_per_temp,
+            )
+        if self.batch:
+            result = self._run_batch()
+        elif self.incremental:
+            result = self._run_incremental()
+        else:
+            result = self._run_full()
+        if telemetry is not None:
+            telemetry.finish(
+                best_score=result[1],
+                iterations=self.iterations_run,
+                stop_reason=self.schedule.stop_reason or "should_stop",
+            )
+        return result
+
+    def _decrypt(self, key: CompiledKey):
+        # texto completo (com caixa e pontuação), um por mensagem no modo de profundidade
+        if isinstance(self.ciphertext, str):
+            return key.decrypt(self.ciphertext)
+        return [key.decrypt(message) for message in self.messages]
+
+    def _start_key(self) -> List[str]:
+        if self.initial_key is not None:
+            return self.initial_key[:]
+        return SubstitutionCipher.random_key(self.rng)
+
+    def _problem(self) -> str:
+        engine = "batch" if self.batch else "incremental" if self.incremental else "full"
+        return problem_signature("substitution", engine, self.messages)
+
+    def _resume(self) -> Optional[Dict]:
+        # ponto de retomada gravado, com o cronograma e o gerador já restaurados
+        if self.checkpoint is None:
+            return None
+        snapshot = self.checkpoint.load(self._problem())
+        if snapshot is not None:
+            self.schedule.restore(snapshot["schedule"])
+            restore_rng(self.rng, snapshot["rng"])
+        return snapshot
+
+    def _snapshot(self, key: CompiledKey, score: float, best: CompiledKey, best_score: float) -> Dict:
+        return {
+            "key": key.text(),
+            "score": score,
+            "best_key": best.text(),
+            "best_score": best_score,
+            "schedule": self.schedule.state(),
+            "rng": rng_state(self.rng),
+        }
+
+    def _save_level(self, key: CompiledKey, score: float, best: CompiledKey, best_score: float):
+        if self.checkpoint is not None:
+            self.checkpoint.maybe_save(self._problem(), lambda: self._snapshot(key, score, best, best_score))
+
+    def _save_final(self, key: CompiledKey, score: float, best: CompiledKey, best_score: float):
+        # `done` só quando o cronograma parou; parada por should_stop continua depois
+        if self.checkpoint is not None:
+            done = self.schedule.stop_reason is not None
+            self.checkpoint.save(self._problem(), self._snapshot(key, score, best, best_score), done)
+
+    def _run_full(self) -> Tuple[List[str], float, str]:
+        # texto cifrado codificado uma vez; cada iteração troca duas letras da
+        # chave no lugar, decifra para o mesmo buffer e desfaz se rejeitar
+        rng = self.rng
+        schedule = self.schedule
+        telemetry = self.telemetry
+        score_codes = self.scorer.score_codes
+        decrypt_time = score_time = 0.0
+        segments = [encode_letters(message) for message in self.messages]
+        lengths = [len(s) for s in segments]
+        letters = np.concatenate(segments)
+        plain = np.empty_like(letters)
+        if self.scorer.model is None and self.scorer.using_quadgrams and len(letters) >= 4:
+            score_codes = QuadgramWindowBuffer(self.scorer.quadgrams, len(letters), lengths).score
+        elif len(segments) > 1:
+            # outros modelos: soma por mensagem, sobre visões do mesmo buffer
+            views = np.split(plain, np.cumsum(lengths)[:-1])
+            score_message = self.scorer.score_codes
+
+            def score_codes(_: np.ndarray) -> float:
+                return sum(score_message(view) for view in views if len(view))
+        key = CompiledKey(self._start_key())
+        snapshot = self._resume()
+        if snapshot is None:
+            current_score = score_codes(key.decrypt_codes(letters, plain))
+
+            deltas = []
+            for _ in range(CALIBRATION_SAMPLES // 10):
+                key.swap(*random_pair(rng))
+                deltas.append(score_codes(key.decrypt_codes(letters, plain)) - current_score)
+                key.undo()
+            schedule.calibrate(deltas)
+            schedule.start(current_score, self.n_letters)
+
+            best = key.copy()
+            best_score = current_score
+        else:
+            key = CompiledKey(snapshot["key"])
+            current_score = snapshot["score"]
+            best = CompiledKey(snapshot["best_key"])
+            best_score = snapshot["best_score"]
+
+        running = snapshot is None or not snapshot["done"]
+        while running:
+            for _ in range(schedule.iterations_per_temp):
+                i, j = random_pair(rng)
+                key.swap(i, j)
+                if telemetry is None:
+                    new_score = score_codes(key.decrypt_codes(letters, plain))
                 else:
-                    try:
-                        accept_prob = math.exp(delta / T)
-                    except OverflowError:
-                        accept_prob = 0.0
-                    accept = random.random() < accept_prob
-
-                if accept:
-                    current_key = new_key
-                    current_plain = new_plain
+                    started = time.perf_counter()
+                    key.decrypt_codes(letters, plain)
+                    decrypted = time.perf_counter()
+                    new_score = score_codes(plain)
+                    decrypt_time += decrypted - started
+                    score_time += time.perf_counter() - decrypted
+
+                if schedule.accept(new_score - current_score, rng):
                     current_score = new_score
+                    if current_score > best_score:
+                        best.assign(key)
+                        best_score = current_score
+                else:
+                    key.undo()
+
+            if telemetry is not None:
+                telemetry.level(schedule, current_score, best_score, best_key=best.text())
+            if not schedule.next_level(best_score):
+                break
+            if self.should_stop is not None and self.should_stop():
+                break
+            self._save_level(key, current_score, best, best_score)
+
+        self._save_final(key, current_score, best, best_score)
+        self.iterations_run = schedule.iterations
+        if telemetry is not None:
+            telemetry.add_phase("decrypt", decrypt_time)
+            telemetry.add_phase("score", score_time)
+        # o texto completo (com caixa e pontuação) só é montado para a melhor chave
+        return best.key(), best_score, self._decrypt(best)
+
+    def _run_batch(self) -> Tuple[List[str], float, str]:
+        score_keys = substitution_key_scorer(self._batch_table, [encode_letters(m) for m in self.messages])
+        start = CompiledKey(self._start_key()).array
+        key, best_score = anneal(
+            start,
+            score_keys,
+            self.schedule,
+            self.rng,
+            length=self.n_letters,
+            should_stop=self.should_stop,
+            telemetry=self.telemetry,
+            describe=lambda k: "".join(ALPHABET[c] for c in k),
+            checkpoint=self.checkpoint,
+            problem=self._problem(),
+        )
+        self.iterations_run = self.schedule.iterations
+        best = CompiledKey([ALPHABET[c] for c in key])
+        with timed(self.telemetry, "decrypt"):
+            best_plain = self._decrypt(best)
+        return best.key(), best_score, best_plain
+
+    def _run_incremental(self) -> Tuple[List[str], float, str]:
+        state = IncrementalQuadgramState(self.ciphertext, self.scorer)
+        rng = self.rng
+        schedule = self.schedule
+        telemetry = self.telemetry
+        # decifrar e pontuar são uma coisa só no modo incremental (try_swap)
+        score_time = 0.0
+        start_key = self._start_key()
+        snapshot = self._resume()
+        if snapshot is None:
+            current_score = state.reset(start_key)
+
+            deltas = []
+            for _ in range(CALIBRATION_SAMPLES):
+                deltas.append(state.try_swap(*random_pair(rng)))
+                state.reject()
+            schedule.calibrate(deltas)
+            schedule.start(current_score, self.n_letters)
+
+            best = state.key.copy()
+            best_score = current_score
+        else:
+            state.reset(snapshot["key"])
+            # o total acumulado pelas trocas, não a soma refeita
+            state.total = snapshot["score"]
+            best = CompiledKey(snapshot["best_key"])
+            best_score = snapshot["best_score"]
+
+        running = snapshot is None or not snapshot["done"]
+        while running:
+            for _ in range(schedule.iterations_per_temp):
+                i, j = random_pair(rng)
+                if telemetry is None:
+                    delta = state.try_swap(i, j)
+                else:
+                    started = time.perf_counter()
+                    delta = state.try_swap(i, j)
+                    score_time += time.perf_counter() - started
+
+                if schedule.accept(delta, rng):
+                    state.accept(delta)
+                    current_score = state.total
 
                     if current_score > best_score:
-                        best_key = current_key[:]
-                        best_plain = current_plain
+                        best.assign(state.key)
                         best_score = current_score
+                else:
+                    state.reject()
+
+            if telemetry is not None:
+                telemetry.level(schedule, state.total, best_score, best_key=best.text())
+            if not schedule.next_level(best_score):
+                break
+            if self.should_stop is not None and self.should_stop():
+                break
+            self._save_level(state.key, state.total, best, best_score)
+
+        self._save_final(state.key, state.total, best, best_score)
+        self.iterations_run = schedule.iterations
+        # o texto completo (com caixa e pontuação) só é montado para a melhor chave
+        if telemetry is None:
+            best_plain = self._decrypt(best)
+        else:
+            telemetry.add_phase("score", score_time)
+            with telemetry.phase("decrypt"):
+                best_plain = self._decrypt(best)
+        return best.key(), best_score, best_plain
+
 
-            T *= self.cooling_rate
+class HillClimbDecoder:
+    # Subida de encosta no estilo de Jakobsen: uma única passada conta os
+    # bigramas e quadgramas cifrados; depois cada uma das 325 trocas de duas
+    # letras da chave é avaliada sobre essas contagens (permutando linhas e
+    # colunas da matriz 26x26 de bigramas), sem decifrar o texto de novo. O
+    # custo por passo independe do tamanho do texto. Mesma interface e mesmo
+    # retorno de SimulatedAnnealingDecoder.run(), inclusive para uma lista de
+    # mensagens com a mesma chave (as contagens são somadas por mensagem).
 
+    def __init__(
+        self,
+        ciphertext: Union[str, Sequence[str]],
+        scorer: EnglishScorer,
+        restarts: int = 3,
+        random_seed: Optional[int] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        telemetry: Optional[Telemetry] = None,
+    ):
+        if not scorer.using_quadgrams:
+            raise ValueError("A subida de encosta precisa do modelo de quadgramas.")
+        self.ciphertext = ciphertext
+        self.scorer = scorer
+        self.restarts = restarts
+        self.rng = random.Random(random_seed)
+        # consultado entre reinícios
+        self.should_stop = should_stop
+        # passos de subida (trocas aceitas) na última chamada de run()
+        self.iterations_run = 0
+        self.telemetry = telemetry
+
+        self.letter_counts = np.zeros(26, dtype=np.int64)
+        bigram_counts = np.zeros(26 * 26, dtype=np.int64)
+        quadgram_counts = np.zeros(26 ** 4, dtype=np.int64)
+        for message in as_messages(ciphertext):
+            letters = encode_letters(message).astype(np.intp)
+            self.letter_counts += np.bincount(letters, minlength=26)
+            bigram_counts += np.bincount(letters[:-1] * 26 + letters[1:], minlength=26 * 26)
+            quadgram_counts += count_quadgrams(letters)
+        # matriz 26x26 de bigramas cifrados, guardada só nas posições não nulas
+        nonzero = np.flatnonzero(bigram_counts)
+        self.bigram_counts = bigram_counts[nonzero].astype(np.float64)
+        self._first, self._second = np.divmod(nonzero, 26)
+        self.bigram_log_probs = scorer.quadgrams.bigram_log_probs()
+        self.objective = QuadgramCountObjective(quadgram_counts, scorer.quadgrams)
+
+    def frequency_key(self) -> np.ndarray:
+        # chave inicial: letra cifrada mais frequente -> E, a seguinte -> T, ...
+        english_order = sorted(range(26), key=lambda c: -ENGLISH_LETTER_FREQUENCIES[ALPHABET[c]])
+        perm = np.empty(26, dtype=np.intp)
+        perm[np.argsort(-self.letter_counts, kind="stable")] = english_order
+        return perm
+
+    def _digram_scores(self, perms: np.ndarray) -> np.ndarray:
+        # score de bigramas de várias chaves de uma vez: (n, 26) -> (n,)
+        plain = self.bigram_log_probs[perms[:, self._first], perms[:, self._second]]
+        return plain @ self.bigram_counts
+
+    def _climb_digrams(self, perm: np.ndarray) -> np.ndarray:
+        perm, _, steps = hill_climb(perm, self._digram_scores)
+        self.iterations_run += steps
+        return perm
+
+    def run(self) -> Tuple[List[str], float, str]:
+        telemetry = self.telemetry
+        if telemetry is not None:
+            telemetry.start("substitution_hillclimb", letters=int(self.letter_counts.sum()), restarts=self.restarts)
+        self.iterations_run = 0
+        best_perm, best_score = None, float("-inf")
+        for attempt in range(max(1, self.restarts)):
+            if attempt == 0:
+                perm = self.frequency_key()
+            else:
+                perm = np.array(self.rng.sample(range(26), 26), dtype=np.intp)
+            # os bigramas levam perto da chave; os quadgramas acertam o resto
+            with timed(telemetry, "digrams"):
+                perm = self._climb_digrams(perm)
+            with timed(telemetry, "quadgrams"):
+                perm, score = self.objective.hill_climb(perm)
+            if score > best_score:
+                best_perm, best_score = perm, score
+            if telemetry is not None:
+                telemetry.emit("restart", attempt=attempt, score=score, best_score=best_score,
+                               best_key="".join(ALPHABET[p] for p in best_perm))
+            if self.should_stop is not None and self.should_stop():
+                break
+
+        best_key = [ALPHABET[p] for p in best_perm]
+        with timed(telemetry, "decrypt"):
+            if isinstance(self.ciphertext, str):
+                best_plain = SubstitutionCipher(best_key).decrypt(self.ciphertext)
+                best_score = self.scorer.score(best_plain)
+            else:
+                best_plain = [SubstitutionCipher(best_key).decrypt(m) for m in self.ciphertext]
+                best_score = sum(self.scorer.score(text) for text in best_plain)
+        if telemetry is not None:
+            telemetry.finish(best_score=best_score, iterations=self.iterations_run, stop_reason="converged")
         return best_key, best_score, best_plain
 
+
 def preprocess_ciphertext(text: str) -> str:
     return "".join(
         ch.upper() if ch.isalpha() else ch
@@ -233,17 +807,24 @@ if __name__ == "__main__":
 
     scorer = EnglishScorer(quadgram_file="./quebra-algoritmos/quadgrams.txt")
 
+    # QUEBRA_TRACE=trace.json grava a telemetria da busca (ver telemetria.py)
+    trace_file = os.environ.get("QUEBRA_TRACE")
+    trace = TraceRecorder()
+    telemetry = Telemetry(trace, ProgressPrinter()) if trace_file else None
+
     decoder = SimulatedAnnealingDecoder(
         ciphertext=ciphertext,
         scorer=scorer,
-        initial_temp=15.0,
-        final_temp=2.0,
         cooling_rate=0.97,
         iterations_per_temp=100,
         random_seed=42,
+        telemetry=telemetry,
     )
 
     best_key, best_score, best_plain = decoder.run()
+    if trace_file:
+        trace.save(trace_file)
+        print(f"[INFO] Telemetria gravada em: {trace_file}")
 
     print("==== Best score ====")
     print(best_score)
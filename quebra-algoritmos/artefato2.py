@@ -1,288 +1,349 @@
-import sys
-import math
-import random
 import itertools
-import json
+import sys
 import os
 from pathlib import Path
-from typing import List, Tuple, Dict
-
-from google import genai
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from analise import rank_cipher_families, rank_transposition_keys
+from ngramas import as_messages, encode_text, load_quadgram_table, rearrangement_neighbours
+from replicas import ReplicaExchange
+from retomada import Checkpoint, problem_signature
+from telemetria import ProgressPrinter, Telemetry, TraceRecorder, timed
+from transposicao import (
+    EXACT_MAX_LENGTH,
+    TranspositionKeySearch,
+    array_to_text,
+    depth_candidates,
+    long_key_seeds,
+    normalize_ciphertext,
+    text_to_array,
+    transposition_permutations,
+    with_rotations,
+)
+from vizinhanca import hill_climb
+
+if TYPE_CHECKING:
+    # o ranqueamento por LLM (asyncio, SDK do Gemini) só é importado quando usado
+    from ranqueamento import LLMRanker, Verdict
 
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "YOUR_API_KEY_HERE")
 
+# chaves longas (acima de EXACT_MAX_LENGTH): têmpera paralela (replicas.py)
+# partindo das chaves iniciais de transposicao.long_key_seeds
+LONG_KEY_SEEDS = 8
+LONG_KEY_PATIENCE = 25
+# chaves curtas: até este tamanho todas as permutações são pontuadas (7! = 5040)
+ENUMERATE_MAX_LENGTH = 7
+# candidatos da busca por adjacência refinados pela subida de encosta
+REFINE_STARTS = 8
+# com menos linhas que isso a adjacência de bigramas quase não distingue as
+# colunas (texto curto para o tamanho da chave): os candidatos refinados
+# partem para a têmpera paralela
+FEW_ROWS = 10
+
+
+def transposition_key_scorer(table, messages: List[np.ndarray], mode: str) -> Callable[[np.ndarray], np.ndarray]:
+    # score de uma matriz de chaves somado entre as mensagens (códigos já
+    # normalizados); fica no nível do módulo para ser montado nos processos
+    # da têmpera paralela
+    def score_keys(keys: np.ndarray) -> np.ndarray:
+        scores = [
+            table.score_batch(codes[transposition_permutations(mode, len(codes), keys)])
+            for codes in messages
+        ]
+        return scores[0] if len(scores) == 1 else np.sum(scores, axis=0)
+
+    return score_keys
+
 
 class NgramScorer:
-    def __init__(self, ngramfile: str, n: int = 4):
-        self.n = n
-        self.ngrams: Dict[str, float] = {}
-        self.floor = None
-        self._load_ngrams(ngramfile)
+    # `table` aceita um modelo já carregado (tabela de qualquer ordem ou
+    # modelos.MixedModel, ver modelos.ModelRegistry); de arquivo, só
+    # quadgramas, lidos no primeiro uso
+    def __init__(self, ngramfile: Optional[str] = None, n: int = 4, table=None):
+        if table is None and n != 4:
+            raise ValueError("De arquivo, NgramScorer só carrega quadgramas (n=4); use `table` para outras ordens.")
+        self.n = table.order if table is not None else n
+        self._ngramfile = ngramfile
+        self._table = table
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._load_ngrams(self._ngramfile)
+        return self._table
+
+    @property
+    def floor(self) -> float:
+        return self.table.floor
 
     def _load_ngrams(self, filename: str):
-        total = 0
-        with open(filename, 'r') as f:
-            for line in f:
-                parts = line.strip().split()
-                if len(parts) == 2:
-                    ngram, count = parts[0], int(parts[1])
-                    self.ngrams[ngram] = count
-                    total += count
-
-        for ngram in self.ngrams:
-            self.ngrams[ngram] = math.log10(self.ngrams[ngram] / total)
-        self.floor = math.log10(0.01 / total)
+        self._table = load_quadgram_table(filename)
 
     def score(self, text: str) -> float:
-        text = text.upper().replace(' ', '').replace('\n', '')
-        score = 0.0
-        for i in range(len(text) - self.n + 1):
-            ngram = text[i:i + self.n]
-            score += self.ngrams.get(ngram, self.floor)
-        return score
+        text = text.replace(' ', '').replace('\n', '')
+        return self.table.score_codes(encode_text(text))
 
 
+# Em todos os métodos, `ciphertext` pode ser uma lista de mensagens cifradas
+# com a mesma chave (modo de profundidade): cada chave é pontuada pela soma
+# dos scores das mensagens e o texto decifrado volta como lista.
+# `should_stop` (prazo ou cancelamento do lote/serviço) interrompe o
+# refinamento e a têmpera, devolvendo a melhor chave encontrada até ali.
 class PermutationBreaker:
-    def __init__(self, scorer: NgramScorer):
+    def __init__(
+        self,
+        scorer: NgramScorer,
+        rescore_candidates: int = 32,
+        telemetry: Optional[Telemetry] = None,
+        workers: int = 1,
+        random_seed: Optional[int] = None,
+    ):
         self.scorer = scorer
-
-    def _columnar_decrypt(self, ciphertext: str, key: List[int]) -> str:
-        ciphertext = ciphertext.upper().replace(' ', '').replace('\n', '')
-        n_cols = len(key)
-        n_rows = math.ceil(len(ciphertext) / n_cols)
-
-        sorted_positions = sorted(range(n_cols), key=lambda x: key[x])
-
-        col_lengths = [n_rows] * n_cols
-        remainder = len(ciphertext) % n_cols
-        if remainder != 0:
-            for col in range(remainder, n_cols):
-                col_lengths[col] = n_rows - 1
-
-        grid = [[''] * n_cols for _ in range(n_rows)]
-        idx = 0
-        for col_pos in sorted_positions:
-            for row in range(col_lengths[col_pos]):
-                if idx < len(ciphertext):
-                    grid[row][col_pos] = ciphertext[idx]
-                    idx += 1
-
-        return ''.join(''.join(row) for row in grid)
-
-    def _simulated_annealing_columnar(
+        self.rescore_candidates = rescore_candidates
+        self.telemetry = telemetry
+        # processos da têmpera paralela (chaves longas)
+        self.workers = workers
+        self.random_seed = random_seed
+        self._prepared_text = None
+        self._prepared = None
+
+    def _prepare(self, ciphertext: Union[str, Sequence[str]]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        # normaliza uma única vez por texto: caracteres (para montar a saída)
+        # e códigos 0..25 (para pontuar), ambos indexáveis pela permutação;
+        # um par por mensagem
+        if ciphertext is not self._prepared_text:
+            self._prepared = [
+                (text_to_array(normalized), encode_text(normalized))
+                for normalized in map(normalize_ciphertext, as_messages(ciphertext))
+            ]
+            self._prepared_text = ciphertext
+        return self._prepared
+
+    def decrypt_codes(self, ciphertext: str, keys, mode: str) -> np.ndarray:
+        # decifra várias chaves de uma vez: matriz (n_chaves, tamanho) de códigos
+        _, codes = self._prepare(ciphertext)[0]
+        return codes[transposition_permutations(mode, len(codes), keys)]
+
+    def score_keys(self, ciphertext: Union[str, Sequence[str]], keys, mode: str) -> np.ndarray:
+        messages = [codes for _, codes in self._prepare(ciphertext)]
+        return transposition_key_scorer(self.scorer.table, messages, mode)(np.asarray(keys))
+
+    def _decrypt(self, ciphertext: Union[str, Sequence[str]], key: List[int], mode: str):
+        texts = [
+            array_to_text(chars[transposition_permutations(mode, len(chars), key)[0]])
+            for chars, _ in self._prepare(ciphertext)
+        ]
+        return texts[0] if isinstance(ciphertext, str) else texts
+
+    def _pruned_search(
         self,
-        ciphertext: str,
+        ciphertext: Union[str, Sequence[str]],
         key_length: int,
-        temperature: float = 50.0,
-        cooling_rate: float = 0.99,
-        iterations: int = 100000
-    ) -> Tuple[List[int], str]:
-        key = list(range(key_length))
-        random.shuffle(key)
-
-        best_key = key.copy()
-        best_text = self._columnar_decrypt(ciphertext, best_key)
-        best_score = self.scorer.score(best_text)
-
-        current_key = key.copy()
-        current_score = best_score
-        temp = temperature
-
-        for _ in range(iterations):
-            i, j = random.sample(range(key_length), 2)
-            current_key[i], current_key[j] = current_key[j], current_key[i]
-
-            text = self._columnar_decrypt(ciphertext, current_key)
-            score = self.scorer.score(text)
-            delta = score - current_score
-
-            if delta > 0 or random.random() < math.exp(delta / temp):
-                current_score = score
-                if score > best_score:
-                    best_score = score
-                    best_key = current_key.copy()
-                    best_text = text
+        mode: str,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Tuple[Union[str, List[str]], List[int], float]:
+        telemetry = self.telemetry
+        if telemetry is not None:
+            telemetry.start("transposition_pruned", mode=mode, key_len=key_length)
+
+        # a adjacência de bigramas só ordena os candidatos; a escolha final
+        # usa o score completo de quadgramas
+        with timed(telemetry, "candidates"):
+            if key_length <= ENUMERATE_MAX_LENGTH:
+                keys = [list(key) for key in itertools.permutations(range(key_length))]
             else:
-                current_key[i], current_key[j] = current_key[j], current_key[i]
+                if isinstance(ciphertext, str):
+                    search = TranspositionKeySearch(self.scorer.table, ciphertext, key_length, mode)
+                    keys = search.candidates(limit=self.rescore_candidates)
+                else:
+                    messages = [normalize_ciphertext(m) for m in ciphertext]
+                    keys = depth_candidates(self.scorer.table, messages, key_length, mode, limit=self.rescore_candidates)
+                keys = with_rotations(keys)
+        with timed(telemetry, "rescore"):
+            scores = self.score_keys(ciphertext, keys, mode)
+        order = np.argsort(-scores, kind="stable")
+        best_key, best_score = keys[order[0]], float(scores[order[0]])
+
+        # refinamento dos melhores candidatos por trocas, inversões e
+        # deslocamentos de trechos (sai de rotações e de trechos fora do
+        # lugar), com a vizinhança inteira pontuada de uma vez a cada passo
+        steps = 0
+        if key_length > ENUMERATE_MAX_LENGTH:
+            messages = [codes for _, codes in self._prepare(ciphertext)]
+            score_keys = transposition_key_scorer(self.scorer.table, messages, mode)
+            refined = []
+            with timed(telemetry, "refine"):
+                for index in order[:REFINE_STARTS]:
+                    if should_stop is not None and should_stop():
+                        break
+                    key, score, climbed = hill_climb(
+                        np.asarray(keys[index]), score_keys, float(scores[index]), neighbours=rearrangement_neighbours,
+                    )
+                    steps += climbed
+                    refined.append(key.tolist())
+                    if score > best_score:
+                        best_key, best_score = key.tolist(), score
+            stopped = should_stop is not None and should_stop()
+            if min(len(codes) for codes in messages) < FEW_ROWS * key_length and refined and not stopped:
+                with timed(telemetry, "tempering"):
+                    key, score = self._replica_exchange(messages, key_length, mode, None, should_stop).run(refined)
+                if score > best_score:
+                    best_key, best_score = key, score
 
-            temp *= cooling_rate
+        with timed(telemetry, "decrypt"):
+            text = self._decrypt(ciphertext, best_key, mode)
+        if telemetry is not None:
+            telemetry.finish(best_score=best_score, iterations=steps, stop_reason="converged", candidates=len(keys))
+        return text, best_key, best_score
 
-        return best_key, best_text
+    def _tempering_search(
+        self,
+        ciphertext: Union[str, Sequence[str]],
+        key_length: int,
+        mode: str,
+        should_stop: Optional[Callable[[], bool]] = None,
+        checkpoint: Optional[Checkpoint] = None,
+    ) -> Tuple[Union[str, List[str]], List[int], float]:
+        messages = [codes for _, codes in self._prepare(ciphertext)]
+        normalized = [normalize_ciphertext(m) for m in as_messages(ciphertext)]
+        with timed(self.telemetry, "candidates"):
+            seeds = long_key_seeds(self.scorer.table, normalized, key_length, mode, limit=LONG_KEY_SEEDS)
+        problem = problem_signature("transposition", mode, key_length, normalized)
+        tempering = self._replica_exchange(messages, key_length, mode, self.telemetry, should_stop, checkpoint, problem)
+        key, score = tempering.run(seeds)
+        return self._decrypt(ciphertext, key, mode), key, score
+
+    def _replica_exchange(
+        self,
+        messages: List[np.ndarray],
+        key_length: int,
+        mode: str,
+        telemetry: Optional[Telemetry],
+        should_stop: Optional[Callable[[], bool]] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        problem: str = "",
+    ) -> ReplicaExchange:
+        # colunar irregular: as primeiras `sobra` colunas são as longas
+        remainders = {len(codes) % key_length for codes in messages}
+        boundary = remainders.pop() if mode == "columnar" and len(remainders) == 1 else 0
+        return ReplicaExchange(
+            transposition_key_scorer,
+            (self.scorer.table, messages, mode),
+            workers=self.workers,
+            boundary=boundary,
+            # trocar o conjunto de colunas longas é o passo difícil do irregular
+            patience=2 * key_length if boundary else LONG_KEY_PATIENCE,
+            random_seed=self.random_seed,
+            should_stop=should_stop,
+            telemetry=telemetry,
+            checkpoint=checkpoint,
+            problem=problem,
+        )
 
-    def break_columnar(self, ciphertext: str, key_length: int) -> Tuple[str, List[int], float]:
-        if key_length <= 8:
-            best_score = float('-inf')
-            best_key, best_text = None, None
-            for perm in itertools.permutations(range(key_length)):
-                key = list(perm)
-                text = self._columnar_decrypt(ciphertext, key)
-                score = self.scorer.score(text)
-                if score > best_score:
-                    best_score = score
-                    best_key = key
-                    best_text = text
-            return best_text, best_key, best_score
-        else:
-            key, text = self._simulated_annealing_columnar(ciphertext, key_length)
-            score = self.scorer.score(text)
-            return text, key, score
+    def _columnar_decrypt(self, ciphertext: str, key: List[int]) -> str:
+        return self._decrypt(ciphertext, key, "columnar")
+
+    def break_columnar(
+        self,
+        ciphertext: Union[str, Sequence[str]],
+        key_length: int,
+        should_stop: Optional[Callable[[], bool]] = None,
+        checkpoint: Optional[Checkpoint] = None,
+    ) -> Tuple[Union[str, List[str]], List[int], float]:
+        if key_length <= EXACT_MAX_LENGTH:
+            return self._pruned_search(ciphertext, key_length, "columnar", should_stop)
+        return self._tempering_search(ciphertext, key_length, "columnar", should_stop, checkpoint)
 
     def _block_decrypt(self, ciphertext: str, key: List[int]) -> str:
-        ciphertext = ciphertext.upper().replace(' ', '').replace('\n', '')
-        n = len(key)
-        plaintext_blocks = []
-
-        for k in range(0, len(ciphertext), n):
-            block = ciphertext[k:k + n]
-            if len(block) < n:
-                # bloco incompleto: mantém como está
-                plaintext_blocks.append(block)
-                break
-
-            plain_block = ['?'] * n
-            for i in range(n):
-                j = key[i]
-                plain_block[i] = block[j]
-            plaintext_blocks.append(''.join(plain_block))
-
-        return ''.join(plaintext_blocks)
-
-    def _simulated_annealing_block(
+        return self._decrypt(ciphertext, key, "block")
+
+    def break_block(
         self,
-        ciphertext: str,
+        ciphertext: Union[str, Sequence[str]],
         key_length: int,
-        temperature: float = 50.0,
-        cooling_rate: float = 0.99,
-        iterations: int = 100000
-    ) -> Tuple[List[int], str]:
-        key = list(range(key_length))
-        random.shuffle(key)
-
-        best_key = key.copy()
-        best_text = self._block_decrypt(ciphertext, best_key)
-        best_score = self.scorer.score(best_text)
-
-        current_key = key.copy()
-        current_score = best_score
-        temp = temperature
-
-        for _ in range(iterations):
-            i, j = random.sample(range(key_length), 2)
-            current_key[i], current_key[j] = current_key[j], current_key[i]
-
-            text = self._block_decrypt(ciphertext, current_key)
-            score = self.scorer.score(text)
-            delta = score - current_score
-
-            if delta > 0 or random.random() < math.exp(delta / temp):
-                current_score = score
-                if score > best_score:
-                    best_score = score
-                    best_key = current_key.copy()
-                    best_text = text
-            else:
-                current_key[i], current_key[j] = current_key[j], current_key[i]
+        should_stop: Optional[Callable[[], bool]] = None,
+        checkpoint: Optional[Checkpoint] = None,
+    ) -> Tuple[Union[str, List[str]], List[int], float]:
+        if key_length <= EXACT_MAX_LENGTH:
+            return self._pruned_search(ciphertext, key_length, "block", should_stop)
+        return self._tempering_search(ciphertext, key_length, "block", should_stop, checkpoint)
+
+
+def break_transposition_sweep(
+    breaker: PermutationBreaker,
+    ciphertext: Union[str, Sequence[str]],
+    min_key_len: int = 2,
+    max_key_len: int = 10,
+    should_stop: Optional[Callable[[], bool]] = None,
+    verbose: bool = False,
+    top_candidates: Optional[int] = None,
+    checkpoint_dir: Optional[Union[str, Path]] = None,
+) -> Dict[str, Dict]:
+    # quebra colunar e blocos para cada tamanho de chave; com `top_candidates`,
+    # só nos (modo, tamanho) mais bem colocados na pré-análise.
+    # `should_stop` é consultado entre uma busca e outra e repassado a cada
+    # busca (refinamento e têmpera param no meio, com o melhor até ali).
+    # Com `checkpoint_dir`, as têmperas das chaves longas gravam pontos de
+    # retomada em `<checkpoint_dir>/<modo>_<tamanho>.json` (retomada.py)
+    if top_candidates:
+        ranking = rank_transposition_keys(breaker, ciphertext, min_key_len, max_key_len)
+        if verbose:
+            print("\n=== Pré-análise (modo, tamanho, score por quadgrama) ===")
+            for c in ranking[:top_candidates]:
+                print(f"{c['mode']:<9} key_len={c['key_len']:<3} score={c['score']:.3f}")
+        plan = [(c["mode"], c["key_len"]) for c in ranking[:top_candidates]]
+    else:
+        plan = [
+            (mode, key_len)
+            for key_len in range(min_key_len, max_key_len + 1)
+            for mode in ("columnar", "block")
+        ]
 
-            temp *= cooling_rate
+    candidates: Dict[str, Dict] = {}
+    for mode, key_len in plan:
+        if should_stop is not None and should_stop():
+            break
+
+        breaker_fn = breaker.break_columnar if mode == "columnar" else breaker.break_block
+        checkpoint = Checkpoint(Path(checkpoint_dir) / f"{mode}_{key_len}.json") if checkpoint_dir else None
+        text, key, score = breaker_fn(ciphertext, key_len, should_stop, checkpoint)
+        if breaker.telemetry is not None:
+            breaker.telemetry.emit("candidate", mode=mode, key_len=key_len, score=score, key=key)
+        candidates[f"{mode}_{key_len}"] = {
+            "mode": mode,
+            "key_len": key_len,
+            "key": key,
+            "text": text,
+            "score": score,
+        }
+        if verbose:
+            label_tag = "COLUNAR" if mode == "columnar" else "BLOCOS "
+            # no modo de profundidade, a prévia é o começo da primeira mensagem
+            preview = text if isinstance(text, str) else text[0]
+            print(f"[{label_tag}] key_len={key_len}, score={score:.2f}, key={key}, preview={preview[:60]}")
 
-        return best_key, best_text
+    return candidates
 
-    def break_block(self, ciphertext: str, key_length: int) -> Tuple[str, List[int], float]:
-        if key_length <= 8:
-            best_score = float('-inf')
-            best_key, best_text = None, None
-            for perm in itertools.permutations(range(key_length)):
-                key = list(perm)
-                text = self._block_decrypt(ciphertext, key)
-                score = self.scorer.score(text)
-                if score > best_score:
-                    best_score = score
-                    best_key = key
-                    best_text = text
-            return best_text, best_key, best_score
-        else:
-            key, text = self._simulated_annealing_block(ciphertext, key_length)
-            score = self.scorer.score(text)
-            return text, key, score
-
-
-def choose_with_gemini(candidates: Dict[str, Dict]) -> Tuple[str, str]:
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_API_KEY_HERE":
-        raise RuntimeError("GEMINI_API_KEY não configurada.")
-
-    client = genai.Client(api_key=GEMINI_API_KEY)
-
-    prompt = (
-        "We are breaking a classical cipher. Below are several candidate decryptions.\n"
-        "Each candidate has a label, a cipher mode (columnar or block), a key length,\n"
-        "and the decrypted text.\n\n"
-        "Your tasks:\n"
-        "1) Decide which candidate label has the most plausible English plaintext.\n"
-        "2) Provide a cleaned-up suggestion of the original plaintext in natural English,\n"
-        "   with NORMAL SPACES between words and proper punctuation.\n"
-        "   You MUST segment the text into words. Do NOT return an all-caps string\n"
-        "   without spaces. The suggestion should look like a normal English sentence,\n"
-        "   for example: \"Tomorrow at the break of dawn, the silence of the mountains...\".\n\n"
-        "Respond ONLY in valid JSON with the following format:\n"
-        "{\n"
-        "  \"best_label\": \"<label>\",\n"
-        "  \"suggestion\": \"<your suggested plaintext>\"\n"
-        "}\n\n"
-        "Candidates:\n\n"
-    )
-
-    for label, info in candidates.items():
-        prompt += (
-            f"Label: {label}\n"
-            f"Mode: {info['mode']}\n"
-            f"Key length: {info['key_len']}\n"
-            f"Decrypted text: {info['text']}\n\n"
-        )
 
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
-    )
-
-    raw = (response.text or "").strip()
-    print("\n--- Resposta bruta do Gemini ---\n")
-    print(raw)
-    
-    # Remove markdown code blocks if present
-    if raw.startswith("```"):
-        # Remove first line (```json or ```)
-        lines = raw.split('\n')
-        if len(lines) > 2:
-            # Remove first and last lines
-            raw = '\n'.join(lines[1:-1]).strip()
-    
-    # Try to parse JSON
-    data = json.loads(raw)  # se quebrar, o caller trata
-    best_label = data["best_label"]
-    suggestion = data["suggestion"]
-
-    # Pequena proteção: se o modelo ainda assim devolver tudo colado, avisamos.
-    if " " not in suggestion.strip():
-        # Não tento segmentar automaticamente (isso já é papel do LLM),
-        # só deixo explícito para você debugar se acontecer.
-        print("⚠️ Aviso: a sugestão do Gemini veio sem espaços. Verifique o prompt/saída:")
-        print(suggestion)
-
-    return best_label, suggestion
+_gemini_ranker: Optional["LLMRanker"] = None
+
+
+def choose_with_gemini(candidates: Dict[str, Dict]) -> "Verdict":
+    # o ranqueador (e o cliente do Gemini) é criado uma vez e reaproveitado;
+    # sem API key ou com falha na chamada, vale o melhor score de n-gramas
+    global _gemini_ranker
+    if _gemini_ranker is None:
+        from ranqueamento import gemini_ranker
+        _gemini_ranker = gemini_ranker(GEMINI_API_KEY, verbose=True)
+    return _gemini_ranker.choose(candidates)
 
 
 def main():
-    # 10 TEST CASES (UNCOMMENT ONE TO TEST)
-    # ciphertext = "UQTHERBICKOFOWNPMXJUEVEDOLERTHODAZYG"
-    # ciphertext = "QBFMELOHCWJOHYUROPRAGTIOXSTZEKNUVED"
+    # outros casos de teste em exemplos/permutacao.jsonl (rodar com lote.py)
     ciphertext = "ROTOMTAROWRBTHEFOEAKTNDAWLIHESOEENCMEFTHATOUNIWINSSELLBETHATHTREDOOETRLIPSWAVLADNINCEICPREROSEFOIMATDINGUWYEDBOSEEKVRFSUALEILNANCEARDSTTYTEGITHESERLLGWYYSKERILLTCFLEETTHENONSIIRCAREYEDBOSACHRELDINONOTEHLYTHGWEIHTTOFEWEIRSNAPOHTBUTGIEWETFHTOSIHEHTYTORSIHATTUABOWETOBETRITN"
-    # ciphertext = "ETHTATKACTISOOMORRW"
-    # ciphertext = "ESSNWFRRETTLTEEHHELTUBDAAHAIIER"
-    # ciphertext = "LIIWTTLATKACONHEBHRTBEASAEEROTDYAVADAENCNITNMEP"
-    # ciphertext = "ANBAASNAEYREWOLLOLCOTDREIPROFLCATIRUDISWCYELUSONADMENUROEHDTLRWORODFIETHEWRSLFETROAVSDANTTOFUTEXHTRERAEYROEBLNNIEGARCNBUOSHENANBTAANSEREADANNKRETNOWAEOBAEGRUOTSOERCENFEAYRGOPNDSSTAAMIULESWESLANESSLATIATVISNMITRFOOBHENIDYIDADNOTIEBTOEGINNEATWWRARNHETEIPCYHEEBANDEUSACINSSKETOMOSEHIVDANOIARUCUSANLIERRYEPCIIESBVANGASERELTINDANIRUTUOTIOOSFRODFPOPEFOLEKLALSDIN"
-    # ciphertext = "AIVTIUACOOLTAOTNDESNLSNPI"
-    # ciphertext = "WETHWDINPSHIDEERORTHTHUGMEHESYPTEETRSATSKSDUTTSEIDLETSNACYRAADATDERTWTBETNEEHSHEWOADAESSIHRCOFNGRARWSHMTWEOMERHEHTINSIEDCNTASUEMCEICDEHONIFALYTLAEIKOMMERTRYGNYITTNODAOFNOETTHIGTLFEFFDINEERISTAEHFTLRWOSADWEIQUPYTLAPREGNRISRFOTEOMGNHIESUNEN"
-    # ciphertext = "NAAMOOSTOLDATANEEETHOEDGEHFTREPITACOLLBINIOWTNGIASHEWYLTHDINTAEWDECHHETHZIORSAONAWIFNIITROGFNAANRESWYLONSETHOCEAGDULNEIVENOOWEKNNSHIBEAMVEUTOYEREFNEIHLTLISSECEN"
 
     script_dir = Path(__file__).parent
     ngram_file = script_dir / 'quadgrams.txt'
@@ -290,8 +351,13 @@ def main():
         print(f"Erro: Arquivo de n-gramas não encontrado em '{ngram_file}'!")
         sys.exit(1)
 
+    # QUEBRA_TRACE=trace.json grava a telemetria da busca (ver telemetria.py)
+    trace_file = os.environ.get("QUEBRA_TRACE")
+    trace = TraceRecorder()
+    telemetry = Telemetry(trace, ProgressPrinter()) if trace_file else None
+
     scorer = NgramScorer(str(ngram_file))
-    breaker = PermutationBreaker(scorer)
+    breaker = PermutationBreaker(scorer, telemetry=telemetry)
 
     print("=" * 80)
     print("QUEBRADOR DE PERMUTAÇÃO (COLUNAR + BLOCOS)")
@@ -299,44 +365,26 @@ def main():
     print(f"Ciphertext: {ciphertext}")
     print(f"Len: {len(ciphertext)} caracteres")
 
-    min_key_len = 2
-    max_key_len = 10
-    candidates: Dict[str, Dict] = {}
-
-    for key_len in range(min_key_len, max_key_len + 1):
-        print(f"\n=== Testando key_len = {key_len} ===")
+    families = rank_cipher_families(ciphertext)
+    print("Família provável: " + ", ".join(f"{name}={weight:.2f}" for name, weight in families))
+    if families[0][0] != "transposition":
+        print("⚠️ Aviso: as frequências de letras não parecem de uma transposição do inglês.")
 
-        text_col, key_col, score_col = breaker.break_columnar(ciphertext, key_len)
-        label_col = f"columnar_{key_len}"
-        candidates[label_col] = {
-            "mode": "columnar",
-            "key_len": key_len,
-            "key": key_col,
-            "text": text_col,
-            "score": score_col,
-        }
-        print(f"[COLUNAR] score={score_col:.2f}, key={key_col}, preview={text_col[:60]}")
+    candidates = break_transposition_sweep(breaker, ciphertext, verbose=True, top_candidates=4)
+    if trace_file:
+        trace.save(trace_file)
+        print(f"[INFO] Telemetria gravada em: {trace_file}")
 
-        text_blk, key_blk, score_blk = breaker.break_block(ciphertext, key_len)
-        label_blk = f"block_{key_len}"
-        candidates[label_blk] = {
-            "mode": "block",
-            "key_len": key_len,
-            "key": key_blk,
-            "text": text_blk,
-            "score": score_blk,
-        }
-        print(f"[BLOCOS ] score={score_blk:.2f}, key={key_blk}, preview={text_blk[:60]}")
-
-    best_label = None
-    suggestion = None
     try:
-        best_label, suggestion = choose_with_gemini(candidates)
-        print("\n✅ Gemini usado para escolha do melhor candidato.")
-    except Exception as e:
-        print(f"\n⚠️ Falha ao usar Gemini ({e}). Usando melhor score de n-gramas.")
+        best_label, suggestion, source = choose_with_gemini(candidates)
+    except RuntimeError as e:
         best_label = max(candidates.keys(), key=lambda lab: candidates[lab]["score"])
-        suggestion = candidates[best_label]["text"]
+        suggestion, source = candidates[best_label]["text"], "ngram"
+        print(f"\n⚠️ {e}")
+    if source == "ngram":
+        print("\n⚠️ Gemini não usado. Usando melhor score de n-gramas.")
+    else:
+        print("\n✅ Gemini usado para escolha do melhor candidato.")
 
     best = candidates[best_label]
 
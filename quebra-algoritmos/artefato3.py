@@ -0,0 +1,376 @@
+import os
+import random
+import sys
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analise import digraphic_coincidences
+from artefato1 import EnglishScorer, HillClimbDecoder, SimulatedAnnealingDecoder, SubstitutionCipher
+from artefato2 import NgramScorer, PermutationBreaker
+from ngramas import ALPHABET_SIZE
+from transposicao import (
+    EXACT_MAX_LENGTH,
+    TranspositionKeySearch,
+    array_to_text,
+    held_karp_paths,
+    normalize_ciphertext,
+    transposition_encrypt,
+    transposition_permutations,
+    text_to_array,
+)
+
+# Quebra de cifras combinadas: substituição monoalfabética + transposição
+# (colunar ou blocos, como no artefato 2). As duas operações comutam, então o
+# texto cifrado é T(S(claro)) e desfazer só a transposição deixa uma cifra de
+# substituição comum.
+#
+# A busca é aninhada, mas sem multiplicar os custos:
+#   1. busca externa (barata): chaves de transposição pontuadas pelas
+#      coincidências de bigramas, que não mudam com a substituição; serve
+#      também para podar os (modo, tamanho) menos promissores;
+#   2. busca interna rápida: subida de encosta de Jakobsen (HillClimbDecoder)
+#      em cada candidato, com cache pelo texto destransposto;
+#   3. alternância: com a chave de substituição estimada, o texto vira uma
+#      transposição pura, resolvida pela busca exata do artefato 2; repete
+#      enquanto o score melhorar;
+#   4. recozimento (SimulatedAnnealingDecoder) só no melhor candidato.
+# Os (modo, tamanho) que sobram da poda podem rodar em processos separados.
+# Com `should_stop` (prazo ou cancelamento do lote/serviço), cada etapa para
+# no próximo ponto de consulta e o resultado é o melhor até ali (sempre há
+# pelo menos um candidato resolvido).
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_QUADGRAMS = SCRIPT_DIR / "quadgrams.txt"
+
+# rodadas da aproximação linear das coincidências na busca exata
+ISOMORPH_DP_ROUNDS = 4
+INNER_CACHE_SIZE = 512
+# com processos, intervalo (s) entre consultas a should_stop
+STOP_POLL_INTERVAL = 0.1
+
+_worker_breaker: Optional["CombinedBreaker"] = None
+
+
+class CombinedResult(NamedTuple):
+    mode: str
+    key_len: int
+    transposition_key: List[int]
+    substitution_key: str
+    score: float
+    plaintext: str
+
+
+class IsomorphKeySearch(TranspositionKeySearch):
+    # Chaves de transposição que maximizam as coincidências de bigramas do
+    # texto destransposto. Nos layouts de tamanho fixo, a busca exata por
+    # caminho hamiltoniano (Held-Karp) usa uma aproximação linear do objetivo:
+    # o peso do par (a, b) é o produto do histograma de bigramas do par pelo
+    # histograma total do melhor caminho da rodada anterior. Os candidatos são
+    # refinados por subida de encosta (trocas e deslocamentos de uma posição),
+    # e reinícios aleatórios cobrem o colunar irregular e as chaves longas.
+
+    def __init__(self, table, ciphertext: str, key_length: int, mode: str):
+        super().__init__(table, ciphertext, key_length, mode)
+        self.chars = text_to_array(ciphertext)
+
+    def untranspose(self, keys) -> np.ndarray:
+        return self.codes[transposition_permutations(self.mode, len(self.codes), keys)]
+
+    def untranspose_text(self, key: List[int]) -> str:
+        return array_to_text(self.chars[transposition_permutations(self.mode, len(self.chars), key)[0]])
+
+    def score_keys(self, keys) -> np.ndarray:
+        return digraphic_coincidences(self.untranspose(keys))
+
+    def _pair_histograms(self) -> np.ndarray:
+        units = self.codes[self._unit_positions()]
+        n, size = self.n, (ALPHABET_SIZE + 1) ** 2
+        pairs = units[:, None, :] * (ALPHABET_SIZE + 1) + units[None, :, :]
+        offsets = size * np.arange(n * n).reshape(n, n, 1)
+        hist = np.bincount((pairs + offsets).ravel(), minlength=size * n * n).reshape(n, n, size)
+        # pares com não-letras não contam
+        letters = np.arange(size) // (ALPHABET_SIZE + 1) < ALPHABET_SIZE
+        letters &= np.arange(size) % (ALPHABET_SIZE + 1) < ALPHABET_SIZE
+        return hist * letters
+
+    def adjacency_paths(self, rounds: int = ISOMORPH_DP_ROUNDS, per_round: int = 4) -> List[List[int]]:
+        hist = self._pair_histograms().astype(np.float64)
+        adjacency = (hist * (hist - 1)).sum(axis=2)
+        paths: List[List[int]] = []
+        for _ in range(rounds):
+            np.fill_diagonal(adjacency, -np.inf)
+            found = held_karp_paths(adjacency)
+            paths.extend(found[:per_round])
+            best = found[0]
+            total = sum(hist[a, b] for a, b in zip(best, best[1:]))
+            adjacency = hist @ total
+        return paths
+
+    def _neighbours(self, key: List[int]) -> np.ndarray:
+        n = self.n
+        moves = []
+        for i in range(n):
+            rest = key[:i] + key[i + 1:]
+            for j in range(n):
+                if j != i:
+                    moves.append(rest[:j] + [key[i]] + rest[j:])
+        for i in range(n):
+            for j in range(i + 1, n):
+                swapped = key[:]
+                swapped[i], swapped[j] = key[j], key[i]
+                moves.append(swapped)
+        return np.array(moves)
+
+    def ascend(self, key: List[int]) -> Tuple[List[int], int]:
+        key = list(key)
+        current = int(self.score_keys([key])[0])
+        while True:
+            neighbours = self._neighbours(key)
+            scores = self.score_keys(neighbours)
+            best = int(scores.argmax())
+            if scores[best] <= current:
+                return key, current
+            key, current = neighbours[best].tolist(), int(scores[best])
+
+    def candidates(self, restarts: int = 8, limit: Optional[int] = None,
+                   rng: Optional[random.Random] = None) -> List[Tuple[List[int], int]]:
+        # (chave, coincidências), da melhor para a pior, sem textos repetidos
+        rng = rng or random.Random()
+        starts: List[List[int]] = []
+        if not self.ragged and self.n <= EXACT_MAX_LENGTH:
+            starts.extend(self.adjacency_paths())
+        starts.extend(rng.sample(range(self.n), self.n) for _ in range(restarts))
+
+        found: Dict[bytes, Tuple[List[int], int]] = {}
+        for start in starts:
+            key, score = self.ascend(start)
+            text = self.untranspose([key])[0].tobytes()
+            if text not in found or found[text][1] < score:
+                found[text] = (key, score)
+        ranked = sorted(found.values(), key=lambda item: -item[1])
+        return ranked[:limit] if limit is not None else ranked
+
+
+class CombinedBreaker:
+    def __init__(
+        self,
+        quadgram_file: str = str(DEFAULT_QUADGRAMS),
+        outer_candidates: int = 6,
+        restarts: int = 8,
+        rounds: int = 3,
+        workers: int = 1,
+        random_seed: Optional[int] = None,
+        **decoder_kwargs,
+    ):
+        self.quadgram_file = quadgram_file
+        self.scorer = EnglishScorer(quadgram_file, verbose=False)
+        self.permutation_breaker = PermutationBreaker(NgramScorer(quadgram_file))
+        self.outer_candidates = outer_candidates
+        self.restarts = restarts
+        self.rounds = rounds
+        self.workers = workers
+        self.random_seed = random_seed
+        self.decoder_kwargs = decoder_kwargs
+        self.rng = random.Random(random_seed)
+        self._inner_cache: "OrderedDict[str, Tuple[List[str], float]]" = OrderedDict()
+
+    def _inner(self, text: str) -> Tuple[List[str], float]:
+        # subida de encosta na substituição, em cache pelo texto destransposto
+        # (chaves diferentes, como blocos de 5 e de 10, dão o mesmo texto)
+        cached = self._inner_cache.get(text)
+        if cached is not None:
+            self._inner_cache.move_to_end(text)
+            return cached
+        key, score, _ = HillClimbDecoder(text, self.scorer, random_seed=self.rng.getrandbits(32)).run()
+        self._inner_cache[text] = (key, score)
+        if len(self._inner_cache) > INNER_CACHE_SIZE:
+            self._inner_cache.popitem(last=False)
+        return key, score
+
+    def outer_search(self, ciphertext: str, key_len: int, mode: str) -> List[Tuple[List[int], int]]:
+        search = IsomorphKeySearch(self.scorer.quadgrams, ciphertext, key_len, mode)
+        return search.candidates(self.restarts, self.outer_candidates, self.rng)
+
+    def solve(self, ciphertext: str, key_len: int, mode: str,
+              outer: Optional[List[Tuple[List[int], int]]] = None, polish: bool = True,
+              should_stop: Optional[Callable[[], bool]] = None) -> CombinedResult:
+        stopped = should_stop if should_stop is not None else lambda: False
+        ciphertext = normalize_ciphertext(ciphertext)
+        search = IsomorphKeySearch(self.scorer.quadgrams, ciphertext, key_len, mode)
+        if outer is None:
+            outer = search.candidates(self.restarts, self.outer_candidates, self.rng)
+
+        # busca interna rápida em cada candidato externo
+        best_tkey, best_skey, best_score = None, None, float("-inf")
+        for tkey, _ in outer:
+            if best_tkey is not None and stopped():
+                break
+            skey, score = self._inner(search.untranspose_text(tkey))
+            if score > best_score:
+                best_tkey, best_skey, best_score = tkey, skey, score
+
+        # alternância: com a substituição estimada, resolve a transposição
+        # pura pela busca exata do artefato 2 e refaz a substituição
+        if key_len <= EXACT_MAX_LENGTH:
+            breaker_fn = (self.permutation_breaker.break_columnar if mode == "columnar"
+                          else self.permutation_breaker.break_block)
+            for _ in range(self.rounds):
+                if stopped():
+                    break
+                _, tkey, _ = breaker_fn(SubstitutionCipher(best_skey).decrypt(ciphertext), key_len, should_stop)
+                skey, score = self._inner(search.untranspose_text(tkey))
+                if score <= best_score + 1e-9:
+                    break
+                best_tkey, best_skey, best_score = list(tkey), skey, score
+
+        text = search.untranspose_text(best_tkey)
+        result = CombinedResult(mode, key_len, list(best_tkey), "".join(best_skey), best_score,
+                                SubstitutionCipher(best_skey).decrypt(text))
+        return self.polish(ciphertext, result, should_stop) if polish else result
+
+    def polish(self, ciphertext: str, result: CombinedResult,
+               should_stop: Optional[Callable[[], bool]] = None) -> CombinedResult:
+        # recozimento na substituição, com a transposição fixa; caro, então
+        # `run` só o aplica ao melhor candidato
+        if should_stop is not None and should_stop():
+            return result
+        chars = text_to_array(normalize_ciphertext(ciphertext))
+        perm = transposition_permutations(result.mode, len(chars), result.transposition_key)[0]
+        text = array_to_text(chars[perm])
+        decoder = SimulatedAnnealingDecoder(
+            ciphertext=text,
+            scorer=self.scorer,
+            random_seed=self.rng.getrandbits(32),
+            should_stop=should_stop,
+            **self.decoder_kwargs,
+        )
+        key, score, plaintext = decoder.run()
+        if score <= result.score:
+            return result
+        return result._replace(substitution_key="".join(key), score=score, plaintext=plaintext)
+
+    def rank_lengths(self, ciphertext: str, min_key_len: int = 2, max_key_len: int = 10,
+                     modes: Sequence[str] = ("columnar", "block"),
+                     should_stop: Optional[Callable[[], bool]] = None) -> List[Tuple[str, int, List]]:
+        # (modo, tamanho, candidatos externos), do mais para o menos promissor;
+        # interrompida, só os (modo, tamanho) já pontuados
+        ciphertext = normalize_ciphertext(ciphertext)
+        ranked = []
+        for mode in modes:
+            for key_len in range(min_key_len, max_key_len + 1):
+                if ranked and should_stop is not None and should_stop():
+                    break
+                outer = self.outer_search(ciphertext, key_len, mode)
+                ranked.append((mode, key_len, outer))
+        ranked.sort(key=lambda item: (-item[2][0][1], item[1]))
+        return ranked
+
+    def run(
+        self,
+        ciphertext: str,
+        min_key_len: int = 2,
+        max_key_len: int = 10,
+        modes: Sequence[str] = ("columnar", "block"),
+        top_lengths: int = 4,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> List[CombinedResult]:
+        stopped = should_stop if should_stop is not None else lambda: False
+        ciphertext = normalize_ciphertext(ciphertext)
+        ranked = self.rank_lengths(ciphertext, min_key_len, max_key_len, modes, should_stop)[:top_lengths]
+        jobs = [(ciphertext, key_len, mode, outer, False) for mode, key_len, outer in ranked]
+
+        results: List[CombinedResult] = []
+        if self.workers > 1 and len(jobs) > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=min(self.workers, len(jobs)),
+                initializer=_init_worker,
+                initargs=(self.quadgram_file, self.outer_candidates, self.restarts, self.rounds,
+                          self.rng.getrandbits(32), self.decoder_kwargs),
+            )
+            interrupted = False
+            try:
+                pending = {executor.submit(_solve_in_worker, job) for job in jobs}
+                while pending:
+                    done, pending = wait(pending, timeout=STOP_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                    results.extend(future.result() for future in done)
+                    if results and pending and stopped():
+                        # os que não começaram são cancelados; os que já rodam
+                        # terminam sozinhos no worker, sem esperar por eles
+                        for future in pending:
+                            future.cancel()
+                        interrupted = True
+                        break
+            finally:
+                executor.shutdown(wait=not interrupted)
+        else:
+            for job in jobs:
+                if results and stopped():
+                    break
+                results.append(self.solve(*job, should_stop=should_stop))
+        results.sort(key=lambda r: r.score, reverse=True)
+        results[0] = self.polish(ciphertext, results[0], should_stop)
+        return results
+
+
+def _init_worker(quadgram_file, outer_candidates, restarts, rounds, seed, decoder_kwargs):
+    global _worker_breaker
+    _worker_breaker = CombinedBreaker(
+        quadgram_file, outer_candidates, restarts, rounds, workers=1, random_seed=seed, **decoder_kwargs
+    )
+
+
+def _solve_in_worker(job) -> CombinedResult:
+    return _worker_breaker.solve(*job)
+
+
+def combined_encrypt(plaintext: str, substitution_key: List[str], transposition_key: List[int], mode: str) -> str:
+    return transposition_encrypt(SubstitutionCipher(substitution_key).encrypt(normalize_ciphertext(plaintext)),
+                                 transposition_key, mode)
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            ciphertext = f.read()
+    else:
+        # exemplo: trecho de exemplos/corpus_ingles.txt cifrado com uma
+        # substituição aleatória e transposição colunar de 7 colunas
+        rng = random.Random(3)
+        with open(SCRIPT_DIR / "exemplos" / "corpus_ingles.txt", "r", encoding="utf-8") as f:
+            sample = "".join(ch for ch in f.read() if ch.isalpha())[:420]
+        key = list(range(7))
+        rng.shuffle(key)
+        ciphertext = combined_encrypt(sample, SubstitutionCipher.random_key(rng), key, "columnar")
+
+    breaker = CombinedBreaker(workers=min(4, os.cpu_count() or 1), random_seed=0)
+
+    print("=" * 80)
+    print("QUEBRADOR COMBINADO (SUBSTITUIÇÃO + PERMUTAÇÃO)")
+    print("=" * 80)
+    print(f"Ciphertext: {normalize_ciphertext(ciphertext)[:120]}...")
+
+    results = breaker.run(ciphertext)
+    for r in results:
+        print(f"[{r.mode:<8}] key_len={r.key_len}, score={r.score:.2f}, key={r.transposition_key}, "
+              f"preview={r.plaintext[:50]}")
+
+    best = results[0]
+    print("\n" + "=" * 80)
+    print("🎯 MELHOR CANDIDATO ENCONTRADO")
+    print("=" * 80)
+    print(f"Tipo de transposição: {best.mode}")
+    print(f"Tamanho da chave: {best.key_len}")
+    print(f"Chave de transposição: {best.transposition_key}")
+    print(f"Chave de substituição:\n{SubstitutionCipher.pretty_print_key(list(best.substitution_key))}")
+    print(f"Score: {best.score:.2f}")
+    print("\nTexto decifrado:\n")
+    print(best.plaintext)
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
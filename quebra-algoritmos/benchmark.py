@@ -0,0 +1,257 @@
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from artefato1 import EnglishScorer, HillClimbDecoder, SimulatedAnnealingDecoder, SubstitutionCipher
+from artefato2 import NgramScorer, PermutationBreaker
+from transposicao import transposition_encrypt
+
+# Benchmark dos dois quebradores sobre cifras sintéticas com semente fixa:
+# trechos do corpus em exemplos/ são cifrados com chaves aleatórias e
+# quebrados de novo. O resultado (vazão, latência e taxa de acerto por
+# cenário) vai para um JSON, para comparar antes/depois de mudanças.
+# O tempo de partida (importar os módulos, `quebra.py --help`, carregar a
+# tabela de quadgramas) é medido em processos novos e vai junto, em "startup".
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_CORPUS = SCRIPT_DIR / "exemplos" / "corpus_ingles.txt"
+DEFAULT_QUADGRAMS = SCRIPT_DIR / "quadgrams.txt"
+
+SUBSTITUTION_LENGTHS = (100, 300, 1000)
+TRANSPOSITION_LENGTHS = (100, 300)
+TRANSPOSITION_KEY_LENGTHS = (6, 10, 14)
+# comandos medidos no tempo de partida; o interpretador vazio é descontado
+STARTUP_COMMANDS = {
+    "help": ["quebra.py", "--help"],
+    "import_quebra": ["-c", "import quebra"],
+    "import_artefato1": ["-c", "import artefato1"],
+    "import_artefato2": ["-c", "import artefato2"],
+    "import_lote": ["-c", "import lote"],
+    "load_quadgrams": ["-c", "import sys, artefato1; artefato1.EnglishScorer(sys.argv[1], verbose=False).quadgrams"],
+}
+
+
+def load_corpus(path: Path) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return " ".join(f.read().split())
+
+
+def sample_plaintext(corpus: str, n_letters: int, rng: random.Random) -> str:
+    # trecho contíguo do corpus com `n_letters` letras (pontuação preservada)
+    positions = [i for i, ch in enumerate(corpus) if ch.isalpha()]
+    if n_letters > len(positions):
+        raise ValueError(f"Corpus tem só {len(positions)} letras.")
+    first = rng.randrange(len(positions) - n_letters + 1)
+    return corpus[positions[first]:positions[first + n_letters - 1] + 1]
+
+
+def letter_accuracy(found: str, expected: str) -> float:
+    found = [ch for ch in found.upper() if ch.isalpha()]
+    expected = [ch for ch in expected.upper() if ch.isalpha()]
+    if not expected:
+        return 1.0
+    hits = sum(1 for a, b in zip(found, expected) if a == b)
+    return hits / len(expected)
+
+
+def summarize(name: str, params: Dict, latencies: List[float], accuracies: List[float],
+              iterations: Optional[List[int]] = None) -> Dict:
+    lat = np.array(latencies)
+    summary = {
+        "scenario": name,
+        **params,
+        "trials": len(latencies),
+        "success_rate": float(np.mean([acc >= 0.99 for acc in accuracies])),
+        "accuracy_mean": float(np.mean(accuracies)),
+        "latency_mean": float(lat.mean()),
+        "latency_p50": float(np.percentile(lat, 50)),
+        "latency_p90": float(np.percentile(lat, 90)),
+        "latency_p99": float(np.percentile(lat, 99)),
+        "throughput_per_sec": float(len(lat) / lat.sum()) if lat.sum() > 0 else None,
+    }
+    if iterations is not None:
+        summary["iterations_per_sec"] = float(sum(iterations) / lat.sum())
+    return summary
+
+
+def bench_substitution(scorer: EnglishScorer, corpus: str, lengths, trials: int, seed: int,
+                       iterations_per_temp: int, search: str = "annealing") -> List[Dict]:
+    results = []
+    prefix = "substitution" if search == "annealing" else f"substitution_{search}"
+    for length in lengths:
+        rng = random.Random(f"substitution:{seed}:{length}")
+        latencies, accuracies, iterations = [], [], []
+        for trial in range(trials):
+            plaintext = sample_plaintext(corpus, length, rng)
+            key = SubstitutionCipher.random_key(rng)
+            ciphertext = SubstitutionCipher(key).encrypt(plaintext)
+
+            if search == "hillclimb":
+                decoder = HillClimbDecoder(ciphertext, scorer, random_seed=rng.getrandbits(32))
+            else:
+                decoder = SimulatedAnnealingDecoder(
+                    ciphertext=ciphertext,
+                    scorer=scorer,
+                    iterations_per_temp=iterations_per_temp,
+                    random_seed=rng.getrandbits(32),
+                )
+            started = time.perf_counter()
+            _, _, found = decoder.run()
+            latencies.append(time.perf_counter() - started)
+            accuracies.append(letter_accuracy(found, plaintext))
+            iterations.append(decoder.iterations_run)
+
+        params = {"breaker": type(decoder).__name__, "length": length}
+        if search == "annealing":
+            params["iterations_per_temp"] = iterations_per_temp
+        results.append(summarize(f"{prefix}_{length}", params, latencies, accuracies, iterations))
+    return results
+
+
+def bench_transposition(breaker: PermutationBreaker, corpus: str, lengths, key_lengths,
+                        trials: int, seed: int) -> List[Dict]:
+    results = []
+    for mode in ("columnar", "block"):
+        breaker_fn = breaker.break_columnar if mode == "columnar" else breaker.break_block
+        for length in lengths:
+            for key_length in key_lengths:
+                rng = random.Random(f"{mode}:{seed}:{length}:{key_length}")
+                latencies, accuracies = [], []
+                for trial in range(trials):
+                    plaintext = "".join(ch for ch in sample_plaintext(corpus, length, rng) if ch.isalpha()).upper()
+                    key = list(range(key_length))
+                    rng.shuffle(key)
+                    ciphertext = transposition_encrypt(plaintext, key, mode)
+
+                    started = time.perf_counter()
+                    found, _, _ = breaker_fn(ciphertext, key_length)
+                    latencies.append(time.perf_counter() - started)
+                    accuracies.append(letter_accuracy(found, plaintext))
+
+                params = {"breaker": "PermutationBreaker", "mode": mode,
+                          "length": length, "key_length": key_length}
+                results.append(summarize(f"{mode}_{length}_k{key_length}", params, latencies, accuracies))
+    return results
+
+
+def run_seconds(args: List[str]) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=SCRIPT_DIR, capture_output=True, check=True)
+    return time.perf_counter() - started
+
+
+def bench_startup(trials: int, quadgrams: str) -> List[Dict]:
+    # melhor de `trials` processos (o mínimo é o menos sujeito a ruído),
+    # menos o interpretador vazio: sobra o custo dos nossos imports
+    bare = min(run_seconds(["-c", "pass"]) for _ in range(trials))
+    results = []
+    for name, args in STARTUP_COMMANDS.items():
+        if name == "load_quadgrams":
+            args = [*args, quadgrams]
+        seconds = [run_seconds(args) for _ in range(trials)]
+        results.append({
+            "scenario": f"startup_{name}",
+            "trials": trials,
+            "seconds_min": min(seconds),
+            "seconds_p50": float(np.percentile(seconds, 50)),
+            "overhead": min(seconds) - bare,
+        })
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR,
+                             capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(current: List[Dict], startup: List[Dict], baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    baseline = {r["scenario"]: r for r in report["results"] + report.get("startup", [])}
+    if startup:
+        print(f"\n{'cenário':<28}{'antes (ms)':>12}{'agora (ms)':>12}")
+        for r in startup:
+            old = baseline.get(r["scenario"])
+            if old is not None:
+                print(f"{r['scenario']:<28}{old['overhead'] * 1000:>12.1f}{r['overhead'] * 1000:>12.1f}")
+    if not current:
+        return
+    print(f"\n{'cenário':<28}{'p50 antes':>12}{'p50 agora':>12}{'acerto antes':>14}{'acerto agora':>14}")
+    for r in current:
+        old = baseline.get(r["scenario"])
+        if old is None:
+            continue
+        print(f"{r['scenario']:<28}{old['latency_p50']:>12.4f}{r['latency_p50']:>12.4f}"
+              f"{old['success_rate']:>14.2f}{r['success_rate']:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos quebradores de substituição e permutação.")
+    parser.add_argument("-o", "--saida", default="benchmark.json")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations-per-temp", type=int, default=100)
+    parser.add_argument("--only", choices=("substitution", "transposition", "startup"))
+    parser.add_argument("--search", choices=("annealing", "hillclimb"), default="annealing",
+                        help="busca usada nos cenários de substituição")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS))
+    parser.add_argument("--quadgrams", default=str(DEFAULT_QUADGRAMS))
+    args = parser.parse_args()
+
+    corpus = load_corpus(Path(args.corpus))
+    results: List[Dict] = []
+
+    if args.only in (None, "substitution"):
+        scorer = EnglishScorer(args.quadgrams, verbose=False)
+        results += bench_substitution(scorer, corpus, SUBSTITUTION_LENGTHS, args.trials,
+                                      args.seed, args.iterations_per_temp, args.search)
+    if args.only in (None, "transposition"):
+        breaker = PermutationBreaker(NgramScorer(args.quadgrams))
+        results += bench_transposition(breaker, corpus, TRANSPOSITION_LENGTHS,
+                                       TRANSPOSITION_KEY_LENGTHS, args.trials, args.seed)
+    # processos novos: o tempo de partida não depende das cifras nem da semente
+    startup = bench_startup(max(args.trials, 10), args.quadgrams) if args.only in (None, "startup") else []
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "trials": args.trials,
+        },
+        "results": results,
+        "startup": startup,
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for r in results:
+        print(f"{r['scenario']:<28} acerto={r['success_rate']:.2f} "
+              f"p50={r['latency_p50']:.4f}s p90={r['latency_p90']:.4f}s")
+    for r in startup:
+        print(f"{r['scenario']:<28} {r['seconds_min'] * 1000:.1f} ms "
+              f"(+{r['overhead'] * 1000:.1f} ms sobre o interpretador)")
+    print(f"\n[INFO] Resultados gravados em: {args.saida}")
+
+    if args.baseline:
+        compare(results, startup, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
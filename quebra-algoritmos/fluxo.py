@@ -0,0 +1,186 @@
+import random
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from artefato1 import ALPHABET, CompiledKey, EnglishScorer, SimulatedAnnealingDecoder, SubstitutionCipher
+from ngramas import (
+    ALPHABET_SIZE,
+    QUADGRAM_TABLE_SIZE,
+    QuadgramCountObjective,
+    count_quadgrams,
+    decode_letters,
+    encode_letters,
+)
+
+# Quebra de substituição para textos cifrados grandes demais para a memória.
+# Uma única passada pelo arquivo gera as estatísticas (contagem de letras e de
+# quadgramas cifrados) e uma amostra de trechos só com letras; a busca roda na
+# amostra e é refinada sobre as contagens, e a decifração final é feita em
+# blocos, preservando maiúsculas/minúsculas, pontuação e quebras de linha.
+#
+# A fonte é um caminho ou um iterável de blocos de texto. run() lê a fonte uma
+# vez e decrypt() lê de novo: um iterador de uma passada só (gerador, arquivo
+# aberto) serve para run() ou para decrypt(), não para os dois.
+
+Source = Union[str, Path, Iterable[str]]
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def iter_chunks(source: Source, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    if isinstance(source, (str, Path)):
+        # newline="": "\r\n" passa intacto para a decifração
+        with open(source, "r", encoding="utf-8", errors="replace", newline="") as f:
+            for chunk in iter(lambda: f.read(chunk_size), ""):
+                yield chunk
+    else:
+        yield from source
+
+
+class CiphertextStatistics:
+    def __init__(self, sample_letters: int = 5000, segment_letters: int = 500, random_seed: Optional[int] = None):
+        self.letter_counts = np.zeros(ALPHABET_SIZE, dtype=np.int64)
+        self.quadgram_counts = np.zeros(QUADGRAM_TABLE_SIZE, dtype=np.int64)
+        self.total_letters = 0
+
+        # amostragem por reservatório de trechos contíguos de letras: a amostra
+        # cobre o arquivo inteiro sem saber o tamanho dele de antemão
+        self.segment_letters = segment_letters
+        self.max_segments = max(1, sample_letters // segment_letters)
+        self.segments: List[np.ndarray] = []
+        self._segments_seen = 0
+        self._partial = np.zeros(0, dtype=np.uint8)
+        self._carry = np.zeros(0, dtype=np.uint8)
+        self._rng = random.Random(random_seed)
+
+    def update(self, chunk: str):
+        letters = encode_letters(chunk)
+        if not len(letters):
+            return
+        self.letter_counts += np.bincount(letters, minlength=ALPHABET_SIZE)
+        self.total_letters += len(letters)
+
+        # quadgramas que atravessam a fronteira entre blocos usam as 3 últimas
+        # letras do bloco anterior
+        window = np.concatenate([self._carry, letters])
+        self.quadgram_counts += count_quadgrams(window)
+        self._carry = window[-3:]
+
+        self._sample(letters)
+
+    def _sample(self, letters: np.ndarray):
+        buffer = np.concatenate([self._partial, letters])
+        n_full = len(buffer) // self.segment_letters
+        for k in range(n_full):
+            segment = buffer[k * self.segment_letters:(k + 1) * self.segment_letters].copy()
+            self._segments_seen += 1
+            if len(self.segments) < self.max_segments:
+                self.segments.append(segment)
+            else:
+                slot = self._rng.randrange(self._segments_seen)
+                if slot < self.max_segments:
+                    self.segments[slot] = segment
+        self._partial = buffer[n_full * self.segment_letters:]
+
+    def sample_text(self) -> str:
+        # as poucas janelas que cruzam a junção entre trechos têm efeito desprezível
+        segments = self.segments or [self._partial]
+        return "".join(decode_letters(seg) for seg in segments)
+
+
+def key_translation(key: List[str]) -> dict:
+    return CompiledKey(key).translation_table()
+
+
+def decrypt_stream(source: Source, key: List[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    table = key_translation(key)
+    for chunk in iter_chunks(source, chunk_size):
+        yield chunk.translate(table)
+
+
+class StreamingSubstitutionBreaker:
+    def __init__(
+        self,
+        scorer: EnglishScorer,
+        sample_letters: int = 5000,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        random_seed: Optional[int] = None,
+        restarts: int = 3,
+        **decoder_kwargs,
+    ):
+        if not scorer.using_quadgrams:
+            raise ValueError("O modo streaming precisa do modelo de quadgramas.")
+        self.scorer = scorer
+        self.sample_letters = sample_letters
+        self.chunk_size = chunk_size
+        self.random_seed = random_seed
+        self.restarts = restarts
+        self.decoder_kwargs = decoder_kwargs
+        self.statistics: Optional[CiphertextStatistics] = None
+        # iterador de uma passada já consumido por collect()
+        self._consumed: Optional[Iterable[str]] = None
+
+    def collect(self, source: Source) -> CiphertextStatistics:
+        stats = CiphertextStatistics(self.sample_letters, random_seed=self.random_seed)
+        for chunk in iter_chunks(source, self.chunk_size):
+            stats.update(chunk)
+        self.statistics = stats
+        if not isinstance(source, (str, Path)) and iter(source) is source:
+            self._consumed = source
+        return stats
+
+    def run(self, source: Source) -> Tuple[List[str], float]:
+        # devolve a chave e o score de quadgramas do texto inteiro
+        stats = self.collect(source)
+        sample = stats.sample_text()
+        objective = QuadgramCountObjective(stats.quadgram_counts, self.scorer.quadgrams)
+        seeds = random.Random(self.random_seed)
+
+        # cada reinício recozido na amostra é refinado sobre as contagens; fica
+        # a chave de maior score no texto inteiro
+        best_perm, best_score = None, float("-inf")
+        for _ in range(max(1, self.restarts)):
+            decoder = SimulatedAnnealingDecoder(
+                ciphertext=sample,
+                scorer=self.scorer,
+                random_seed=seeds.getrandbits(32),
+                **self.decoder_kwargs,
+            )
+            sample_key, _, _ = decoder.run()
+            perm = np.array([ord(ch) - ord('A') for ch in sample_key])
+            perm, score = objective.hill_climb(perm)
+            if score > best_score:
+                best_perm, best_score = perm, score
+        return [ALPHABET[p] for p in best_perm], best_score
+
+    def decrypt(self, source: Source, key: List[str]) -> Iterator[str]:
+        if self._consumed is not None and source is self._consumed:
+            raise ValueError("A fonte já foi consumida por run(); passe um caminho ou uma lista de blocos.")
+        return decrypt_stream(source, key, self.chunk_size)
+
+    def decrypt_to_file(self, source: Source, key: List[str], output: Union[str, Path]):
+        with open(output, "w", encoding="utf-8", newline="") as out:
+            for chunk in self.decrypt(source, key):
+                out.write(chunk)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Uso: python fluxo.py <cifrado.txt> <saida.txt>")
+        sys.exit(1)
+
+    scorer = EnglishScorer(quadgram_file=str(Path(__file__).parent / "quadgrams.txt"))
+    breaker = StreamingSubstitutionBreaker(scorer)
+    best_key, best_score = breaker.run(sys.argv[1])
+    breaker.decrypt_to_file(sys.argv[1], best_key, sys.argv[2])
+
+    print(f"[INFO] Letras analisadas: {breaker.statistics.total_letters}")
+    print("==== Best score ====")
+    print(best_score)
+    print("\n==== Best key ====")
+    print(SubstitutionCipher.pretty_print_key(best_key))
+    print(f"\n[INFO] Texto decifrado gravado em: {sys.argv[2]}")
@@ -0,0 +1,365 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, TextIO, Tuple
+
+from analise import rank_cipher_families
+from artefato1 import EnglishScorer, HillClimbDecoder, SimulatedAnnealingDecoder, SubstitutionCipher
+from artefato2 import NgramScorer, PermutationBreaker, break_transposition_sweep
+from artefato3 import CombinedBreaker
+from memoria import ResultCache
+from modelos import ModelRegistry
+from retomada import Checkpoint
+from telemetria import Telemetry
+
+# Quebra em lote: lê jobs de um JSONL ou CSV (campos `ciphertext` e, opcionais,
+# `id`, `mode`, `key_length`, `min_key_len`, `max_key_len`, `top_candidates`,
+# `search`, `time_budget`, `seed`, `language`), distribui entre processos que carregam o
+# modelo uma única vez e escreve um JSONL de resultados à medida que cada job
+# termina. Com `cache_path`, resultados já conhecidos vêm do cache (memoria.py)
+# e substituições de um isomorfo conhecido partem da chave traduzida.
+# `language` escolhe o modelo de n-gramas (modelos.py; "en" por padrão,
+# "auto" detecta o idioma pelo próprio texto cifrado). No JSONL, `ciphertext`
+# pode ser uma lista de mensagens cifradas com a mesma chave (modo de
+# profundidade, fora do cache e do modo "combined"). Com `checkpoint_dir`, os
+# recozimentos de substituição e as têmperas das chaves longas de transposição
+# gravam pontos de retomada em `<checkpoint_dir>/<id>.json` (na varredura do
+# modo "transposition", `<checkpoint_dir>/<id>/<modo>_<tamanho>.json`;
+# retomada.py): um job interrompido (prazo, processo morto) continua de onde
+# parou ao rodar o lote de novo.
+
+DEFAULT_QUADGRAMS = Path(__file__).parent / "quadgrams.txt"
+MODES = ("auto", "substitution", "transposition", "columnar", "block", "combined")
+
+_english_scorer: Optional[EnglishScorer] = None
+_breaker: Optional[PermutationBreaker] = None
+_combined: Optional[CombinedBreaker] = None
+_cache: Optional[ResultCache] = None
+_checkpoint_dir: Optional[Path] = None
+DEFAULT_LANGUAGE = "en"
+# modelos de outros idiomas, carregados no primeiro job que os pede
+_registry: Optional[ModelRegistry] = None
+_language_models: Dict[str, Tuple[EnglishScorer, PermutationBreaker]] = {}
+# campos do job que entram na chave do cache, por modo
+CACHE_PARAMS = {
+    "substitution": (),
+    "columnar": ("key_length",),
+    "block": ("key_length",),
+    "transposition": ("min_key_len", "max_key_len", "top_candidates"),
+    "combined": ("min_key_len", "max_key_len", "top_candidates"),
+}
+
+
+def read_jobs(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for index, job in enumerate(rows):
+            job.setdefault("id", str(index))
+            yield job
+
+
+def _init_worker(quadgram_file: str, cache_path: Optional[str] = None, checkpoint_dir: Optional[str] = None):
+    global _english_scorer, _breaker, _combined, _cache, _checkpoint_dir
+    _english_scorer = EnglishScorer(quadgram_file, verbose=False)
+    _breaker = PermutationBreaker(NgramScorer(quadgram_file))
+    _combined = CombinedBreaker(quadgram_file)
+    # os scorers leem a tabela no primeiro uso; o worker a carrega aqui, fora
+    # do prazo do primeiro job (e uma vez só: load_quadgram_table reaproveita)
+    _english_scorer.quadgrams
+    _breaker.scorer.table
+    _cache = ResultCache(cache_path) if cache_path else None
+    _checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+
+
+def _checkpoint_name(job: Dict) -> str:
+    return re.sub(r"[^\w.-]", "_", str(job["id"]))
+
+
+def _checkpoint_for(job: Dict) -> Optional[Checkpoint]:
+    if _checkpoint_dir is None:
+        return None
+    return Checkpoint(_checkpoint_dir / f"{_checkpoint_name(job)}.json")
+
+
+def _models_for(language: str) -> Tuple[EnglishScorer, PermutationBreaker]:
+    global _registry
+    if language == DEFAULT_LANGUAGE:
+        return _english_scorer, _breaker
+    models = _language_models.get(language)
+    if models is None:
+        if _registry is None:
+            _registry = ModelRegistry()
+        table = _registry.quadgrams(language)
+        models = (EnglishScorer(table=table, verbose=False), PermutationBreaker(NgramScorer(table=table)))
+        _language_models[language] = models
+    return models
+
+
+def _detect_language(ciphertext: str, mode: str) -> str:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    # substituição troca as letras: só o perfil de frequências sobrevive;
+    # transposição mantém as letras, e a ordem 1 não depende da ordem delas
+    if mode == "substitution":
+        ranking = _registry.detect_language(ciphertext, invariant=True)
+    else:
+        ranking = _registry.detect_language(ciphertext, order=1)
+    return ranking[0][0]
+
+
+def _int_field(job: Dict, name: str, default: Optional[int]) -> Optional[int]:
+    # campos de CSV chegam como texto, vazios quando omitidos
+    value = job.get(name)
+    return default if value in (None, "") else int(value)
+
+
+def run_job(
+    job: Dict,
+    default_budget: Optional[float],
+    telemetry: Optional[Telemetry] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> Dict:
+    # `cancelled` interrompe a busca como um prazo esgotado: o resultado é o
+    # melhor encontrado até ali
+    started = time.monotonic()
+    budget = job.get("time_budget")
+    budget = default_budget if budget in (None, "") else float(budget)
+    deadline = started + budget if budget else None
+
+    def should_stop() -> bool:
+        if cancelled is not None and cancelled():
+            return True
+        return deadline is not None and time.monotonic() > deadline
+
+    mode = job.get("mode") or "substitution"
+    ciphertext = job["ciphertext"]
+    depth = isinstance(ciphertext, list)
+    # análises de família e idioma olham o conjunto das mensagens
+    sample = "\n".join(ciphertext) if depth else ciphertext
+    if mode == "auto":
+        # "other" (polialfabética etc.) não tem quebrador: fica com a mais provável das duas
+        families = [name for name, _ in rank_cipher_families(sample) if name != "other"]
+        mode = families[0]
+    if depth and mode == "combined":
+        raise ValueError("O modo 'combined' não aceita uma lista de mensagens.")
+    result: Dict = {"id": job["id"], "mode": mode}
+
+    language = job.get("language") or DEFAULT_LANGUAGE
+    if language == "auto":
+        language = _detect_language(sample, mode)
+    if language != DEFAULT_LANGUAGE:
+        if mode == "combined":
+            raise ValueError("O modo 'combined' só tem modelo em inglês.")
+        result["language"] = language
+    english_scorer, breaker = _models_for(language)
+
+    params = {name: _int_field(job, name, None) for name in CACHE_PARAMS.get(mode, ())}
+    if language != DEFAULT_LANGUAGE:
+        # o inglês fica fora da chave: mantém válidos os caches já gravados
+        params["language"] = language
+    warm_key = None
+    cache = None if depth else _cache
+    if cache is not None:
+        cached = cache.get(ciphertext, mode, params)
+        if cached is not None:
+            result.update(cached["extra"])
+            result.update(key=cached["key"], score=cached["score"], plaintext=cached["plaintext"], cached=True)
+            if mode == "substitution":
+                # o cache ignora caixa e pontuação; o texto sai do cifrado atual
+                result["plaintext"] = SubstitutionCipher(list(cached["key"])).decrypt(ciphertext)
+            result["timed_out"] = False
+            result["elapsed"] = round(time.monotonic() - started, 4)
+            return result
+        if mode == "substitution":
+            warm_key = cache.warm_key(ciphertext)
+
+    if mode == "substitution":
+        search = job.get("search") or "annealing"
+        if warm_key is not None:
+            # isomorfo conhecido: recozimento frio a partir da chave traduzida
+            decoder = SimulatedAnnealingDecoder(
+                ciphertext=ciphertext,
+                scorer=english_scorer,
+                iterations_per_temp=_int_field(job, "iterations_per_temp", 500),
+                random_seed=_int_field(job, "seed", None),
+                should_stop=should_stop,
+                telemetry=telemetry,
+                initial_key=warm_key,
+                checkpoint=_checkpoint_for(job),
+            )
+            result["warm_start"] = True
+        elif search == "hillclimb":
+            decoder = HillClimbDecoder(
+                ciphertext=ciphertext,
+                scorer=english_scorer,
+                random_seed=_int_field(job, "seed", None),
+                should_stop=should_stop,
+                telemetry=telemetry,
+            )
+        elif search == "annealing":
+            decoder = SimulatedAnnealingDecoder(
+                ciphertext=ciphertext,
+                scorer=english_scorer,
+                iterations_per_temp=_int_field(job, "iterations_per_temp", 500),
+                random_seed=_int_field(job, "seed", None),
+                should_stop=should_stop,
+                telemetry=telemetry,
+                checkpoint=_checkpoint_for(job),
+            )
+        else:
+            raise ValueError(f"Busca desconhecida: {search} (use annealing ou hillclimb)")
+        key, score, plain = decoder.run()
+        result.update(key="".join(key), score=score, plaintext=plain)
+    elif mode in ("columnar", "block"):
+        key_length = _int_field(job, "key_length", None)
+        if key_length is None:
+            raise ValueError(f"O modo '{mode}' exige key_length.")
+        breaker_fn = breaker.break_columnar if mode == "columnar" else breaker.break_block
+        breaker.telemetry = telemetry
+        try:
+            plain, key, score = breaker_fn(ciphertext, key_length, should_stop, _checkpoint_for(job))
+        finally:
+            breaker.telemetry = None
+        result.update(key=key, key_length=key_length, score=score, plaintext=plain)
+    elif mode == "transposition":
+        breaker.telemetry = telemetry
+        try:
+            candidates = break_transposition_sweep(
+                breaker,
+                ciphertext,
+                min_key_len=_int_field(job, "min_key_len", 2),
+                max_key_len=_int_field(job, "max_key_len", 10),
+                should_stop=should_stop,
+                top_candidates=_int_field(job, "top_candidates", 4),
+                checkpoint_dir=_checkpoint_dir / _checkpoint_name(job) if _checkpoint_dir is not None else None,
+            )
+        finally:
+            breaker.telemetry = None
+        if not candidates:
+            raise TimeoutError("Tempo esgotado antes do primeiro candidato.")
+        best = max(candidates.values(), key=lambda c: c["score"])
+        result.update(
+            mode=best["mode"],
+            key=best["key"],
+            key_length=best["key_len"],
+            score=best["score"],
+            plaintext=best["text"],
+        )
+    elif mode == "combined":
+        best = _combined.run(
+            ciphertext,
+            min_key_len=_int_field(job, "min_key_len", 2),
+            max_key_len=_int_field(job, "max_key_len", 10),
+            top_lengths=_int_field(job, "top_candidates", 4),
+            should_stop=should_stop,
+        )[0]
+        result.update(
+            transposition_mode=best.mode,
+            key=best.transposition_key,
+            key_length=best.key_len,
+            substitution_key=best.substitution_key,
+            score=best.score,
+            plaintext=best.plaintext,
+        )
+    else:
+        raise ValueError(f"Modo desconhecido: {mode} (use um de {', '.join(MODES)})")
+
+    result["timed_out"] = should_stop()
+    if cache is not None and not result["timed_out"]:
+        extra = {k: v for k, v in result.items() if k not in ("id", "key", "score", "plaintext", "timed_out", "warm_start")}
+        cache.put(ciphertext, mode, params, result["key"], result["score"], result["plaintext"], extra)
+    result["elapsed"] = round(time.monotonic() - started, 4)
+    return result
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        quadgram_file: str = str(DEFAULT_QUADGRAMS),
+        workers: Optional[int] = None,
+        time_budget: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        cache_path: Optional[str] = None,
+        checkpoint_dir: Optional[str] = None,
+    ):
+        self.quadgram_file = quadgram_file
+        self.cache_path = cache_path
+        self.checkpoint_dir = checkpoint_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.time_budget = time_budget
+        # limita os jobs em voo para não ler a entrada inteira de uma vez
+        self.max_pending = max_pending or self.workers * 4
+
+    def run(self, jobs: Iterator[Dict]) -> Iterator[Dict]:
+        # gera os resultados na ordem em que terminam
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.quadgram_file, self.cache_path, self.checkpoint_dir),
+        ) as executor:
+            pending = {}
+            jobs = iter(jobs)
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < self.max_pending:
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    pending[executor.submit(run_job, job, self.time_budget)] = job
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = pending.pop(future)
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        yield {"id": job.get("id"), "mode": job.get("mode"), "error": f"{type(e).__name__}: {e}"}
+
+
+def write_results(results: Iterator[Dict], out: TextIO):
+    for result in results:
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quebra em lote de cifras (JSONL/CSV -> JSONL).")
+    parser.add_argument("entrada", help="arquivo .jsonl ou .csv com os jobs")
+    parser.add_argument("-o", "--saida", help="arquivo JSONL de saída (padrão: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="processos (padrão: núcleos)")
+    parser.add_argument("-t", "--time-budget", type=float, default=None, help="segundos por job")
+    parser.add_argument("--quadgrams", default=str(DEFAULT_QUADGRAMS))
+    parser.add_argument("--cache", default=None, help="arquivo SQLite com o cache de resultados")
+    parser.add_argument("--checkpoints", default=None, help="pasta dos pontos de retomada dos recozimentos")
+    args = parser.parse_args()
+
+    runner = BatchRunner(
+        args.quadgrams,
+        workers=args.workers,
+        time_budget=args.time_budget,
+        cache_path=args.cache,
+        checkpoint_dir=args.checkpoints,
+    )
+    results = runner.run(read_jobs(args.entrada))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as out:
+            write_results(results, out)
+    else:
+        write_results(results, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
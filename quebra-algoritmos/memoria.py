@@ -0,0 +1,133 @@
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from artefato1 import ALPHABET
+from transposicao import normalize_ciphertext
+
+# Cache persistente de resultados (SQLite, com descarte LRU). A chave é o hash
+# do texto cifrado normalizado junto com o modo e os parâmetros da busca; o
+# valor é a melhor chave, o score, o texto decifrado e, em `extra`, o que mais
+# o quebrador devolveu (tamanho da chave, modo da transposição...).
+#
+# Na substituição só as letras importam (a chave não depende de caixa nem de
+# pontuação), e textos que são recifragens do mesmo texto claro com outra
+# chave têm a mesma assinatura de isomorfo (o padrão de repetição das letras:
+# "ATTACK" e "XFFXQM" viram ambos "ABBACD"). Nesse caso a chave conhecida é
+# traduzida para o novo texto e serve de ponto de partida para o recozimento.
+
+DEFAULT_MAX_ENTRIES = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    fingerprint TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    pattern TEXT,
+    letters TEXT,
+    key TEXT NOT NULL,
+    score REAL NOT NULL,
+    plaintext TEXT NOT NULL,
+    extra TEXT,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_pattern ON results (pattern);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def letters_only(ciphertext: str) -> str:
+    return "".join(ch for ch in ciphertext.upper() if 'A' <= ch <= 'Z')
+
+
+def isomorph_signature(letters: str) -> str:
+    # cada letra vira a ordem da sua primeira ocorrência: "HELLO" -> "ABCCD"
+    first: Dict[str, str] = {}
+    return "".join(first.setdefault(ch, ALPHABET[len(first)]) for ch in letters)
+
+
+def fingerprint(ciphertext: str, mode: str, params: Optional[Dict] = None) -> str:
+    text = letters_only(ciphertext) if mode == "substitution" else normalize_ciphertext(ciphertext)
+    content = json.dumps([mode, params or {}, text], sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def translate_key(known_letters: str, known_key: str, letters: str) -> List[str]:
+    # `known_key` decifra `known_letters`; devolve a chave que decifra `letters`
+    # (mesmo isomorfo) no mesmo texto claro. Letras ausentes ficam com o resto.
+    key: List[Optional[str]] = [None] * 26
+    for old, new in zip(known_letters, letters):
+        key[ord(new) - ord('A')] = known_key[ord(old) - ord('A')]
+    used = set(k for k in key if k is not None)
+    rest = iter(ch for ch in ALPHABET if ch not in used)
+    return [k if k is not None else next(rest) for k in key]
+
+
+class ResultCache:
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        # vários processos do lote podem abrir o mesmo arquivo
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, ciphertext: str, mode: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        digest = fingerprint(ciphertext, mode, params)
+        row = self.conn.execute(
+            "SELECT key, score, plaintext, extra FROM results WHERE fingerprint = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE results SET last_used = ? WHERE fingerprint = ?", (time.time(), digest))
+        return {"key": json.loads(row[0]), "score": row[1], "plaintext": row[2], "extra": json.loads(row[3] or "{}")}
+
+    def put(
+        self,
+        ciphertext: str,
+        mode: str,
+        params: Optional[Dict],
+        key,
+        score: float,
+        plaintext: str,
+        extra: Optional[Dict] = None,
+    ):
+        pattern = letters = None
+        if mode == "substitution":
+            letters = letters_only(ciphertext)
+            pattern = hashlib.sha256(isomorph_signature(letters).encode("ascii")).hexdigest()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint(ciphertext, mode, params), mode, pattern, letters,
+                 json.dumps(key), score, plaintext, json.dumps(extra or {}), time.time()),
+            )
+            self.conn.execute(
+                "DELETE FROM results WHERE fingerprint IN ("
+                " SELECT fingerprint FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def warm_key(self, ciphertext: str) -> Optional[List[str]]:
+        # chave de substituição para um isomorfo já resolvido, se houver
+        letters = letters_only(ciphertext)
+        if not letters:
+            return None
+        pattern = hashlib.sha256(isomorph_signature(letters).encode("ascii")).hexdigest()
+        row = self.conn.execute(
+            "SELECT fingerprint, letters, key FROM results WHERE pattern = ? ORDER BY last_used DESC LIMIT 1",
+            (pattern,),
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE results SET last_used = ? WHERE fingerprint = ?", (time.time(), row[0]))
+        return translate_key(row[1], json.loads(row[2]), letters)
+
+    def close(self):
+        self.conn.close()
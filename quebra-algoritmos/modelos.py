@@ -0,0 +1,319 @@
+import math
+import sys
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ngramas import (
+    ALPHABET_SIZE,
+    MAX_ORDER,
+    NgramTable,
+    QuadgramTable,
+    count_ngrams,
+    encode_letters,
+    encode_text,
+    file_checksum,
+    load_quadgram_table,
+)
+
+# Registro de modelos de n-gramas (ordens 1 a 5) por idioma.
+#
+# - construção: `build(idioma, corpus)` conta os n-gramas de um corpus (acentos
+#   removidos, só letras) e grava um arquivo por ordem em `modelos/`. Idiomas
+#   com corpus registrado (CORPUS_SOURCES) são construídos sob demanda, e
+#   reconstruídos se o checksum do corpus mudar, como o cache .qbin;
+# - armazenamento compacto: só os n-gramas observados (índice base-26 e
+#   contagem, uint32) num .npz comprimido; a tabela densa é montada na carga,
+#   suavizada por interpolação com as ordens menores (smoothed_log_probs);
+# - carga preguiçosa: nada é lido até `get(idioma, ordem)`, e cada modelo fica
+#   em memória só depois do primeiro uso. Os idiomas com arquivo de quadgramas
+#   (inglês: quadgrams.txt, via cache .qbin) têm as ordens 1 a 3 derivadas dos
+#   quadgramas, sem precisar de corpus;
+# - score combinado: `mixed(idioma, {3: 0.3, 4: 0.7})` soma os scores de cada
+#   ordem com os pesos dados;
+# - idioma: `detect_language(amostra)` compara a verossimilhança da amostra em
+#   cada idioma; com `invariant=True` compara só o perfil ordenado das
+#   frequências de letras, que sobrevive a uma substituição.
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_MODEL_DIR = SCRIPT_DIR / "modelos"
+MODEL_SUFFIX = ".npz"
+# idiomas cujos quadgramas vêm de um arquivo de contagens já existente
+QUADGRAM_SOURCES = {"en": SCRIPT_DIR / "quadgrams.txt"}
+# corpora de exemplo (~11 KB); para modelos melhores, `build` com um corpus maior
+CORPUS_SOURCES = {
+    "en": SCRIPT_DIR / "exemplos" / "corpus_ingles.txt",
+    "pt": SCRIPT_DIR / "exemplos" / "corpus_portugues.txt",
+    "es": SCRIPT_DIR / "exemplos" / "corpus_espanhol.txt",
+}
+
+
+def normalize_corpus(text: str) -> str:
+    # "Ação, niño" -> "ACAONINO"
+    decomposed = unicodedata.normalize("NFKD", text.upper())
+    return "".join(ch for ch in decomposed if 'A' <= ch <= 'Z')
+
+
+def save_model(path: Path, counts: np.ndarray, order: int, checksum: bytes = b""):
+    index = np.flatnonzero(counts)
+    np.savez_compressed(
+        path,
+        order=np.uint8(order),
+        index=index.astype(np.uint32),
+        counts=counts[index].astype(np.uint32),
+        checksum=np.frombuffer(checksum, dtype=np.uint8),
+    )
+
+
+def model_checksum(path: Path) -> bytes:
+    with np.load(path) as data:
+        return data["checksum"].tobytes()
+
+
+def smoothed_log_probs(counts: np.ndarray, order: int) -> np.ndarray:
+    # Interpolação de Witten-Bell: cada ordem k mistura a frequência observada
+    # com a estimativa da ordem k-1 estendida pelo bigrama da última letra,
+    # com peso N/(N+T) (T: k-gramas distintos). Com um corpus pequeno, os
+    # n-gramas não vistos deixam de cair todos no mesmo floor.
+    marginals = {order: np.asarray(counts, dtype=np.float64).reshape((ALPHABET_SIZE,) * order)}
+    for k in range(order - 1, 0, -1):
+        marginals[k] = marginals[k + 1].sum(axis=-1)
+    unigrams = marginals[1]
+    probs = (unigrams + 0.5) / (unigrams.sum() + 0.5 * ALPHABET_SIZE)
+    previous, bigram_given = probs, None
+    for k in range(2, order + 1):
+        observed = marginals[k]
+        total, distinct = observed.sum(), np.count_nonzero(observed)
+        weight = total / (total + distinct) if total else 0.0
+        if k == 2:
+            lower = np.multiply.outer(previous, previous)
+        else:
+            lower = previous[..., None] * bigram_given.reshape((1,) * (k - 2) + bigram_given.shape)
+        previous = weight * observed / max(total, 1.0) + (1.0 - weight) * lower
+        if k == 2:
+            bigram_given = previous / probs[:, None]
+    return np.log10(previous).ravel()
+
+
+def table_from_counts(counts: np.ndarray, order: int) -> NgramTable:
+    total = float(counts.sum())
+    if total == 0:
+        raise ValueError("Nenhum n-grama para montar a tabela.")
+    # o floor só vale para janelas com não-letras
+    table = NgramTable(smoothed_log_probs(counts, order).astype(np.float32), math.log10(0.01 / total), order)
+    return QuadgramTable.from_ngrams(table) if order == 4 else table
+
+
+def load_model(path: Path) -> NgramTable:
+    with np.load(path) as data:
+        order = int(data["order"])
+        counts = np.zeros(ALPHABET_SIZE ** order, dtype=np.float64)
+        counts[data["index"]] = data["counts"]
+    return table_from_counts(counts, order)
+
+
+class MixedModel:
+    # Soma ponderada dos scores de várias ordens; tem a mesma interface de
+    # pontuação das tabelas (score_codes, score_batch, score_text).
+
+    def __init__(self, tables: Dict[int, NgramTable], weights: Dict[int, float]):
+        missing = set(weights) - set(tables)
+        if missing:
+            raise ValueError(f"Sem tabela para as ordens {sorted(missing)}.")
+        self.tables = {order: tables[order] for order in weights}
+        self.weights = dict(weights)
+        self.order = max(self.weights)
+        self.floor = sum(w * self.tables[o].floor for o, w in self.weights.items())
+        self._bigrams: Optional[np.ndarray] = None
+
+    def score_codes(self, codes: np.ndarray) -> float:
+        return sum(w * self.tables[o].score_codes(codes) for o, w in self.weights.items())
+
+    def score_batch(self, codes: np.ndarray) -> np.ndarray:
+        return sum(w * self.tables[o].score_batch(codes) for o, w in self.weights.items())
+
+    def score_text(self, text: str) -> float:
+        return self.score_codes(encode_text(text))
+
+    def bigram_log_probs(self) -> np.ndarray:
+        # adjacência das buscas de transposição: a ordem 2, se houver, ou a
+        # marginal da maior ordem do modelo
+        if self._bigrams is None:
+            source = self.tables.get(2) or self.tables[self.order]
+            if source.order < 2:
+                raise ValueError("Modelo sem ordem >= 2 para a adjacência de bigramas.")
+            self._bigrams = np.asarray(source.marginal(2).log_probs, dtype=np.float64).reshape(26, 26)
+        return self._bigrams
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        root: Path = DEFAULT_MODEL_DIR,
+        quadgram_sources: Optional[Dict[str, Path]] = None,
+        corpus_sources: Optional[Dict[str, Path]] = None,
+    ):
+        self.root = Path(root)
+        self.quadgram_sources = dict(QUADGRAM_SOURCES if quadgram_sources is None else quadgram_sources)
+        self.corpus_sources = dict(CORPUS_SOURCES if corpus_sources is None else corpus_sources)
+        self._loaded: Dict[Tuple[str, int], NgramTable] = {}
+
+    def path(self, language: str, order: int) -> Path:
+        return self.root / f"{language}-{order}{MODEL_SUFFIX}"
+
+    def build(
+        self,
+        language: str,
+        corpus: str,
+        orders: Iterable[int] = range(1, MAX_ORDER + 1),
+        checksum: bytes = b"",
+    ) -> List[Path]:
+        letters = encode_letters(normalize_corpus(corpus))
+        if len(letters) == 0:
+            raise ValueError("Corpus sem letras.")
+        self.root.mkdir(parents=True, exist_ok=True)
+        written = []
+        for order in orders:
+            path = self.path(language, order)
+            save_model(path, count_ngrams(letters, order), order, checksum)
+            self._loaded.pop((language, order), None)
+            written.append(path)
+        return written
+
+    def orders(self, language: str) -> List[int]:
+        if language in self.corpus_sources:
+            return list(range(1, MAX_ORDER + 1))
+        available = {
+            order for order in range(1, MAX_ORDER + 1)
+            if self.path(language, order).exists()
+        }
+        if language in self.quadgram_sources:
+            available.update(range(1, 5))
+        return sorted(available)
+
+    def languages(self) -> List[str]:
+        found = set(self.quadgram_sources) | set(self.corpus_sources)
+        if self.root.is_dir():
+            found.update(p.name.rsplit("-", 1)[0] for p in self.root.glob(f"*-?{MODEL_SUFFIX}"))
+        return sorted(found)
+
+    def loaded(self) -> List[Tuple[str, int]]:
+        return sorted(self._loaded)
+
+    def get(self, language: str, order: int) -> NgramTable:
+        key = (language, order)
+        table = self._loaded.get(key)
+        if table is not None:
+            return table
+        # o arquivo de quadgramas (corpus bem maior) tem prioridade nas ordens 1-4
+        if language in self.quadgram_sources and order <= 4:
+            if order == 4:
+                table = load_quadgram_table(self.quadgram_sources[language])
+            else:
+                table = self.get(language, 4).marginal(order)
+        elif language in self.corpus_sources:
+            table = self._from_corpus(language, order)
+        elif self.path(language, order).exists():
+            table = load_model(self.path(language, order))
+        else:
+            raise ValueError(f"Modelo não encontrado: idioma {language!r}, ordem {order}.")
+        self._loaded[key] = table
+        return table
+
+    def _from_corpus(self, language: str, order: int) -> NgramTable:
+        source = self.corpus_sources[language]
+        checksum = file_checksum(source)
+        path = self.path(language, order)
+        # modelos gravados à mão por `build` (sem checksum) não são sobrescritos
+        if path.exists() and model_checksum(path) in (checksum, b""):
+            return load_model(path)
+        with open(source, "r", encoding="utf-8") as f:
+            corpus = f.read()
+        try:
+            self.build(language, corpus, [order], checksum)
+        except OSError:
+            # sem permissão de escrita: monta só em memória
+            letters = encode_letters(normalize_corpus(corpus))
+            return table_from_counts(count_ngrams(letters, order).astype(np.float64), order)
+        return load_model(path)
+
+    def quadgrams(self, language: str) -> QuadgramTable:
+        return self.get(language, 4)
+
+    def mixed(self, language: str, weights: Dict[int, float]) -> MixedModel:
+        return MixedModel({order: self.get(language, order) for order in weights}, weights)
+
+    def detect_language(
+        self,
+        sample: str,
+        order: int = 3,
+        languages: Optional[Iterable[str]] = None,
+        invariant: bool = False,
+    ) -> List[Tuple[str, float]]:
+        # (idioma, score médio por janela), do mais para o menos provável.
+        # Texto claro ou transposição: n-gramas da ordem dada (a ordem 1 basta
+        # para uma transposição). Substituição: invariant=True.
+        codes = encode_letters(normalize_corpus(sample))
+        ranking = []
+        for language in languages or self.languages():
+            if order not in self.orders(language) and not invariant:
+                continue
+            if invariant:
+                score = self._profile_score(codes, language)
+            else:
+                table = self.get(language, order)
+                windows = max(1, len(codes) - order + 1)
+                score = table.score_codes(codes) / windows
+            ranking.append((language, score))
+        if not ranking:
+            raise ValueError(f"Nenhum idioma com modelo de ordem {order}.")
+        return sorted(ranking, key=lambda item: item[1], reverse=True)
+
+    def _profile_score(self, codes: np.ndarray, language: str) -> float:
+        # log-verossimilhança média das letras da amostra, casando a k-ésima
+        # letra mais frequente da amostra com a k-ésima do idioma
+        probs = np.sort(10.0 ** np.asarray(self.get(language, 1).log_probs, dtype=np.float64))[::-1]
+        counts = np.sort(np.bincount(codes, minlength=ALPHABET_SIZE))[::-1]
+        total = counts.sum()
+        if total == 0:
+            return -math.inf
+        return float((counts * np.log10(probs)).sum() / total)
+
+
+def main():
+    usage = (
+        "Uso:\n"
+        "  python modelos.py build <idioma> <corpus.txt> [ordens, ex.: 1,2,3,4,5]\n"
+        "  python modelos.py list\n"
+        "  python modelos.py detect <arquivo.txt> [ordem]"
+    )
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    registry = ModelRegistry()
+    command = sys.argv[1]
+    if command == "build" and len(sys.argv) in (4, 5):
+        with open(sys.argv[3], "r", encoding="utf-8") as f:
+            corpus = f.read()
+        orders = [int(o) for o in sys.argv[4].split(",")] if len(sys.argv) == 5 else range(1, MAX_ORDER + 1)
+        for path in registry.build(sys.argv[2], corpus, orders):
+            print(f"[INFO] Modelo gravado em: {path} ({path.stat().st_size} bytes)")
+    elif command == "list" and len(sys.argv) == 2:
+        for language in registry.languages():
+            print(f"{language}: ordens {registry.orders(language)}")
+    elif command == "detect" and len(sys.argv) in (3, 4):
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            sample = f.read()
+        order = int(sys.argv[3]) if len(sys.argv) == 4 else 3
+        for language, score in registry.detect_language(sample, order):
+            print(f"{language}: {score:.3f}")
+    else:
+        print(usage)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
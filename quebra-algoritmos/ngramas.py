@@ -0,0 +1,484 @@
+import hashlib
+import math
+import os
+import struct
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+ALPHABET_SIZE = 26
+QUADGRAM_TABLE_SIZE = ALPHABET_SIZE ** 4
+MAX_ORDER = 5
+
+# elementos por bloco em QuadgramCountObjective.score_many
+SCORE_MANY_ELEMENTS = 1 << 21
+
+# códigos >= 26 marcam caracteres que não são letras (A-Z -> 0..25)
+INVALID_CODE = 255
+
+# Cache binário: cabeçalho de 64 bytes seguido da tabela float32 crua.
+# magic, versão, sha256 do arquivo de origem, floor, número de posições
+CACHE_MAGIC = b"QGRM"
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".qbin"
+_CACHE_HEADER = struct.Struct("<4sI32sdQ")
+CACHE_HEADER_SIZE = 64
+
+
+def encode_text(text: str) -> np.ndarray:
+    # 'replace' mantém um caractere por posição mesmo fora do ASCII
+    raw = np.frombuffer(text.upper().encode("ascii", "replace"), dtype=np.uint8)
+    codes = raw - np.uint8(ord("A"))
+    codes[codes >= ALPHABET_SIZE] = INVALID_CODE
+    return codes
+
+
+def encode_letters(text: str) -> np.ndarray:
+    codes = encode_text(text)
+    return codes[codes < ALPHABET_SIZE]
+
+
+def as_messages(ciphertext: Union[str, Sequence[str]]) -> List[str]:
+    # modo de profundidade: uma lista de mensagens cifradas com a mesma chave
+    return [ciphertext] if isinstance(ciphertext, str) else list(ciphertext)
+
+
+def boundary_windows(lengths: Sequence[int], order: int = 4) -> np.ndarray:
+    # janelas de `order` letras que cruzam a junção de duas mensagens
+    # concatenadas; não entram no score
+    total = sum(lengths)
+    width = max(0, total - order + 1)
+    starts = np.cumsum(lengths)[:-1]
+    crossing = [s - k for s in starts for k in range(1, order) if 0 <= s - k < width]
+    return np.unique(np.array(crossing, dtype=np.intp))
+
+
+def decode_letters(codes: np.ndarray) -> str:
+    return (np.asarray(codes, dtype=np.uint8) + np.uint8(ord("A"))).tobytes().decode("ascii")
+
+
+def quadgram_index(quad: str) -> int:
+    idx = 0
+    for ch in quad.upper():
+        idx = idx * ALPHABET_SIZE + (ord(ch) - ord("A"))
+    return idx
+
+
+def count_ngrams(letters: np.ndarray, order: int) -> np.ndarray:
+    # contagem densa (26^order) dos n-gramas de uma sequência só de letras
+    c = np.asarray(letters, dtype=np.int64)
+    size = ALPHABET_SIZE ** order
+    if len(c) < order:
+        return np.zeros(size, dtype=np.int64)
+    idx = np.zeros(len(c) - order + 1, dtype=np.int64)
+    for k in range(order):
+        idx = idx * ALPHABET_SIZE + c[k:len(c) - order + 1 + k]
+    return np.bincount(idx, minlength=size)
+
+
+class NgramTable:
+    # Tabela densa 26^n de log10-probabilidades (float32) indexada pelo código
+    # base-26 do n-grama, para 1 <= n <= MAX_ORDER (26^5 ocupa ~47 MB).
+
+    def __init__(self, log_probs: np.ndarray, floor: float, order: int):
+        if not 1 <= order <= MAX_ORDER:
+            raise ValueError(f"Ordem de n-grama deve estar entre 1 e {MAX_ORDER}.")
+        if log_probs.shape != (ALPHABET_SIZE ** order,):
+            raise ValueError(f"Tabela de {order}-gramas deve ter 26^{order} posições.")
+        self.order = order
+        self.log_probs = log_probs
+        self.floor = float(floor)
+
+    @classmethod
+    def from_counts(cls, counts: np.ndarray, order: int) -> "NgramTable":
+        # contagens densas (26^order); n-gramas não vistos ficam com o floor
+        total = float(counts.sum())
+        if total == 0:
+            raise ValueError("Nenhum n-grama para montar a tabela.")
+        floor = math.log10(0.01 / total)
+        with np.errstate(divide="ignore"):
+            log_probs = np.where(counts > 0, np.log10(counts / total), floor).astype(np.float32)
+        return cls(log_probs, floor, order)
+
+    def window_indices(self, codes: np.ndarray) -> np.ndarray:
+        # código base-26 de cada janela de `order` letras (funciona em 1D e 2D)
+        c = codes.astype(np.int64)
+        n, width = self.order, c.shape[-1] - self.order + 1
+        idx = c[..., :width]
+        for k in range(1, n):
+            idx = idx * 26 + c[..., k:k + width]
+        return idx
+
+    def _window_values(self, codes: np.ndarray) -> np.ndarray:
+        # log-probabilidade de cada janela; janelas com não-letras valem o floor
+        if (codes >= ALPHABET_SIZE).any():
+            valid = codes < ALPHABET_SIZE
+            width = codes.shape[-1] - self.order + 1
+            window_valid = valid[..., :width]
+            for k in range(1, self.order):
+                window_valid = window_valid & valid[..., k:k + width]
+            idx = self.window_indices(np.where(valid, codes, 0))
+            return np.where(window_valid, self.log_probs[idx], np.float32(self.floor))
+        return self.log_probs[self.window_indices(codes)]
+
+    def score_codes(self, codes: np.ndarray) -> float:
+        # codes: texto já codificado (0..25, INVALID_CODE para não-letras)
+        if codes.shape[-1] < self.order:
+            return 0.0
+        return float(self._window_values(codes).sum(dtype=np.float64))
+
+    def score_batch(self, codes: np.ndarray) -> np.ndarray:
+        # codes: matriz (n_textos, tamanho), um texto codificado por linha
+        if codes.shape[-1] < self.order:
+            return np.zeros(codes.shape[0], dtype=np.float64)
+        return self._window_values(codes).sum(axis=-1, dtype=np.float64)
+
+    def score_text(self, text: str) -> float:
+        return self.score_codes(encode_text(text))
+
+    def _marginal_log_probs(self, order: int) -> Tuple[np.ndarray, float]:
+        if not 1 <= order <= self.order:
+            raise ValueError(f"Ordem {order} não pode ser derivada de {self.order}-gramas.")
+        lp = np.asarray(self.log_probs, dtype=np.float64)
+        probs = np.where(lp > self.floor, 10.0 ** lp, 0.0)
+        counts = probs.reshape(ALPHABET_SIZE ** order, -1).sum(axis=1)
+        total = counts.sum()
+        floor = math.log10(0.01 / total) if total > 0 else self.floor
+        with np.errstate(divide="ignore"):
+            log_probs = np.log10(counts / total)
+        return np.where(counts > 0, log_probs, floor), floor
+
+    def marginal(self, order: int) -> "NgramTable":
+        # tabela de ordem menor obtida somando as probabilidades observadas
+        log_probs, floor = self._marginal_log_probs(order)
+        return NgramTable(log_probs.astype(np.float32), floor, order)
+
+
+class QuadgramTable(NgramTable):
+    # Tabela de quadgramas (26^4, ~1.8 MB), com os atalhos usados nos laços
+    # incrementais e nas buscas de transposição.
+
+    def __init__(self, log_probs: np.ndarray, floor: float):
+        if log_probs.shape != (QUADGRAM_TABLE_SIZE,):
+            raise ValueError("Tabela de quadgramas deve ter 26^4 posições.")
+        super().__init__(log_probs, floor, 4)
+        # indexar um memoryview devolve float do Python, bem mais rápido que
+        # um escalar numpy nos laços incrementais
+        self.flat = memoryview(log_probs)
+        self._bigrams: Optional[np.ndarray] = None
+        # (cache .qbin, checksum) quando aberta por open_compiled
+        self.compiled_from: Optional[Tuple[str, bytes]] = None
+
+    def __reduce__(self):
+        # o memoryview não é serializável. Aberta do cache, a tabela viaja só
+        # com o caminho e o outro processo mapeia o mesmo arquivo; senão,
+        # remonta a partir de uma cópia dos valores
+        if self.compiled_from is not None:
+            return _reopen_compiled, self.compiled_from
+        return type(self), (np.asarray(self.log_probs), self.floor)
+
+    @classmethod
+    def from_counts(cls, counts: Dict[str, int]) -> "QuadgramTable":
+        total = sum(counts.values())
+        if total == 0:
+            raise ValueError("Arquivo de quadgramas vazio ou inválido.")
+
+        floor = math.log10(0.01 / total)
+        log_probs = np.full(QUADGRAM_TABLE_SIZE, floor, dtype=np.float32)
+        for quad, count in counts.items():
+            log_probs[quadgram_index(quad)] = math.log10(count / total)
+        return cls(log_probs, floor)
+
+    @classmethod
+    def from_ngrams(cls, table: NgramTable) -> "QuadgramTable":
+        if table.order != 4:
+            raise ValueError("QuadgramTable precisa de uma tabela de ordem 4.")
+        return cls(table.log_probs, table.floor)
+
+    @classmethod
+    def from_file(cls, filepath: str) -> "QuadgramTable":
+        counts: Dict[str, int] = {}
+        with open(filepath, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.strip().split()
+                if len(parts) != 2:
+                    continue
+                quad, count = parts[0].upper(), int(parts[1])
+                if len(quad) != 4 or not all("A" <= ch <= "Z" for ch in quad):
+                    continue
+                counts[quad] = count
+        return cls.from_counts(counts)
+
+    def bigram_log_probs(self) -> np.ndarray:
+        # bigramas obtidos marginalizando os quadgramas observados (26x26);
+        # usados para pontuar adjacência de colunas nas buscas de transposição
+        if self._bigrams is None:
+            self._bigrams = self._marginal_log_probs(2)[0].reshape(26, 26)
+        return self._bigrams
+
+    def lookup(self, quad: str) -> float:
+        return self.flat[quadgram_index(quad)]
+
+    def window_indices(self, codes: np.ndarray) -> np.ndarray:
+        # versão desenrolada (int32) do caso geral, no caminho quente das buscas
+        c = codes.astype(np.int32)
+        return ((c[..., :-3] * 26 + c[..., 1:-2]) * 26 + c[..., 2:-1]) * 26 + c[..., 3:]
+
+
+class QuadgramWindowBuffer:
+    # Pontua repetidamente textos de um mesmo tamanho (os laços de busca que
+    # redecifram o texto inteiro a cada iteração) sem alocar: índices e
+    # valores das janelas ficam em buffers reaproveitados. Só letras (0..25).
+    # `lengths`: tamanhos das mensagens concatenadas em `codes` (modo de
+    # profundidade); as janelas entre mensagens valem zero.
+
+    def __init__(self, table: QuadgramTable, length: int, lengths: Optional[Sequence[int]] = None):
+        self.log_probs = table.log_probs
+        width = max(0, length - 3)
+        self._idx = np.empty(width, dtype=np.int32)
+        self._values = np.empty(width, dtype=np.float32)
+        self._crossing = boundary_windows(lengths) if lengths is not None else np.empty(0, dtype=np.intp)
+
+    def score(self, codes: np.ndarray) -> float:
+        idx = self._idx
+        if len(idx) == 0:
+            return 0.0
+        np.multiply(codes[:-3], 26, out=idx, dtype=np.int32)
+        np.add(idx, codes[1:-2], out=idx)
+        np.multiply(idx, 26, out=idx)
+        np.add(idx, codes[2:-1], out=idx)
+        np.multiply(idx, 26, out=idx)
+        np.add(idx, codes[3:], out=idx)
+        np.take(self.log_probs, idx, out=self._values)
+        if len(self._crossing):
+            self._values[self._crossing] = 0.0
+        return float(self._values.sum(dtype=np.float64))
+
+
+@lru_cache(maxsize=None)
+def swap_pairs(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # posições (i, j), i < j, de todas as trocas de duas posições entre n
+    i, j = np.triu_indices(n, k=1)
+    return i, j
+
+
+def swap_neighbours(perm: np.ndarray, pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+    # as chaves obtidas trocando duas posições de `perm` (uma por linha): todas
+    # as trocas (325 numa chave de 26 letras) ou só os pares dados
+    i, j = swap_pairs(len(perm)) if pairs is None else pairs
+    rows = np.arange(len(i))
+    neighbours = np.tile(perm, (len(i), 1))
+    neighbours[rows, i] = perm[j]
+    neighbours[rows, j] = perm[i]
+    return neighbours
+
+
+@lru_cache(maxsize=None)
+def rearrangement_moves(n: int) -> np.ndarray:
+    # índices de todos os rearranjos de uma chave de n posições, um por linha
+    # (vizinha = perm[linha]): trocas de duas posições, inversões de um
+    # trecho e deslocamentos de um trecho para outra posição (inclui as
+    # rotações da chave inteira). Os mesmos movimentos de replicas.propose
+    moves = set()
+    identity = list(range(n))
+    for i, j in zip(*swap_pairs(n)):
+        move = identity[:]
+        move[i], move[j] = move[j], move[i]
+        moves.add(tuple(move))
+    for i in range(n):
+        for j in range(i + 2, n + 1):
+            segment = identity[i:j]
+            moves.add(tuple(identity[:i] + segment[::-1] + identity[j:]))
+        for j in range(i + 1, n + 1):
+            segment = identity[i:j]
+            rest = identity[:i] + identity[j:]
+            for p in range(len(rest) + 1):
+                moves.add(tuple(rest[:p] + segment + rest[p:]))
+    moves.discard(tuple(identity))
+    return np.array(sorted(moves), dtype=np.intp).reshape(-1, n)
+
+
+def rearrangement_neighbours(perm: np.ndarray) -> np.ndarray:
+    # as chaves a um rearranjo de `perm` (ver rearrangement_moves)
+    return perm[rearrangement_moves(len(perm))]
+
+
+def count_quadgrams(letters: np.ndarray) -> np.ndarray:
+    # contagem de cada quadgrama (índice base-26) numa sequência só de letras
+    c = np.asarray(letters, dtype=np.int64)
+    if len(c) < 4:
+        return np.zeros(QUADGRAM_TABLE_SIZE, dtype=np.int64)
+    idx = ((c[:-3] * 26 + c[1:-2]) * 26 + c[2:-1]) * 26 + c[3:]
+    return np.bincount(idx, minlength=QUADGRAM_TABLE_SIZE)
+
+
+class QuadgramCountObjective:
+    # Score de quadgramas de uma chave calculado a partir das contagens dos
+    # quadgramas cifrados: custo proporcional ao número de quadgramas
+    # distintos, independente do tamanho do texto.
+
+    def __init__(self, quadgram_counts: np.ndarray, table: QuadgramTable):
+        nonzero = np.flatnonzero(quadgram_counts)
+        self.counts = quadgram_counts[nonzero].astype(np.float64)
+        self.table = np.asarray(table.log_probs)
+        digits = []
+        rest = nonzero
+        for _ in range(4):
+            rest, d = np.divmod(rest, 26)
+            digits.append(d)
+        self.digits = np.stack(digits[::-1])
+
+    def _plain_scores(self, perm: np.ndarray, subset=slice(None)) -> np.ndarray:
+        d = perm[self.digits[:, subset]]
+        idx = ((d[0] * 26 + d[1]) * 26 + d[2]) * 26 + d[3]
+        return self.table[idx].astype(np.float64)
+
+    def score(self, perm: np.ndarray) -> float:
+        return float(self.counts @ self._plain_scores(perm))
+
+    def score_many(self, perms: np.ndarray) -> np.ndarray:
+        # score de várias chaves (n, 26) de uma vez, em blocos para limitar a memória
+        out = np.empty(len(perms))
+        step = max(1, SCORE_MANY_ELEMENTS // max(1, len(self.counts)))
+        for start in range(0, len(perms), step):
+            d = perms[start:start + step][:, self.digits]
+            idx = ((d[:, 0] * 26 + d[:, 1]) * 26 + d[:, 2]) * 26 + d[:, 3]
+            out[start:start + step] = self.table[idx] @ self.counts
+        return out
+
+    def hill_climb(self, perm: np.ndarray) -> Tuple[np.ndarray, float]:
+        # subida mais íngreme sobre as 325 trocas de duas letras
+        perm = np.asarray(perm, dtype=np.intp)
+        current = self.score(perm)
+        while True:
+            neighbours = swap_neighbours(perm)
+            scores = self.score_many(neighbours)
+            best = int(np.argmax(scores))
+            if scores[best] <= current + 1e-9:
+                return perm, current
+            perm, current = neighbours[best], float(scores[best])
+
+
+def file_checksum(filepath: Union[str, Path]) -> bytes:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def default_cache_path(source: Union[str, Path]) -> Path:
+    return Path(source).with_suffix(CACHE_SUFFIX)
+
+
+def compile_quadgrams(
+    source: Union[str, Path],
+    target: Optional[Union[str, Path]] = None,
+    checksum: Optional[bytes] = None,
+) -> Path:
+    source = Path(source)
+    target = Path(target) if target is not None else default_cache_path(source)
+    if checksum is None:
+        checksum = file_checksum(source)
+
+    table = QuadgramTable.from_file(str(source))
+    header = _CACHE_HEADER.pack(
+        CACHE_MAGIC, CACHE_VERSION, checksum, table.floor, QUADGRAM_TABLE_SIZE
+    ).ljust(CACHE_HEADER_SIZE, b"\0")
+
+    # escreve num temporário e troca atomicamente: outros processos nunca
+    # enxergam um cache pela metade
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(table.log_probs.astype("<f4").tobytes())
+    os.replace(tmp, target)
+    return target
+
+
+def _read_cache_header(cache: Path):
+    try:
+        with open(cache, "rb") as f:
+            raw = f.read(_CACHE_HEADER.size)
+    except OSError:
+        return None
+    if len(raw) != _CACHE_HEADER.size:
+        return None
+    return _CACHE_HEADER.unpack(raw)
+
+
+def open_compiled(cache: Union[str, Path], checksum: Optional[bytes] = None) -> Optional[QuadgramTable]:
+    # Mapeia o cache em memória (somente leitura); processos que abrem o mesmo
+    # arquivo compartilham as mesmas páginas físicas. Devolve None se o cache
+    # for de outra versão ou de outro arquivo de origem.
+    cache = Path(cache)
+    header = _read_cache_header(cache)
+    if header is None:
+        return None
+    magic, version, stored_checksum, floor, size = header
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or size != QUADGRAM_TABLE_SIZE:
+        return None
+    if checksum is not None and stored_checksum != checksum:
+        return None
+    if cache.stat().st_size != CACHE_HEADER_SIZE + size * 4:
+        return None
+
+    log_probs = np.memmap(
+        cache, dtype="<f4", mode="r", offset=CACHE_HEADER_SIZE, shape=(size,)
+    )
+    table = QuadgramTable(log_probs, floor)
+    table.compiled_from = (str(cache.resolve()), stored_checksum)
+    return table
+
+
+def _reopen_compiled(cache: str, checksum: bytes) -> QuadgramTable:
+    # desserialização de uma tabela aberta do cache (ex.: nos workers da
+    # têmpera paralela)
+    table = open_compiled(cache, checksum)
+    if table is None:
+        raise ValueError(f"Cache de quadgramas ausente ou alterado: {cache}")
+    return table
+
+
+# tabelas abertas por load_quadgram_table neste processo
+_opened_tables: Dict[Tuple[str, str, int, int], QuadgramTable] = {}
+
+
+def load_quadgram_table(
+    source: Union[str, Path],
+    cache: Optional[Union[str, Path]] = None,
+) -> QuadgramTable:
+    # Usa o cache compilado se ele corresponder ao checksum de `source`;
+    # caso contrário recompila. Sem permissão de escrita, cai no parse do texto.
+    # No mesmo processo, a mesma origem (sem mudar de tamanho nem de data)
+    # devolve a tabela já aberta, sem refazer o checksum.
+    source = Path(source)
+    cache = Path(cache) if cache is not None else default_cache_path(source)
+    stat = source.stat()
+    opened_key = (str(source.resolve()), str(cache.resolve()), stat.st_mtime_ns, stat.st_size)
+    table = _opened_tables.get(opened_key)
+    if table is not None:
+        return table
+    checksum = file_checksum(source)
+
+    table = open_compiled(cache, checksum)
+    if table is None:
+        try:
+            compile_quadgrams(source, cache, checksum)
+        except OSError:
+            table = QuadgramTable.from_file(str(source))
+        else:
+            table = open_compiled(cache, checksum)
+    _opened_tables[opened_key] = table
+    return table
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python ngramas.py <quadgrams.txt> [saida.qbin]")
+        sys.exit(1)
+    out = compile_quadgrams(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None)
+    print(f"[INFO] Tabela compilada em: {out}")
@@ -0,0 +1,116 @@
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from artefato1 import EnglishScorer, SimulatedAnnealingDecoder
+
+# Estado de cada processo do pool: o scorer é carregado uma única vez por
+# processo (a tabela vem do cache .qbin mapeado em memória, então todos os
+# processos compartilham as mesmas páginas físicas).
+_worker_scorer: Optional[EnglishScorer] = None
+_worker_stop = None
+
+
+class ChainResult(NamedTuple):
+    seed: int
+    key: List[str]
+    score: float
+    plaintext: str
+
+
+def derive_seed(base_seed: int, chain: int) -> int:
+    digest = hashlib.sha256(f"{base_seed}:{chain}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def _init_worker(quadgram_file: Optional[str], stop_event):
+    global _worker_scorer, _worker_stop
+    _worker_scorer = EnglishScorer(quadgram_file, verbose=False)
+    # tabela lida antes da primeira cadeia (EnglishScorer carrega no primeiro uso)
+    _worker_scorer.quadgrams
+    _worker_stop = stop_event
+
+
+def _run_chain(ciphertext: str, seed: int, decoder_kwargs: Dict) -> ChainResult:
+    decoder = SimulatedAnnealingDecoder(
+        ciphertext=ciphertext,
+        scorer=_worker_scorer,
+        random_seed=seed,
+        should_stop=_worker_stop.is_set,
+        **decoder_kwargs,
+    )
+    key, score, plain = decoder.run()
+    return ChainResult(seed, key, score, plain)
+
+
+class ParallelAnnealingRunner:
+    # Roda várias cadeias independentes de SimulatedAnnealingDecoder em um
+    # pool de processos e devolve os resultados ordenados por score.
+    # A busca para antes do fim quando `agreement` cadeias chegam à mesma chave.
+
+    def __init__(
+        self,
+        ciphertext: str,
+        quadgram_file: Optional[str],
+        n_chains: int = 8,
+        workers: Optional[int] = None,
+        random_seed: int = 0,
+        agreement: int = 3,
+        **decoder_kwargs,
+    ):
+        self.ciphertext = ciphertext
+        self.quadgram_file = quadgram_file
+        self.n_chains = n_chains
+        self.workers = workers or min(n_chains, os.cpu_count() or 1)
+        self.random_seed = random_seed
+        self.agreement = agreement
+        self.decoder_kwargs = decoder_kwargs
+
+        # letras ausentes no texto podem ficar em qualquer posição da chave,
+        # então a concordância só compara o mapeamento das letras presentes
+        self._present = sorted({
+            ord(ch) - ord('A') for ch in ciphertext.upper() if 'A' <= ch <= 'Z'
+        })
+
+    def _signature(self, key: List[str]) -> Tuple[str, ...]:
+        return tuple(key[c] for c in self._present)
+
+    def run(self) -> List[ChainResult]:
+        seeds = [derive_seed(self.random_seed, i) for i in range(self.n_chains)]
+        stop_event = multiprocessing.Event()
+        results: List[ChainResult] = []
+        votes: Dict[Tuple[str, ...], int] = {}
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.quadgram_file, stop_event),
+        )
+        try:
+            pending = {
+                executor.submit(_run_chain, self.ciphertext, seed, self.decoder_kwargs)
+                for seed in seeds
+            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.cancelled():
+                        continue
+                    result = future.result()
+                    results.append(result)
+                    sig = self._signature(result.key)
+                    votes[sig] = votes.get(sig, 0) + 1
+                    if self.agreement and votes[sig] >= self.agreement:
+                        stop_event.set()
+                        for other in pending:
+                            other.cancel()
+        finally:
+            # as pendentes já foram canceladas acima (cancel_futures é só do 3.9+)
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+        results.sort(key=lambda r: r.score, reverse=True)
+        return results
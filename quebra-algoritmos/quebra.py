@@ -0,0 +1,162 @@
+import argparse
+import importlib
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# Ponto de entrada único dos quebradores: linha de comando e fachada de
+# importação.
+#
+#     python quebra.py substituicao texto.txt --busca subida
+#     python quebra.py transposicao - --max 12 < cifra.txt
+#     python quebra.py lote exemplos/permutacao.jsonl -t 5
+#
+# Este módulo só importa a biblioteca padrão: `--help` e os erros de
+# argumento respondem sem carregar numpy nem a tabela de quadgramas, e cada
+# subcomando importa só os módulos de que precisa. `lote`, `servidor`,
+# `modelos` e `benchmark` repassam os argumentos ao main() do módulo.
+#
+# Como fachada, `import quebra` também é barato: `quebra.SimulatedAnnealingDecoder`
+# (ou `from quebra import PermutationBreaker`) importa o módulo de origem no
+# primeiro acesso. A pasta tem hífen no nome e os scripts rodam por caminho,
+# por isso a fachada é um módulo e não um pacote.
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_QUADGRAMS = SCRIPT_DIR / "quadgrams.txt"
+
+# nome público -> módulo de origem
+_EXPORTS = {
+    "SubstitutionCipher": "artefato1",
+    "EnglishScorer": "artefato1",
+    "SimulatedAnnealingDecoder": "artefato1",
+    "HillClimbDecoder": "artefato1",
+    "NgramScorer": "artefato2",
+    "PermutationBreaker": "artefato2",
+    "break_transposition_sweep": "artefato2",
+    "CombinedBreaker": "artefato3",
+    "rank_cipher_families": "analise",
+    "rank_transposition_keys": "analise",
+    "BatchRunner": "lote",
+    "ModelRegistry": "modelos",
+    "ResultCache": "memoria",
+    "AnnealingSchedule": "recozimento",
+    "Checkpoint": "retomada",
+    "Telemetry": "telemetria",
+    "load_quadgram_table": "ngramas",
+}
+__all__ = sorted(_EXPORTS)
+
+# subcomandos que repassam os argumentos ao main() de outro módulo
+_DELEGATED = {
+    "lote": ("lote", "quebra em lote (JSONL/CSV -> JSONL)"),
+    "servidor": ("servidor", "serviço HTTP/WebSocket local"),
+    "modelos": ("modelos", "modelos de n-gramas por idioma (build, list, detect)"),
+    "benchmark": ("benchmark", "benchmark dos quebradores e do tempo de partida"),
+}
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+def read_ciphertext(path: str) -> str:
+    if path == "-":
+        return sys.stdin.read()
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def run_substitution(args: argparse.Namespace):
+    from artefato1 import EnglishScorer, HillClimbDecoder, SimulatedAnnealingDecoder, preprocess_ciphertext
+    from retomada import Checkpoint
+
+    ciphertext = preprocess_ciphertext(read_ciphertext(args.arquivo))
+    scorer = EnglishScorer(args.quadgramas, verbose=args.verbose)
+    if args.busca == "subida":
+        decoder = HillClimbDecoder(ciphertext, scorer, random_seed=args.semente)
+    else:
+        checkpoint = Checkpoint(args.retomada) if args.retomada else None
+        decoder = SimulatedAnnealingDecoder(
+            ciphertext=ciphertext,
+            scorer=scorer,
+            random_seed=args.semente,
+            batch=args.lote,
+            checkpoint=checkpoint,
+        )
+    key, score, plaintext = decoder.run()
+    print(f"Chave: {''.join(key)}")
+    print(f"Score: {score:.2f}")
+    print(plaintext.strip())
+
+
+def run_transposition(args: argparse.Namespace):
+    from artefato2 import NgramScorer, PermutationBreaker, break_transposition_sweep
+
+    ciphertext = read_ciphertext(args.arquivo)
+    breaker = PermutationBreaker(NgramScorer(args.quadgramas), random_seed=args.semente)
+    candidates = break_transposition_sweep(
+        breaker, ciphertext, args.min, args.max, verbose=args.verbose, top_candidates=args.candidatos,
+        checkpoint_dir=args.retomada,
+    )
+    best = max(candidates.values(), key=lambda c: c["score"])
+    print(f"Tipo de cifra: {best['mode']}")
+    print(f"Chave: {best['key']}")
+    print(f"Score: {best['score']:.2f}")
+    print(best["text"])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="quebra.py", description="Quebradores de cifras clássicas.")
+    commands = parser.add_subparsers(dest="comando", metavar="comando", required=True)
+
+    substitution = commands.add_parser("substituicao", help="substituição monoalfabética")
+    substitution.add_argument("arquivo", help="texto cifrado ('-' para a entrada padrão)")
+    substitution.add_argument("--busca", choices=("recozimento", "subida"), default="recozimento")
+    substitution.add_argument("--lote", action="store_true", help="recozimento com vizinhas avaliadas em lote")
+    substitution.add_argument("--retomada", default=None, help="arquivo do ponto de retomada do recozimento")
+    substitution.set_defaults(run=run_substitution)
+
+    transposition = commands.add_parser("transposicao", help="transposição colunar e por blocos")
+    transposition.add_argument("arquivo", help="texto cifrado ('-' para a entrada padrão)")
+    transposition.add_argument("--min", type=int, default=2, help="menor tamanho de chave")
+    transposition.add_argument("--max", type=int, default=10, help="maior tamanho de chave")
+    transposition.add_argument("--candidatos", type=int, default=4,
+                               help="(modo, tamanho) mais bem colocados na pré-análise (0: todos)")
+    transposition.add_argument("--retomada", default=None,
+                               help="pasta dos pontos de retomada das têmperas (chaves acima de 16)")
+    transposition.set_defaults(run=run_transposition)
+
+    for command in (substitution, transposition):
+        command.add_argument("--semente", type=int, default=None)
+        command.add_argument("--quadgramas", default=str(DEFAULT_QUADGRAMS))
+        command.add_argument("-v", "--verbose", action="store_true")
+
+    for name, (_, description) in _DELEGATED.items():
+        delegated = commands.add_parser(name, help=description, add_help=False)
+        delegated.add_argument("argumentos", nargs=argparse.REMAINDER)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in _DELEGATED:
+        # o parser do próprio módulo trata os argumentos (e o --help)
+        module = importlib.import_module(_DELEGATED[argv[0]][0])
+        sys.argv = [f"{Path(sys.argv[0]).name} {argv[0]}", *argv[1:]]
+        module.main()
+        return
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
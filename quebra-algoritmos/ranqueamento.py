@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+# Escolha do melhor candidato de decifração por um LLM, fora do caminho
+# crítico: só os candidatos de melhor score de n-gramas (com o texto truncado)
+# vão para o modelo, os veredictos ficam em cache pelo hash do conteúdo e, se a
+# chamada estourar o prazo ou falhar, vale o melhor score de n-gramas.
+#
+# O backend é plugável: qualquer objeto com `async def complete(prompt,
+# candidates) -> str` que devolva o JSON pedido no prompt. `StubBackend`
+# responde localmente, sem rede.
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+PROMPT_HEADER = (
+    "We are breaking a classical cipher. Below are several candidate decryptions.\n"
+    "Each candidate has a label, a cipher mode (columnar or block), a key length,\n"
+    "and the decrypted text.\n\n"
+    "Your tasks:\n"
+    "1) Decide which candidate label has the most plausible English plaintext.\n"
+    "2) Provide a cleaned-up suggestion of the original plaintext in natural English,\n"
+    "   with NORMAL SPACES between words and proper punctuation.\n"
+    "   You MUST segment the text into words. Do NOT return an all-caps string\n"
+    "   without spaces. The suggestion should look like a normal English sentence,\n"
+    "   for example: \"Tomorrow at the break of dawn, the silence of the mountains...\".\n\n"
+    "Respond ONLY in valid JSON with the following format:\n"
+    "{\n"
+    "  \"best_label\": \"<label>\",\n"
+    "  \"suggestion\": \"<your suggested plaintext>\"\n"
+    "}\n\n"
+    "Candidates:\n\n"
+)
+
+
+class Verdict(NamedTuple):
+    label: str
+    suggestion: str
+    source: str  # "llm", "cache" ou "ngram" (fallback)
+
+
+def build_prompt(shortlist: Dict[str, Dict], max_chars: int) -> str:
+    prompt = PROMPT_HEADER
+    for label, info in shortlist.items():
+        prompt += (
+            f"Label: {label}\n"
+            f"Mode: {info['mode']}\n"
+            f"Key length: {info['key_len']}\n"
+            f"Decrypted text: {info['text'][:max_chars]}\n\n"
+        )
+    return prompt
+
+
+def parse_verdict(raw: str, labels: Sequence[str]) -> Verdict:
+    raw = (raw or "").strip()
+    # remove o bloco ```json ... ``` se presente
+    if raw.startswith("```"):
+        lines = raw.split('\n')
+        if len(lines) > 2:
+            raw = '\n'.join(lines[1:-1]).strip()
+
+    data = json.loads(raw)
+    label = data["best_label"]
+    if label not in labels:
+        raise ValueError(f"Label desconhecido na resposta: {label!r}")
+    suggestion = data.get("suggestion") or ""
+    if " " not in suggestion.strip():
+        print("[WARN] A sugestão do LLM veio sem espaços:")
+        print(suggestion)
+    return Verdict(label, suggestion, "llm")
+
+
+class GeminiBackend:
+    def __init__(self, api_key: str, model: str = DEFAULT_MODEL):
+        self.api_key = api_key
+        self.model = model
+        self._client = None
+
+    @property
+    def client(self):
+        # um único cliente por backend; o SDK só é importado no primeiro uso
+        if self._client is None:
+            from google import genai
+            self._client = genai.Client(api_key=self.api_key)
+        return self._client
+
+    async def complete(self, prompt: str, candidates: Dict[str, Dict]) -> str:
+        response = await self.client.aio.models.generate_content(model=self.model, contents=prompt)
+        return response.text or ""
+
+
+class StubBackend:
+    # Backend local: escolhe o candidato de maior score de n-gramas (ou o que
+    # `choose(candidates)` devolver), com atraso opcional para simular a rede.
+    def __init__(self, choose=None, delay: float = 0.0):
+        self.choose = choose
+        self.delay = delay
+        self.calls = 0
+
+    async def complete(self, prompt: str, candidates: Dict[str, Dict]) -> str:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.choose is not None:
+            label = self.choose(candidates)
+        else:
+            label = max(candidates, key=lambda lab: candidates[lab]["score"])
+        return json.dumps({"best_label": label, "suggestion": candidates[label]["text"]})
+
+
+class LLMRanker:
+    def __init__(
+        self,
+        backend,
+        top: int = 5,
+        max_chars: int = 400,
+        timeout: float = 20.0,
+        retries: int = 1,
+        cache_size: int = 256,
+        verbose: bool = False,
+    ):
+        self.backend = backend
+        self.top = top
+        self.max_chars = max_chars
+        self.timeout = timeout
+        self.retries = retries
+        self.cache_size = cache_size
+        self.verbose = verbose
+        self._cache: "OrderedDict[str, Verdict]" = OrderedDict()
+        self._pending: Dict[str, "asyncio.Future[Verdict]"] = {}
+        # loop das chamadas síncronas (choose, choose_many), reaproveitado
+        # entre elas: o cliente assíncrono do backend (genai) fica preso ao
+        # loop em que fez a primeira chamada
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def shortlist(self, candidates: Dict[str, Dict]) -> Dict[str, Dict]:
+        best = sorted(candidates, key=lambda lab: candidates[lab]["score"], reverse=True)
+        return {label: candidates[label] for label in best[:self.top]}
+
+    def cache_key(self, shortlist: Dict[str, Dict]) -> str:
+        # o veredicto só depende do que vai no prompt
+        content = [
+            (label, info["mode"], info["key_len"], info["text"][:self.max_chars])
+            for label, info in shortlist.items()
+        ]
+        return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
+
+    def _fallback(self, shortlist: Dict[str, Dict]) -> Verdict:
+        label = next(iter(shortlist))
+        return Verdict(label, shortlist[label]["text"], "ngram")
+
+    async def choose_async(self, candidates: Dict[str, Dict]) -> Verdict:
+        if not candidates:
+            raise ValueError("Nenhum candidato para ranquear.")
+        shortlist = self.shortlist(candidates)
+        if len(shortlist) == 1:
+            return self._fallback(shortlist)
+
+        key = self.cache_key(shortlist)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached._replace(source="cache")
+
+        # lotes iguais em paralelo compartilham a mesma chamada
+        pending = self._pending.get(key)
+        if pending is not None:
+            return (await asyncio.shield(pending))._replace(source="cache")
+
+        task = asyncio.ensure_future(self._ask(shortlist, key))
+        self._pending[key] = task
+        try:
+            return await task
+        finally:
+            del self._pending[key]
+
+    async def _ask(self, shortlist: Dict[str, Dict], key: str) -> Verdict:
+        prompt = build_prompt(shortlist, self.max_chars)
+        for attempt in range(self.retries + 1):
+            try:
+                raw = await asyncio.wait_for(self.backend.complete(prompt, shortlist), self.timeout)
+                if self.verbose:
+                    print("\n--- Resposta bruta do LLM ---\n")
+                    print(raw)
+                verdict = parse_verdict(raw, list(shortlist))
+            except asyncio.TimeoutError:
+                print(f"[WARN] LLM não respondeu em {self.timeout:g}s.")
+                break
+            except Exception as e:
+                print(f"[WARN] Falha ao consultar o LLM (tentativa {attempt + 1}): {e}")
+                continue
+            self._cache[key] = verdict
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return verdict
+
+        return self._fallback(shortlist)
+
+    async def choose_many_async(self, batches: List[Dict[str, Dict]]) -> List[Verdict]:
+        return list(await asyncio.gather(*(self.choose_async(c) for c in batches)))
+
+    def _run(self, coroutine):
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coroutine)
+
+    def choose(self, candidates: Dict[str, Dict]) -> Verdict:
+        return self._run(self.choose_async(candidates))
+
+    def choose_many(self, batches: List[Dict[str, Dict]]) -> List[Verdict]:
+        return self._run(self.choose_many_async(batches))
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+
+def gemini_ranker(api_key: Optional[str], **kwargs) -> LLMRanker:
+    if not api_key or api_key == "YOUR_API_KEY_HERE":
+        raise RuntimeError("GEMINI_API_KEY não configurada.")
+    return LLMRanker(GeminiBackend(api_key), **kwargs)
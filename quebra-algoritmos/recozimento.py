@@ -0,0 +1,151 @@
+import math
+import random
+from typing import Dict, Iterable, Optional
+
+# Cronograma de temperatura compartilhado pelos recozimentos (substituição e
+# transposição). O laço de cada quebrador fica assim:
+#
+#     schedule.calibrate(deltas_de_trocas_aleatorias)   # opcional
+#     schedule.start(score_inicial, n_letras)
+#     while True:
+#         for _ in range(schedule.iterations_per_temp):
+#             ... if schedule.accept(delta, rng): ...
+#         if not schedule.next_level(melhor_score):
+#             break
+#
+# - temperatura inicial: fixa ou calibrada para que uma piora típica seja
+#   aceita com probabilidade `initial_acceptance`;
+# - resfriamento: geométrico, acelerado enquanto quase tudo é aceito (ainda
+#   quente demais) e desacelerado quando quase nada é aceito (perto de congelar);
+# - parada: temperatura final, `plateau_levels` níveis sem melhorar o melhor
+#   score, score por letra >= `target_per_char` ou `max_iterations`.
+
+MIN_TEMP_RATIO = 0.01
+HIGH_ACCEPTANCE = 0.3
+LOW_ACCEPTANCE = 0.05
+# taxa de aceitação abaixo da qual um nível sem melhora conta para o platô
+PLATEAU_ACCEPTANCE = 0.1
+# atributos que mudam durante a busca (os demais vêm do construtor)
+_STATE_FIELDS = (
+    "temperature", "iterations", "levels", "stop_reason", "_calibrated",
+    "_final", "_length", "_best", "_stale", "_attempts", "_accepted",
+)
+
+
+class AnnealingSchedule:
+    def __init__(
+        self,
+        initial_temp: Optional[float] = None,
+        final_temp: Optional[float] = None,
+        cooling_rate: float = 0.97,
+        iterations_per_temp: int = 500,
+        initial_acceptance: float = 0.2,
+        adaptive: bool = True,
+        plateau_levels: Optional[int] = 15,
+        target_per_char: Optional[float] = None,
+        max_iterations: Optional[int] = None,
+    ):
+        if not 0 < cooling_rate < 1:
+            raise ValueError("cooling_rate deve estar entre 0 e 1.")
+        self.initial_temp = initial_temp
+        self.final_temp = final_temp
+        self.cooling_rate = cooling_rate
+        self.iterations_per_temp = iterations_per_temp
+        self.initial_acceptance = initial_acceptance
+        self.adaptive = adaptive
+        self.plateau_levels = plateau_levels
+        self.target_per_char = target_per_char
+        self.max_iterations = max_iterations
+
+        self.temperature = initial_temp if initial_temp is not None else 1.0
+        self.iterations = 0
+        self.levels = 0
+        # motivo da última parada: "final_temp", "plateau", "target" ou "budget"
+        self.stop_reason: Optional[str] = None
+        self._calibrated: Optional[float] = None
+        self._length = 1
+        self._best = float("-inf")
+        self._stale = 0
+        self._attempts = 0
+        self._accepted = 0
+
+    def calibrate(self, deltas: Iterable[float]) -> float:
+        # só vale quando a temperatura inicial não foi fixada
+        worse = [-d for d in deltas if d < 0]
+        mean = sum(worse) / len(worse) if worse else 1.0
+        self._calibrated = mean / -math.log(self.initial_acceptance)
+        return self._calibrated
+
+    def start(self, score: float, length: int = 1):
+        if self.initial_temp is not None:
+            self.temperature = self.initial_temp
+        elif self._calibrated is not None:
+            self.temperature = self._calibrated
+        self._final = self.final_temp if self.final_temp is not None else self.temperature * MIN_TEMP_RATIO
+        self._length = max(1, length)
+        self._best = score
+        self._stale = 0
+        self._attempts = self._accepted = 0
+        self.iterations = 0
+        self.levels = 0
+        self.stop_reason = None
+
+    def accept(self, delta: float, rng: random.Random) -> bool:
+        # critério de Metropolis; as pioras contam para a taxa de aceitação
+        if delta > 0:
+            return True
+        self._attempts += 1
+        if self.temperature <= 0 or rng.random() >= math.exp(delta / self.temperature):
+            return False
+        self._accepted += 1
+        return True
+
+    def record(self, attempts: int, accepted: int):
+        # pioras avaliadas fora de accept (critério aplicado a um lote, ver vizinhanca.py)
+        self._attempts += attempts
+        self._accepted += accepted
+
+    def state(self) -> Dict:
+        # estado entre dois níveis, para os pontos de retomada (retomada.py)
+        return {name: getattr(self, name) for name in _STATE_FIELDS}
+
+    def restore(self, state: Dict):
+        for name in _STATE_FIELDS:
+            setattr(self, name, state[name])
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self._accepted / self._attempts if self._attempts else 0.0
+
+    def next_level(self, best_score: float) -> bool:
+        # fecha o nível atual; devolve False quando a busca deve parar
+        self.iterations += self.iterations_per_temp
+        self.levels += 1
+
+        # o platô só conta depois que a busca esfria: enquanto muitas pioras
+        # são aceitas, a cadeia ainda vagueia longe do melhor score
+        acceptance = self.acceptance_rate
+        if best_score > self._best + 1e-9:
+            self._best = best_score
+            self._stale = 0
+        elif acceptance < PLATEAU_ACCEPTANCE:
+            self._stale += 1
+
+        rate = self.cooling_rate
+        if self.adaptive:
+            if acceptance > HIGH_ACCEPTANCE:
+                rate = rate * rate
+            elif acceptance < LOW_ACCEPTANCE:
+                rate = math.sqrt(rate)
+        self.temperature *= rate
+        self._attempts = self._accepted = 0
+
+        if self.target_per_char is not None and self._best / self._length >= self.target_per_char:
+            self.stop_reason = "target"
+        elif self.plateau_levels is not None and self._stale >= self.plateau_levels:
+            self.stop_reason = "plateau"
+        elif self.max_iterations is not None and self.iterations >= self.max_iterations:
+            self.stop_reason = "budget"
+        elif self.temperature <= self._final:
+            self.stop_reason = "final_temp"
+        return self.stop_reason is None
@@ -0,0 +1,371 @@
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from retomada import Checkpoint, restore_rng, rng_state
+from telemetria import Telemetry
+
+# Têmpera paralela (troca de réplicas) para permutações longas, usada nas
+# chaves de transposição acima de EXACT_MAX_LENGTH.
+#
+# - réplicas: cada uma faz um passeio de Metropolis numa temperatura fixa,
+#   numa escala geométrica calibrada pelas pioras típicas da chave inicial
+#   (a mais fria quase só sobe, a mais quente aceita metade das pioras);
+#   a cada rodada, réplicas de temperaturas vizinhas trocam de chave com a
+#   probabilidade usual exp((s_quente - s_fria) * (1/T_fria - 1/T_quente));
+# - movimentos: troca de duas posições, inversão, rotação e deslocamento de
+#   um trecho e troca de dois trechos vizinhos. Nas transposições, trechos
+#   contíguos da chave são colunas (ou letras do bloco) vizinhas no texto
+#   claro, que costumam já estar certas entre si. Com `boundary`, a maioria
+#   dos movimentos fica de um lado só dessa posição (no colunar irregular,
+#   as colunas longas antes dela: mexer só de um lado não desloca o início
+#   dos segmentos lidos);
+# - tabu: os hashes das chaves aceitas ficam num conjunto de tamanho fixo
+#   (descarte FIFO); propostas já visitadas são descartadas sem pontuar;
+# - pontuação em lote: a cada passo, as propostas de todas as réplicas são
+#   pontuadas numa única chamada `score_keys(matriz_de_chaves)`;
+# - núcleos: com `workers > 1`, as réplicas são divididas entre processos,
+#   que evoluem em paralelo entre uma troca e outra. `scorer_factory(*args)`
+#   monta a função de pontuação uma vez em cada processo.
+#
+# A busca para após `patience` rodadas sem melhorar a melhor chave, após
+# `max_rounds` rodadas ou quando `should_stop()` devolve True. `iterations`
+# conta os passos de cada réplica.
+#
+# Com `checkpoint` (retomada.py), o estado entre rodadas (chaves e scores das
+# réplicas, temperaturas, melhor chave, gerador e memória tabu) é gravado e,
+# se o arquivo já existe com o mesmo `problem`, run() continua dele com o
+# mesmo resultado de uma execução sem interrupção. Com `workers > 1`, as
+# memórias tabu ficam nos processos e recomeçam vazias na retomada.
+
+DEFAULT_REPLICAS = 16
+STEPS_PER_ROUND = 200
+TABU_SIZE = 1 << 14
+CALIBRATION_SAMPLES = 100
+# aceitação de uma piora típica na réplica mais quente e na mais fria
+HOT_ACCEPTANCE = 0.5
+COLD_ACCEPTANCE = 1e-12
+SPLIT_MOVES = 0.5
+
+ScoreKeys = Callable[[np.ndarray], np.ndarray]
+
+
+def propose(key: List[int], rng: random.Random, boundary: int = 0) -> List[int]:
+    n = len(key)
+    if 1 < boundary < n - 1 and rng.random() < SPLIT_MOVES:
+        # movimento só de um lado de `boundary`
+        if rng.random() < boundary / n:
+            return propose(key[:boundary], rng) + key[boundary:]
+        return key[:boundary] + propose(key[boundary:], rng)
+    move = rng.randrange(5)
+    if move == 0 or n < 3:
+        # troca de duas posições
+        i, j = rng.sample(range(n), 2)
+        new_key = key[:]
+        new_key[i], new_key[j] = new_key[j], new_key[i]
+        return new_key
+    # trecho [i, j) com pelo menos duas posições
+    length = rng.randrange(2, n)
+    i = rng.randrange(n - length + 1)
+    j = i + length
+    segment = key[i:j]
+    if move == 1:
+        return key[:i] + segment[::-1] + key[j:]
+    if move == 2:
+        if rng.random() < 0.5:
+            return key[:i] + segment[1:] + segment[:1] + key[j:]
+        return key[:i] + segment[-1:] + segment[:-1] + key[j:]
+    if move == 3:
+        # deslocamento: tira o trecho e o insere em outra posição
+        rest = key[:i] + key[j:]
+        p = rng.randrange(len(rest) + 1)
+        return rest[:p] + segment + rest[p:]
+    # troca dos trechos [i, m) e [m, j)
+    m = rng.randrange(i + 1, j)
+    return key[:i] + key[m:j] + key[i:m] + key[j:]
+
+
+class TabuMemory:
+    # hashes das chaves visitadas recentemente (8 bytes cada), com descarte FIFO
+    def __init__(self, size: int = TABU_SIZE):
+        self.size = size
+        self._ring: List[Optional[int]] = [None] * size
+        self._pos = 0
+        self._hashes: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, key_hash: int) -> bool:
+        return key_hash in self._hashes
+
+    def add(self, key_hash: int):
+        if key_hash in self._hashes:
+            return
+        old = self._ring[self._pos]
+        if old is not None:
+            self._hashes.discard(old)
+        self._ring[self._pos] = key_hash
+        self._pos = (self._pos + 1) % self.size
+        self._hashes.add(key_hash)
+
+    def state(self) -> Dict:
+        return {"ring": list(self._ring), "pos": self._pos}
+
+    def restore(self, state: Dict):
+        self._ring = list(state["ring"])
+        self._pos = state["pos"]
+        self._hashes = {h for h in self._ring if h is not None}
+
+
+def evolve(
+    score_keys: ScoreKeys,
+    keys: List[List[int]],
+    scores: List[float],
+    temperatures: Sequence[float],
+    steps: int,
+    rng: random.Random,
+    tabu: TabuMemory,
+    boundary: int = 0,
+) -> Tuple[List[List[int]], List[float], List[int], float, int, int]:
+    # `steps` passos de Metropolis para cada réplica; devolve as chaves, os
+    # scores, a melhor chave vista, seu score, aceitas e tentadas
+    keys = [k[:] for k in keys]
+    scores = list(scores)
+    best = max(range(len(keys)), key=lambda r: scores[r])
+    best_key, best_score = keys[best][:], scores[best]
+    accepted = attempted = 0
+    for _ in range(steps):
+        proposals, owners = [], []
+        for r, key in enumerate(keys):
+            proposal = propose(key, rng, boundary)
+            if hash(tuple(proposal)) in tabu:
+                continue
+            proposals.append(proposal)
+            owners.append(r)
+        if not proposals:
+            continue
+        attempted += len(proposals)
+        new_scores = score_keys(np.array(proposals))
+        for proposal, r, score in zip(proposals, owners, new_scores.tolist()):
+            delta = score - scores[r]
+            if delta >= 0 or rng.random() < math.exp(delta / temperatures[r]):
+                keys[r], scores[r] = proposal, score
+                tabu.add(hash(tuple(proposal)))
+                accepted += 1
+                if score > best_score:
+                    best_key, best_score = proposal[:], score
+    return keys, scores, best_key, best_score, accepted, attempted
+
+
+_worker_score_keys: Optional[ScoreKeys] = None
+_worker_tabu: Optional[TabuMemory] = None
+
+
+def _init_worker(scorer_factory: Callable[..., ScoreKeys], scorer_args: tuple, tabu_size: int):
+    global _worker_score_keys, _worker_tabu
+    _worker_score_keys = scorer_factory(*scorer_args)
+    _worker_tabu = TabuMemory(tabu_size)
+
+
+def _evolve_in_worker(keys, scores, temperatures, steps, seed, boundary):
+    return evolve(_worker_score_keys, keys, scores, temperatures, steps, random.Random(seed), _worker_tabu, boundary)
+
+
+class ReplicaExchange:
+    def __init__(
+        self,
+        scorer_factory: Callable[..., ScoreKeys],
+        scorer_args: tuple,
+        replicas: int = DEFAULT_REPLICAS,
+        steps_per_round: int = STEPS_PER_ROUND,
+        patience: int = 25,
+        max_rounds: Optional[int] = 500,
+        workers: int = 1,
+        tabu_size: int = TABU_SIZE,
+        boundary: int = 0,
+        random_seed: Optional[int] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        telemetry: Optional[Telemetry] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        problem: str = "",
+    ):
+        if replicas < 2:
+            raise ValueError("A têmpera paralela precisa de pelo menos duas réplicas.")
+        self.scorer_factory = scorer_factory
+        self.scorer_args = scorer_args
+        self.score_keys = scorer_factory(*scorer_args)
+        self.replicas = replicas
+        self.patience = patience
+        self.max_rounds = max_rounds
+        self.workers = max(1, min(workers, replicas))
+        self.tabu_size = tabu_size
+        self.boundary = boundary
+        self.rng = random.Random(random_seed)
+        self.should_stop = should_stop
+        self.telemetry = telemetry
+        self.checkpoint = checkpoint
+        self.problem = problem
+        self.temperatures: List[float] = []
+
+        # mesmos nomes do AnnealingSchedule, para Telemetry.level()
+        self.iterations_per_temp = steps_per_round
+        self.iterations = 0
+        self.levels = 0
+        self.temperature = 0.0
+        self.acceptance_rate = 0.0
+        self.exchanges = 0
+        self.stop_reason: Optional[str] = None
+
+    def calibrate(self, key: List[int], score: float) -> List[float]:
+        proposals = [propose(key, self.rng, self.boundary) for _ in range(CALIBRATION_SAMPLES)]
+        deltas = self.score_keys(np.array(proposals)) - score
+        worse = -deltas[deltas < 0]
+        typical = float(worse.mean()) if len(worse) else 1.0
+        hot = typical / -math.log(HOT_ACCEPTANCE)
+        cold = typical / -math.log(COLD_ACCEPTANCE)
+        ratio = (hot / cold) ** (1 / (self.replicas - 1))
+        # índice 0 é a réplica mais fria
+        self.temperatures = [cold * ratio ** r for r in range(self.replicas)]
+        return self.temperatures
+
+    def _exchange(self, keys: List[List[int]], scores: List[float]):
+        # pares vizinhos alternados (pares numa rodada, ímpares na seguinte)
+        temps = self.temperatures
+        for cold in range(self.levels % 2, self.replicas - 1, 2):
+            hot = cold + 1
+            log_p = (scores[hot] - scores[cold]) * (1 / temps[cold] - 1 / temps[hot])
+            if log_p >= 0 or self.rng.random() < math.exp(log_p):
+                keys[cold], keys[hot] = keys[hot], keys[cold]
+                scores[cold], scores[hot] = scores[hot], scores[cold]
+                self.exchanges += 1
+
+    def _snapshot(self, keys, scores, best_key, best_score, stale, tabu) -> Dict:
+        return {
+            "keys": keys,
+            "scores": scores,
+            "temperatures": self.temperatures,
+            "best_key": best_key,
+            "best_score": best_score,
+            "stale": stale,
+            "iterations": self.iterations,
+            "levels": self.levels,
+            "exchanges": self.exchanges,
+            "rng": rng_state(self.rng),
+            "tabu": tabu.state(),
+        }
+
+    def run(self, starts: Sequence[Sequence[int]]) -> Tuple[List[int], float]:
+        starts = [list(map(int, k)) for k in starts]
+        if not starts:
+            raise ValueError("Nenhuma chave inicial.")
+        n = len(starts[0])
+        tabu = TabuMemory(self.tabu_size)
+        resumed = self.checkpoint.load(self.problem) if self.checkpoint is not None else None
+        if resumed is None:
+            start_scores = self.score_keys(np.array(starts)).tolist()
+            order = sorted(range(len(starts)), key=lambda i: -start_scores[i])
+            keys = [starts[i] for i in order[:self.replicas]]
+            scores = [start_scores[i] for i in order[:self.replicas]]
+            # réplicas sem chave inicial partem de chaves aleatórias
+            while len(keys) < self.replicas:
+                key = self.rng.sample(range(n), n)
+                keys.append(key)
+                scores.append(float(self.score_keys(np.array([key]))[0]))
+            self.calibrate(keys[0], scores[0])
+            best_key, best_score = keys[0][:], scores[0]
+            stale = 0
+        else:
+            keys, scores = resumed["keys"], resumed["scores"]
+            self.temperatures = resumed["temperatures"]
+            best_key, best_score = resumed["best_key"], resumed["best_score"]
+            stale = resumed["stale"]
+            self.iterations = resumed["iterations"]
+            self.levels = resumed["levels"]
+            self.exchanges = resumed["exchanges"]
+            restore_rng(self.rng, resumed["rng"])
+            tabu.restore(resumed["tabu"])
+        self.temperature = self.temperatures[0]
+
+        telemetry = self.telemetry
+        if telemetry is not None:
+            telemetry.start("transposition_tempering", key_len=n, replicas=self.replicas,
+                            workers=self.workers, temperatures=self.temperatures)
+
+        groups = [list(range(w, self.replicas, self.workers)) for w in range(self.workers)]
+        running = resumed is None or not resumed["done"]
+        pool = None
+        if self.workers > 1 and running:
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.scorer_factory, self.scorer_args, self.tabu_size),
+            )
+        try:
+            while running:
+                steps = self.iterations_per_temp
+                if pool is None:
+                    outcomes = [evolve(self.score_keys, keys, scores, self.temperatures, steps, self.rng, tabu, self.boundary)]
+                else:
+                    futures = [
+                        pool.submit(
+                            _evolve_in_worker,
+                            [keys[r] for r in group],
+                            [scores[r] for r in group],
+                            [self.temperatures[r] for r in group],
+                            steps,
+                            self.rng.getrandbits(64),
+                            self.boundary,
+                        )
+                        for group in groups
+                    ]
+                    outcomes = [f.result() for f in futures]
+
+                accepted = attempted = 0
+                improved = False
+                members = [list(range(self.replicas))] if pool is None else groups
+                for group, (g_keys, g_scores, g_best, g_best_score, g_acc, g_att) in zip(members, outcomes):
+                    for r, key, score in zip(group, g_keys, g_scores):
+                        keys[r], scores[r] = key, score
+                    accepted += g_acc
+                    attempted += g_att
+                    if g_best_score > best_score + 1e-9:
+                        best_key, best_score = g_best, g_best_score
+                        improved = True
+                self.acceptance_rate = accepted / attempted if attempted else 0.0
+
+                if telemetry is not None:
+                    telemetry.level(self, scores[0], best_score, best_key=best_key, exchanges=self.exchanges)
+                self._exchange(keys, scores)
+                self.iterations += steps
+                self.levels += 1
+                stale = 0 if improved else stale + 1
+
+                if stale >= self.patience:
+                    self.stop_reason = "plateau"
+                    break
+                if self.max_rounds is not None and self.levels >= self.max_rounds:
+                    self.stop_reason = "budget"
+                    break
+                if self.should_stop is not None and self.should_stop():
+                    self.stop_reason = "should_stop"
+                    break
+                if self.checkpoint is not None:
+                    self.checkpoint.maybe_save(
+                        self.problem, lambda: self._snapshot(keys, scores, best_key, best_score, stale, tabu),
+                    )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if self.checkpoint is not None:
+            # parada por should_stop (prazo do lote) continua depois
+            done = self.stop_reason != "should_stop"
+            self.checkpoint.save(self.problem, self._snapshot(keys, scores, best_key, best_score, stale, tabu), done)
+
+        if telemetry is not None:
+            telemetry.finish(best_score=best_score, iterations=self.iterations, stop_reason=self.stop_reason)
+        return best_key, best_score
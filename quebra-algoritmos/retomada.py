@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+# Pontos de retomada dos recozimentos longos (substituição e transposição).
+#
+# No fim de um nível de temperatura, no máximo uma vez a cada `interval`
+# segundos, a busca grava um JSON pequeno: chaves atual e melhor, scores,
+# estado do cronograma (recozimento.AnnealingSchedule.state) e estado dos
+# geradores aleatórios da cadeia. A gravação é atômica (arquivo temporário,
+# fsync e os.replace): uma interrupção no meio deixa o ponto anterior intacto.
+#
+# Rodada de novo com o mesmo arquivo, a busca continua do nível seguinte ao
+# gravado e chega ao mesmo resultado de uma execução sem interrupção. A
+# assinatura `problem` (texto cifrado e tipo de busca) impede retomar com
+# outro texto. Uma busca que terminou grava `done` e, retomada, devolve o
+# resultado sem buscar de novo; interrompida por should_stop (prazo do
+# lote), grava o ponto para continuar depois.
+
+SNAPSHOT_VERSION = 1
+DEFAULT_INTERVAL = 30.0
+
+
+def problem_signature(*parts) -> str:
+    content = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def rng_state(rng: random.Random) -> list:
+    version, internal, gauss = rng.getstate()
+    return [version, list(internal), gauss]
+
+
+def restore_rng(rng: random.Random, state: list):
+    version, internal, gauss = state
+    rng.setstate((version, tuple(internal), gauss))
+
+
+class Checkpoint:
+    def __init__(self, path: Union[str, Path], interval: float = DEFAULT_INTERVAL):
+        self.path = Path(path)
+        self.interval = interval
+        # pontos gravados por este objeto
+        self.saves = 0
+        self._last = time.monotonic()
+
+    def load(self, problem: str) -> Optional[Dict]:
+        if not self.path.exists():
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("problem") != problem:
+            raise ValueError(f"O ponto de retomada {self.path} é de outra busca.")
+        self._last = time.monotonic()
+        return snapshot
+
+    def save(self, problem: str, state: Dict, done: bool = False):
+        snapshot = {"version": SNAPSHOT_VERSION, "problem": problem, "done": done, **state}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self._last = time.monotonic()
+        self.saves += 1
+
+    def maybe_save(self, problem: str, state: Callable[[], Dict]):
+        # `state` só é montado quando o intervalo venceu
+        if time.monotonic() - self._last >= self.interval:
+            self.save(problem, state())
@@ -0,0 +1,462 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import lote
+from telemetria import Telemetry
+
+# Serviço local (HTTP + WebSocket, só biblioteca padrão) que expõe os
+# quebradores ao frontend. Os modelos ficam carregados nos processos do pool,
+# os jobs entram numa fila limitada e o progresso é transmitido ao vivo:
+#
+#   POST   /jobs              {ciphertext, mode, ...} (mesmos campos do lote) -> 202 {id, status}
+#   GET    /jobs/<id>         estado e, ao terminar, o resultado
+#   DELETE /jobs/<id>         cancela (na fila: descarta; rodando: para e devolve o melhor até ali)
+#   GET    /jobs/<id>/events  WebSocket com os eventos da telemetria (níveis com a
+#                             melhor chave parcial, candidatos...) e o estado final;
+#                             a mensagem {"action": "cancel"} também cancela
+#   GET    /health            processos, jobs na fila e rodando
+#
+# Limites: `max_queue` jobs ativos (fila + execução) no total, senão 503, e
+# `max_per_client` por cliente (cabeçalho X-Client-Id ou IP), senão 429.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_BODY = 1 << 20
+EVENT_HISTORY = 200
+# intervalo mínimo entre eventos "level" de um job (o recozimento emite centenas)
+LEVEL_EVENT_INTERVAL = 0.1
+FINISHED = ("done", "error", "cancelled")
+# espera máxima de um processo pelos demais no aquecimento do pool
+WARM_UP_TIMEOUT = 120.0
+
+_events = None
+_cancelled = None
+
+
+class ServiceError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# --- processos do pool ---
+
+def _init_worker(quadgram_file: str, cache_path: Optional[str], events, cancelled):
+    global _events, _cancelled
+    lote._init_worker(quadgram_file, cache_path)
+    _events = events
+    _cancelled = cancelled
+
+
+def _warm_up(barrier) -> int:
+    # cada processo fica preso na barreira até todos chegarem: nenhum pega
+    # dois aquecimentos, então o pool inteiro sobe (e carrega os modelos)
+    try:
+        barrier.wait(WARM_UP_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass
+    return os.getpid()
+
+
+class _EventForwarder:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._last_level = 0.0
+
+    def __call__(self, event: Dict):
+        if event["event"] == "level":
+            now = time.monotonic()
+            if now - self._last_level < LEVEL_EVENT_INTERVAL:
+                return
+            self._last_level = now
+        _events.put((self.job_id, event))
+
+
+def _run_job(job_id: str, job: Dict, time_budget: Optional[float]) -> Dict:
+    _events.put((job_id, {"event": "running"}))
+    telemetry = Telemetry(_EventForwarder(job_id))
+    return lote.run_job(job, time_budget, telemetry=telemetry, cancelled=lambda: job_id in _cancelled)
+
+
+# --- estado dos jobs (no laço de eventos) ---
+
+class JobState:
+    def __init__(self, job_id: str, client: str, job: Dict):
+        self.id = job_id
+        self.client = client
+        self.job = job
+        self.status = "queued"
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.cancel_requested = False
+        self.events: List[Dict] = []
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.future = None
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "mode": self.job.get("mode") or "substitution",
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class BreakService:
+    def __init__(
+        self,
+        quadgram_file: str = str(lote.DEFAULT_QUADGRAMS),
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_per_client: int = 2,
+        time_budget: Optional[float] = None,
+        history: int = 256,
+        cache_path: Optional[str] = None,
+    ):
+        self.quadgram_file = quadgram_file
+        self.cache_path = cache_path
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue or self.workers * 4
+        self.max_per_client = max_per_client
+        self.time_budget = time_budget
+        self.history = history
+        self.jobs: "OrderedDict[str, JobState]" = OrderedDict()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # processos do pool que passaram pelo aquecimento
+        self.worker_pids: List[int] = []
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._manager = multiprocessing.Manager()
+        self._cancelled = self._manager.dict()
+        self._events = multiprocessing.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.quadgram_file, self.cache_path, self._events, self._cancelled),
+        )
+        # carrega os modelos em todos os processos antes do primeiro job
+        barrier = self._manager.Barrier(self.workers)
+        pids = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _warm_up, barrier) for _ in range(self.workers)
+        ))
+        self.worker_pids = sorted(set(pids))
+        self._reader = threading.Thread(target=self._read_events, args=(loop,), daemon=True)
+        self._reader.start()
+
+    async def close(self):
+        for state in self.jobs.values():
+            if state.status not in FINISHED:
+                self.cancel(state.id)
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self._events.put(None)
+        self._reader.join()
+        self._manager.shutdown()
+
+    def _read_events(self, loop: asyncio.AbstractEventLoop):
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            loop.call_soon_threadsafe(self._dispatch, *item)
+
+    def _dispatch(self, job_id: str, event: Dict):
+        state = self.jobs.get(job_id)
+        if state is None:
+            return
+        if event["event"] == "running":
+            if state.status != "queued":
+                return
+            state.status = "running"
+        self._publish(state, event)
+
+    def _publish(self, state: JobState, event: Dict):
+        state.events.append(event)
+        if len(state.events) > EVENT_HISTORY:
+            del state.events[:-EVENT_HISTORY]
+        for queue in state.subscribers:
+            queue.put_nowait(event)
+
+    def active(self, client: Optional[str] = None) -> int:
+        return sum(
+            1 for state in self.jobs.values()
+            if state.status not in FINISHED and (client is None or state.client == client)
+        )
+
+    def get(self, job_id: str) -> JobState:
+        state = self.jobs.get(job_id)
+        if state is None:
+            raise ServiceError(404, f"Job desconhecido: {job_id}")
+        return state
+
+    def submit(self, job: Dict, client: str) -> JobState:
+        text = job.get("ciphertext") if isinstance(job, dict) else None
+        # texto único ou lista de mensagens com a mesma chave (modo de profundidade)
+        messages = text if isinstance(text, list) else [text]
+        if not all(isinstance(m, str) for m in messages) or not any(m.strip() for m in messages):
+            raise ServiceError(400, "O job precisa de um campo 'ciphertext'.")
+        mode = job.get("mode") or "substitution"
+        if mode not in lote.MODES:
+            raise ServiceError(400, f"Modo desconhecido: {mode} (use um de {', '.join(lote.MODES)})")
+        if self.active() >= self.max_queue:
+            raise ServiceError(503, "Fila cheia, tente novamente em instantes.")
+        if self.active(client) >= self.max_per_client:
+            raise ServiceError(429, f"Limite de {self.max_per_client} jobs simultâneos por cliente.")
+
+        job_id = uuid.uuid4().hex[:12]
+        state = JobState(job_id, client, dict(job, id=job_id))
+        self.jobs[job_id] = state
+        self._evict()
+        state.future = self._executor.submit(_run_job, job_id, state.job, self.time_budget)
+        asyncio.wrap_future(state.future).add_done_callback(lambda f: self._finish(state, f))
+        return state
+
+    def _finish(self, state: JobState, future: asyncio.Future):
+        if future.cancelled():
+            state.status = "cancelled"
+        elif future.exception() is not None:
+            e = future.exception()
+            state.status = "error"
+            state.error = f"{type(e).__name__}: {e}"
+        else:
+            state.result = future.result()
+            state.status = "cancelled" if state.cancel_requested else "done"
+        self._cancelled.pop(state.id, None)
+        self._publish(state, {"event": "status", **state.summary()})
+
+    def cancel(self, job_id: str) -> JobState:
+        state = self.get(job_id)
+        if state.status in FINISHED or state.cancel_requested:
+            return state
+        state.cancel_requested = True
+        if state.future.cancel():
+            state.status = "cancelled"
+        else:
+            # já foi entregue a um processo: o should_stop do job vê o pedido
+            self._cancelled[job_id] = True
+        return state
+
+    def _evict(self):
+        # descarta os jobs terminados mais antigos além de `history`
+        excess = len(self.jobs) - self.history
+        for job_id in [j for j, s in self.jobs.items() if s.status in FINISHED][:max(0, excess)]:
+            del self.jobs[job_id]
+
+    def health(self) -> Dict:
+        running = sum(1 for s in self.jobs.values() if s.status == "running")
+        return {"workers": self.workers, "queued": self.active() - running, "running": running}
+
+
+# --- HTTP e WebSocket ---
+
+def _http_response(status: int, payload: Dict) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Access-Control-Allow-Origin: *\r\n"
+        "Access-Control-Allow-Methods: GET, POST, DELETE, OPTIONS\r\n"
+        "Access-Control-Allow-Headers: Content-Type, X-Client-Id\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def _ws_read(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    # quadros do cliente são pequenos e sem fragmentação
+    first, second = await reader.readexactly(2)
+    n = second & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if n > MAX_BODY:
+        raise ConnectionError("Quadro WebSocket grande demais.")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    data = await reader.readexactly(n)
+    if mask:
+        data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+    return first & 0x0F, data
+
+
+class BreakServer:
+    def __init__(self, service: BreakService):
+        self.service = service
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, path, headers, body = await self._read_request(reader)
+            client = headers.get("x-client-id") or writer.get_extra_info("peername")[0]
+            parts = [p for p in path.split("/") if p]
+            if method == "GET" and len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+                if headers.get("upgrade", "").lower() != "websocket" or "sec-websocket-key" not in headers:
+                    raise ServiceError(400, "Use WebSocket para acompanhar os eventos.")
+                state = self.service.get(parts[1])
+                await self._stream_events(reader, writer, headers["sec-websocket-key"], state)
+            else:
+                status, payload = self._route(method, parts, body, client)
+                writer.write(_http_response(status, payload))
+                await writer.drain()
+        except ServiceError as e:
+            writer.write(_http_response(e.status, {"error": str(e)}))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        try:
+            method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise ServiceError(400, "Requisição inválida.")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY:
+            raise ServiceError(413, "Corpo da requisição grande demais.")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), urlsplit(target).path, headers, body
+
+    def _route(self, method: str, parts: List[str], body: bytes, client: str) -> Tuple[int, Dict]:
+        if method == "OPTIONS":
+            return 200, {}
+        if parts == ["health"] and method == "GET":
+            return 200, self.service.health()
+        if parts == ["jobs"] and method == "POST":
+            try:
+                job = json.loads(body or b"{}")
+            except ValueError:
+                raise ServiceError(400, "JSON inválido.")
+            state = self.service.submit(job, client)
+            return 202, {"id": state.id, "status": state.status}
+        if len(parts) == 2 and parts[0] == "jobs":
+            if method == "GET":
+                return 200, self.service.get(parts[1]).summary()
+            if method == "DELETE":
+                return 200, self.service.cancel(parts[1]).summary()
+        raise ServiceError(404, f"Rota desconhecida: {method} /{'/'.join(parts)}")
+
+    async def _stream_events(self, reader, writer, key: str, state: JobState):
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode("latin-1"))
+
+        # histórico primeiro, depois os eventos ao vivo até o estado final
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in state.events:
+            queue.put_nowait(event)
+        if state.status in FINISHED and not any(e["event"] == "status" for e in state.events):
+            queue.put_nowait({"event": "status", **state.summary()})
+        state.subscribers.add(queue)
+
+        async def send():
+            while True:
+                event = await queue.get()
+                writer.write(_ws_frame(0x1, json.dumps(event, ensure_ascii=False).encode("utf-8")))
+                await writer.drain()
+                if event["event"] == "status" and event["status"] in FINISHED:
+                    return
+
+        async def receive():
+            while True:
+                opcode, data = await _ws_read(reader)
+                if opcode == 0x8:
+                    return
+                if opcode == 0x9:
+                    writer.write(_ws_frame(0xA, data))
+                elif opcode == 0x1:
+                    try:
+                        message = json.loads(data)
+                    except ValueError:
+                        continue
+                    if isinstance(message, dict) and message.get("action") == "cancel":
+                        self.service.cancel(state.id)
+
+        tasks = [asyncio.ensure_future(send()), asyncio.ensure_future(receive())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            writer.write(_ws_frame(0x8, struct.pack("!H", 1000)))
+            await writer.drain()
+        finally:
+            state.subscribers.discard(queue)
+            for task in tasks:
+                task.cancel()
+
+
+async def serve(service: BreakService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    await service.start()
+    server = await asyncio.start_server(BreakServer(service).handle, host, port)
+    print(f"[INFO] Servidor em http://{host}:{port} ({service.workers} processos, fila de {service.max_queue})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço local de quebra de cifras (HTTP + WebSocket).")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="processos (padrão: núcleos)")
+    parser.add_argument("--max-queue", type=int, default=None, help="jobs ativos no total (padrão: 4 por processo)")
+    parser.add_argument("--max-per-client", type=int, default=2, help="jobs ativos por cliente")
+    parser.add_argument("-t", "--time-budget", type=float, default=None, help="segundos por job")
+    parser.add_argument("--quadgrams", default=str(lote.DEFAULT_QUADGRAMS))
+    parser.add_argument("--cache", default=None, help="arquivo SQLite com o cache de resultados")
+    args = parser.parse_args()
+
+    service = BreakService(
+        args.quadgrams,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        max_per_client=args.max_per_client,
+        time_budget=args.time_budget,
+        cache_path=args.cache,
+    )
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
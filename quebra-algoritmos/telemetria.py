@@ -0,0 +1,144 @@
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional, TextIO
+
+# Telemetria das buscas. Os quebradores recebem um `Telemetry` opcional
+# (`telemetry=None` desliga tudo: só um teste de None por nível, e por
+# iteração nos laços que medem fases) e emitem eventos como dicts:
+#
+#   start   {params...}                         início de uma busca
+#   level   {level, iterations, temperature, acceptance_rate,
+#            current_score, best_score, best_key, iterations_per_sec}
+#   restart {attempt, score, best_score, best_key}  fim de um reinício (subida de encosta)
+#   candidate {mode, key_len, score, key}       um tamanho de chave da varredura
+#   result  {best_score, iterations, stop_reason, duration, phases}
+#
+# Todo evento tem "event", "search" (qual quebrador) e "elapsed" (segundos
+# desde a criação do Telemetry). `phases` soma o tempo gasto em cada fase
+# (decrypt, score, ...) desde o último start. `TraceRecorder` grava os eventos
+# num JSON que o frontend pode reproduzir; `JsonLinesWriter` e
+# `ProgressPrinter` acompanham a busca ao vivo.
+
+Event = Dict
+Callback = Callable[[Event], None]
+
+
+class Telemetry:
+    def __init__(self, *callbacks: Callback):
+        self.callbacks: List[Callback] = list(callbacks)
+        self.phases: Dict[str, float] = {}
+        self.search: Optional[str] = None
+        self._created = time.perf_counter()
+        self._search_started = self._created
+        self._level_time = self._created
+        self._level_iterations = 0
+
+    def emit(self, event: str, **fields):
+        record = {
+            "event": event,
+            "search": self.search,
+            "elapsed": round(time.perf_counter() - self._created, 6),
+            **fields,
+        }
+        for callback in self.callbacks:
+            callback(record)
+
+    def start(self, search: str, **fields):
+        self.search = search
+        self.phases = {}
+        self._search_started = self._level_time = time.perf_counter()
+        self._level_iterations = 0
+        self.emit("start", **fields)
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - started)
+
+    def level(self, schedule, current_score: float, best_score: float, **fields):
+        # chamado ao fim de um nível, antes de schedule.next_level()
+        now = time.perf_counter()
+        iterations = schedule.iterations + schedule.iterations_per_temp
+        spent = now - self._level_time
+        rate = (iterations - self._level_iterations) / spent if spent > 0 else None
+        self._level_time, self._level_iterations = now, iterations
+        self.emit(
+            "level",
+            level=schedule.levels + 1,
+            iterations=iterations,
+            temperature=schedule.temperature,
+            acceptance_rate=schedule.acceptance_rate,
+            current_score=current_score,
+            best_score=best_score,
+            iterations_per_sec=rate,
+            **fields,
+        )
+
+    def finish(self, **fields):
+        self.emit(
+            "result",
+            duration=round(time.perf_counter() - self._search_started, 6),
+            phases={k: round(v, 6) for k, v in self.phases.items()},
+            **fields,
+        )
+
+
+def timed(telemetry: Optional[Telemetry], name: str):
+    # fase medida só quando a telemetria está ligada (para trechos fora do laço interno)
+    return telemetry.phase(name) if telemetry is not None else nullcontext()
+
+
+class TraceRecorder:
+    def __init__(self):
+        self.events: List[Event] = []
+
+    def __call__(self, event: Event):
+        self.events.append(event)
+
+    def to_dict(self) -> Dict:
+        return {"version": 1, "events": self.events}
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+class JsonLinesWriter:
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def __call__(self, event: Event):
+        self.out.write(json.dumps(event) + "\n")
+        self.out.flush()
+
+
+class ProgressPrinter:
+    # imprime um nível a cada `every` e o resultado de cada busca
+    def __init__(self, every: int = 10, out: TextIO = sys.stderr):
+        self.every = every
+        self.out = out
+
+    def __call__(self, event: Event):
+        kind = event["event"]
+        if kind == "level":
+            if event["level"] % self.every:
+                return
+            line = (
+                f"[INFO] {event['search']} nível {event['level']}: "
+                f"T={event['temperature']:.3f} aceitação={event['acceptance_rate']:.2f} "
+                f"atual={event['current_score']:.2f} melhor={event['best_score']:.2f}"
+            )
+            if event["iterations_per_sec"]:
+                line += f" it/s={event['iterations_per_sec']:.0f}"
+            print(line, file=self.out)
+        elif kind == "result":
+            phases = ", ".join(f"{k}={v:.3f}s" for k, v in event["phases"].items())
+            print(f"[INFO] {event['search']} terminou em {event['duration']:.3f}s ({phases})", file=self.out)
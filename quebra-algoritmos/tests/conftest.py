@@ -0,0 +1,45 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# os módulos ficam soltos em quebra-algoritmos/ e se importam pelo nome
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from artefato1 import EnglishScorer, SubstitutionCipher  # noqa: E402
+from ngramas import load_quadgram_table  # noqa: E402
+
+QUADGRAMS = SCRIPT_DIR / "quadgrams.txt"
+EXAMPLES = SCRIPT_DIR / "exemplos"
+
+
+def read_example(name: str) -> str:
+    with open(EXAMPLES / name, "r", encoding="utf-8") as f:
+        return " ".join(f.read().split())
+
+
+@pytest.fixture(scope="session")
+def table():
+    return load_quadgram_table(QUADGRAMS)
+
+
+@pytest.fixture(scope="session")
+def scorer(table):
+    return EnglishScorer(table=table, verbose=False)
+
+
+@pytest.fixture(scope="session")
+def english_text() -> str:
+    return read_example("corpus_ingles.txt")
+
+
+@pytest.fixture
+def encrypt():
+    # cifra um texto com uma chave aleatória de semente fixa: (cifrado, chave)
+    def encrypt(plaintext: str, seed: int = 0):
+        key = SubstitutionCipher.random_key(random.Random(seed))
+        return SubstitutionCipher(key).encrypt(plaintext), key
+
+    return encrypt
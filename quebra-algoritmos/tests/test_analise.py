@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import analise
+from analise import rank_transposition_keys
+from artefato2 import NgramScorer, PermutationBreaker, break_transposition_sweep
+from transposicao import EXACT_MAX_LENGTH, transposition_encrypt
+
+
+@pytest.fixture(scope="module")
+def breaker(table):
+    return PermutationBreaker(NgramScorer(table=table), random_seed=0)
+
+
+@pytest.fixture(scope="module")
+def letters(english_text):
+    return "".join(ch for ch in english_text.upper() if ch.isalpha())
+
+
+def test_sweep_past_exact_limit(breaker, letters):
+    # acima de EXACT_MAX_LENGTH a pré-análise usa as sementes da têmpera
+    key = list(range(EXACT_MAX_LENGTH + 1))
+    random.Random(3).shuffle(key)
+    ciphertext = transposition_encrypt(letters[:340], key, "columnar")
+    ranking = rank_transposition_keys(breaker, ciphertext, 2, EXACT_MAX_LENGTH + 2)
+    assert (ranking[0]["mode"], ranking[0]["key_len"]) == ("columnar", len(key))
+
+    candidates = break_transposition_sweep(breaker, ciphertext, 2, EXACT_MAX_LENGTH + 2, top_candidates=2)
+    best = max(candidates.values(), key=lambda c: c["score"])
+    assert best["key"] == key
+
+
+def test_long_key_ranking_on_short_messages(breaker):
+    for ciphertext in ("SHORTTEXTHERE", ["SHORTTEXTHERE", "ANOTHERMESSAGEHERE"]):
+        ranking = rank_transposition_keys(breaker, ciphertext, 2, EXACT_MAX_LENGTH + 2)
+        assert len(ranking) == 2 * (EXACT_MAX_LENGTH + 1)
+
+
+def test_divisibility_prior(breaker, letters, monkeypatch):
+    ciphertext = transposition_encrypt(letters[:48], [2, 0, 3, 1, 5, 4], "block")
+    ranking = {(c["mode"], c["key_len"]): c for c in rank_transposition_keys(breaker, ciphertext, 2, 10)}
+    prior = analise.DIVISIBILITY_PRIOR
+    monkeypatch.setattr(analise, "DIVISIBILITY_PRIOR", 0.0)
+    plain = {(c["mode"], c["key_len"]): c for c in rank_transposition_keys(breaker, ciphertext, 2, 10)}
+    for label, entry in ranking.items():
+        assert entry["divides"] == (48 % label[1] == 0)
+        # 48 letras: 45 janelas de quadgrama
+        bonus = prior / 45 if entry["divides"] else 0.0
+        assert entry["score"] - plain[label]["score"] == pytest.approx(bonus)
@@ -0,0 +1,93 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from ngramas import (
+    CACHE_HEADER_SIZE,
+    QuadgramTable,
+    compile_quadgrams,
+    default_cache_path,
+    file_checksum,
+    load_quadgram_table,
+    open_compiled,
+    quadgram_index,
+)
+
+
+def write_counts(path, counts):
+    path.write_text("".join(f"{quad} {count}\n" for quad, count in counts.items()), encoding="utf-8")
+
+
+def test_compiled_table_round_trip(tmp_path):
+    source = tmp_path / "quads.txt"
+    write_counts(source, {"TION": 50, "THER": 30, "NTHE": 20})
+    cache = compile_quadgrams(source)
+    assert cache == default_cache_path(source)
+    assert cache.stat().st_size == CACHE_HEADER_SIZE + 26 ** 4 * 4
+
+    parsed = QuadgramTable.from_file(str(source))
+    opened = open_compiled(cache, file_checksum(source))
+    assert isinstance(opened.log_probs, np.memmap)
+    assert opened.floor == parsed.floor
+    np.testing.assert_array_equal(np.asarray(opened.log_probs), parsed.log_probs)
+    assert opened.lookup("TION") == parsed.lookup("TION")
+
+
+def test_cache_rejected_for_other_source(tmp_path):
+    source = tmp_path / "quads.txt"
+    write_counts(source, {"TION": 50, "THER": 30})
+    cache = compile_quadgrams(source)
+    assert open_compiled(cache, b"\0" * 32) is None
+
+    # cabeçalho corrompido ou arquivo truncado também invalidam o cache
+    data = cache.read_bytes()
+    cache.write_bytes(b"XXXX" + data[4:])
+    assert open_compiled(cache) is None
+    cache.write_bytes(data[:-4])
+    assert open_compiled(cache) is None
+
+
+def test_load_recompiles_when_source_changes(tmp_path):
+    source = tmp_path / "quads.txt"
+    write_counts(source, {"TION": 50, "THER": 30})
+    first = load_quadgram_table(source)
+    assert load_quadgram_table(source) is first
+
+    write_counts(source, {"TION": 10, "THER": 30, "ANDT": 60})
+    second = load_quadgram_table(source)
+    assert second is not first
+    assert second.lookup("ANDT") > second.floor
+    assert open_compiled(default_cache_path(source), file_checksum(source)) is not None
+    assert second.log_probs[quadgram_index("ANDT")] == QuadgramTable.from_file(str(source)).lookup("ANDT")
+
+
+def test_unwritable_cache_falls_back_to_text(tmp_path):
+    source = tmp_path / "quads.txt"
+    write_counts(source, {"TION": 50})
+    table = load_quadgram_table(source, tmp_path / "falta" / "quads.qbin")
+    assert not isinstance(table.log_probs, np.memmap)
+    assert table.lookup("TION") == QuadgramTable.from_file(str(source)).lookup("TION")
+
+
+def test_compiled_table_pickles_by_path(tmp_path):
+    # os workers da têmpera paralela recebem a tabela serializada: do cache,
+    # só o caminho viaja e o worker mapeia o mesmo arquivo
+    source = tmp_path / "quads.txt"
+    write_counts(source, {"TION": 50, "THER": 30, "NTHE": 20})
+    table = load_quadgram_table(source)
+    data = pickle.dumps(table)
+    assert len(data) < 1024
+    restored = pickle.loads(data)
+    assert isinstance(restored.log_probs, np.memmap)
+    assert restored.floor == table.floor
+    np.testing.assert_array_equal(np.asarray(restored.log_probs), np.asarray(table.log_probs))
+
+    in_memory = QuadgramTable(np.asarray(table.log_probs).copy(), table.floor)
+    assert len(pickle.dumps(in_memory)) > 26 ** 4 * 4
+    np.testing.assert_array_equal(pickle.loads(pickle.dumps(in_memory)).log_probs, in_memory.log_probs)
+
+    write_counts(source, {"TION": 10})
+    compile_quadgrams(source)
+    with pytest.raises(ValueError):
+        pickle.loads(data)
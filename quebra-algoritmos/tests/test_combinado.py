@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from artefato1 import SubstitutionCipher
+from artefato3 import CombinedBreaker, IsomorphKeySearch, combined_encrypt
+from conftest import QUADGRAMS
+
+# substituição seguida de transposição: a transposição é achada pelas
+# coincidências de bigramas (que não dependem da substituição) e a
+# substituição pelo texto destransposto
+
+
+@pytest.fixture(scope="module")
+def letters(english_text):
+    return "".join(ch for ch in english_text.upper() if ch.isalpha())
+
+
+def encrypt_combined(plaintext: str, key_len: int, mode: str, seed: int = 3):
+    rng = random.Random(seed)
+    transposition_key = list(range(key_len))
+    rng.shuffle(transposition_key)
+    substitution_key = SubstitutionCipher.random_key(rng)
+    return combined_encrypt(plaintext, substitution_key, transposition_key, mode), substitution_key, transposition_key
+
+
+@pytest.mark.parametrize("mode,key_len", [("columnar", 7), ("block", 6), ("columnar", 9)])
+def test_isomorph_search_ranks_true_key_first(table, letters, mode, key_len):
+    plaintext = letters[:420]
+    ciphertext, substitution_key, _ = encrypt_combined(plaintext, key_len, mode)
+    search = IsomorphKeySearch(table, ciphertext, key_len, mode)
+    candidates = search.candidates(restarts=8, limit=6, rng=random.Random(0))
+    # rotações equivalentes (blocos) dão o mesmo texto: compara o texto destransposto
+    best_key, _ = candidates[0]
+    assert search.untranspose_text(best_key) == SubstitutionCipher(substitution_key).encrypt(plaintext)
+
+
+def test_solve_round_trip(letters):
+    plaintext = letters[:420]
+    ciphertext, substitution_key, transposition_key = encrypt_combined(plaintext, 6, "block")
+    result = CombinedBreaker(str(QUADGRAMS), random_seed=0).solve(ciphertext, 6, "block")
+    assert result.plaintext == plaintext
+    assert result.transposition_key == transposition_key
+    present = set(ciphertext)
+    assert all(result.substitution_key[ord(ch) - ord('A')] == substitution_key[ord(ch) - ord('A')] for ch in present)
+
+
+def test_run_finds_length_and_keys(letters):
+    plaintext = letters[:420]
+    ciphertext, _, transposition_key = encrypt_combined(plaintext, 7, "columnar")
+    results = CombinedBreaker(str(QUADGRAMS), random_seed=0).run(ciphertext, 6, 8, modes=("columnar",), top_lengths=2)
+    assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
+    best = results[0]
+    assert (best.mode, best.key_len) == ("columnar", 7)
+    assert best.transposition_key == transposition_key
+    assert best.plaintext == plaintext
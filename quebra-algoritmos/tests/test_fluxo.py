@@ -0,0 +1,73 @@
+import pytest
+
+from artefato1 import SubstitutionCipher
+from fluxo import CiphertextStatistics, StreamingSubstitutionBreaker, decrypt_stream
+from ngramas import count_quadgrams, encode_letters
+
+
+def pieces(text: str, sizes):
+    # blocos de tamanhos variados, repetindo `sizes` até o fim do texto
+    start, i = 0, 0
+    while start < len(text):
+        size = sizes[i % len(sizes)]
+        yield text[start:start + size]
+        start += size
+        i += 1
+
+
+@pytest.mark.parametrize("sizes", [[1], [2, 5], [3, 1, 7], [1000]])
+def test_quadgrams_carry_across_chunks(english_text, sizes):
+    # blocos só de pontuação e quadgramas partidos entre blocos
+    text = english_text[:700].replace(" ", " -- ")
+    stats = CiphertextStatistics(random_seed=0)
+    for chunk in pieces(text, sizes):
+        stats.update(chunk)
+    letters = encode_letters(text)
+    assert stats.total_letters == len(letters)
+    assert (stats.quadgram_counts == count_quadgrams(letters)).all()
+    assert stats.quadgram_counts.sum() == len(letters) - 3
+
+
+def test_reservoir_bounds(english_text):
+    stats = CiphertextStatistics(sample_letters=1000, segment_letters=100, random_seed=0)
+    for chunk in pieces(english_text * 3, [37]):
+        stats.update(chunk)
+    assert len(stats.segments) == stats.max_segments == 10
+    assert all(len(segment) == 100 for segment in stats.segments)
+    assert stats._segments_seen == stats.total_letters // 100
+    assert len(stats.sample_text()) == 1000
+
+    # texto menor que um trecho: a amostra é o próprio texto
+    short = CiphertextStatistics(sample_letters=1000, segment_letters=100)
+    short.update("Hello, world!")
+    assert short.segments == []
+    assert short.sample_text() == "HELLOWORLD"
+
+
+def test_decrypt_stream_keeps_case_and_punctuation(scorer, english_text, encrypt, tmp_path):
+    plaintext = "Dear Sir,\r\n" + english_text[:500] + "\r\n\r\n-- Yours, J. K.\n"
+    ciphertext, key = encrypt(plaintext, seed=2)
+    path = tmp_path / "cifrado.txt"
+    path.write_bytes(ciphertext.encode("utf-8"))
+
+    streamed = "".join(decrypt_stream(path, key, chunk_size=7))
+    assert streamed == SubstitutionCipher(key).decrypt(ciphertext) == plaintext
+
+    breaker = StreamingSubstitutionBreaker(scorer, chunk_size=7)
+    output = tmp_path / "claro.txt"
+    breaker.decrypt_to_file(path, key, output)
+    assert output.read_bytes() == plaintext.encode("utf-8")
+
+
+def test_run_recovers_key(scorer, english_text, encrypt):
+    ciphertext, key = encrypt(english_text, seed=5)
+    breaker = StreamingSubstitutionBreaker(scorer, sample_letters=1500, chunk_size=512, random_seed=1, restarts=1)
+    found, _ = breaker.run([ciphertext[:2000], ciphertext[2000:]])
+    plaintext = "".join(breaker.decrypt([ciphertext], found))
+    assert plaintext == english_text
+
+    # um gerador já lido por run() não serve para decrypt()
+    chunks = (ciphertext[i:i + 512] for i in range(0, len(ciphertext), 512))
+    breaker.run(chunks)
+    with pytest.raises(ValueError):
+        breaker.decrypt(chunks, found)
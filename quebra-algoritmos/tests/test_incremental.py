@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from artefato1 import ALPHABET, IncrementalQuadgramState, SimulatedAnnealingDecoder, SubstitutionCipher, random_pair
+from benchmark import letter_accuracy
+
+
+def full_score(scorer, ciphertext: str, key) -> float:
+    return scorer.score(SubstitutionCipher(list(key)).decrypt(ciphertext))
+
+
+def test_delta_matches_full_rescore(scorer, english_text, encrypt):
+    ciphertext, _ = encrypt(english_text[:600])
+    state = IncrementalQuadgramState(ciphertext, scorer)
+    rng = random.Random(1)
+    key = SubstitutionCipher.random_key(rng)
+    total = state.reset(key)
+    assert total == pytest.approx(full_score(scorer, ciphertext, key), abs=1e-3)
+
+    for step in range(300):
+        before = state.total
+        delta = state.try_swap(*random_pair(rng))
+        assert before + delta == pytest.approx(full_score(scorer, ciphertext, state.key.key()), abs=1e-3)
+        if step % 3:
+            state.reject()
+        else:
+            state.accept(delta)
+        assert state.total == pytest.approx(full_score(scorer, ciphertext, state.key.key()), abs=1e-2)
+
+
+def test_reject_restores_key(scorer, encrypt, english_text):
+    ciphertext, _ = encrypt(english_text[:200])
+    state = IncrementalQuadgramState(ciphertext, scorer)
+    state.reset(ALPHABET)
+    state.try_swap(0, 25)
+    state.reject()
+    assert state.key.text() == ALPHABET
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_annealing_breaks_long_text(scorer, english_text, encrypt, incremental):
+    plaintext = english_text[:800]
+    ciphertext, _ = encrypt(plaintext, seed=3)
+    decoder = SimulatedAnnealingDecoder(ciphertext, scorer, random_seed=0, incremental=incremental)
+    _, score, found = decoder.run()
+    assert letter_accuracy(found, plaintext) >= 0.98
+    assert score == pytest.approx(scorer.score(found), abs=1e-2)
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+import lote
+from artefato1 import SubstitutionCipher
+from artefato3 import combined_encrypt
+from conftest import QUADGRAMS
+from transposicao import transposition_encrypt
+
+
+@pytest.fixture(scope="module", autouse=True)
+def worker():
+    # o mesmo estado que cada processo do lote monta ao iniciar
+    lote._init_worker(str(QUADGRAMS))
+
+
+@pytest.fixture(scope="module")
+def letters(english_text):
+    return "".join(ch for ch in english_text.upper() if ch.isalpha())
+
+
+def long_key_job(letters: str, budget: float):
+    key = list(range(40))
+    random.Random(3).shuffle(key)
+    ciphertext = transposition_encrypt((letters * 3)[:2000], key, "columnar")
+    return {"id": "longa", "mode": "columnar", "key_length": 40, "seed": 0,
+            "ciphertext": ciphertext, "time_budget": budget}
+
+
+def test_budget_stops_long_key_tempering(letters):
+    # sem prazo, a têmpera desta chave leva alguns segundos
+    result = lote.run_job(long_key_job(letters, 0.3), None)
+    assert result["timed_out"]
+    assert result["elapsed"] < 1.5
+    assert sorted(result["key"]) == list(range(40))
+
+
+def test_budget_stops_combined(letters):
+    rng = random.Random(3)
+    key = list(range(7))
+    rng.shuffle(key)
+    ciphertext = combined_encrypt(letters[:420], SubstitutionCipher.random_key(rng), key, "columnar")
+    result = lote.run_job({"id": "comb", "mode": "combined", "ciphertext": ciphertext, "time_budget": 0.3}, None)
+    assert result["timed_out"]
+    assert result["elapsed"] < 1.5
+    assert len(result["substitution_key"]) == 26
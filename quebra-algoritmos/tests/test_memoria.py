@@ -0,0 +1,86 @@
+import itertools
+
+import pytest
+
+import lote
+import memoria
+from artefato1 import SubstitutionCipher
+from conftest import QUADGRAMS
+from memoria import ResultCache, fingerprint, isomorph_signature, translate_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # last_used crescente a cada chamada: a ordem do LRU não depende do relógio
+    ticks = itertools.count()
+    monkeypatch.setattr(memoria.time, "time", lambda: float(next(ticks)))
+
+
+@pytest.fixture
+def cached_worker(tmp_path):
+    lote._init_worker(str(QUADGRAMS), cache_path=str(tmp_path / "cache.sqlite"))
+    yield lote._cache
+    lote._cache.close()
+    lote._init_worker(str(QUADGRAMS))
+
+
+def test_fingerprint_and_signature():
+    # a substituição ignora caixa e pontuação; a transposição não ignora a ordem
+    assert fingerprint("Xfg, qm!", "substitution") == fingerprint("XFGQM", "substitution")
+    assert fingerprint("XFGQM", "substitution") != fingerprint("XFGQM", "columnar")
+    assert fingerprint("XFGQM", "columnar", {"key_length": 5}) != fingerprint("XFGQM", "columnar", {"key_length": 4})
+    assert isomorph_signature("ATTACK") == isomorph_signature("XFFXQM") == "ABBACD"
+    assert isomorph_signature("HELLO") == "ABCCD"
+
+
+def test_translate_key(english_text, encrypt):
+    plaintext = english_text[:300]
+    known, known_key = encrypt(plaintext, seed=1)
+    other, other_key = encrypt(plaintext, seed=2)
+    known_letters, letters = memoria.letters_only(known), memoria.letters_only(other)
+    key = translate_key(known_letters, "".join(known_key), letters)
+    assert sorted(key) == sorted(SubstitutionCipher.random_key())
+    assert SubstitutionCipher(key).decrypt(other) == plaintext
+    # letras que não aparecem no texto ficam com as letras claras que sobraram
+    present = set(letters)
+    assert all(key[i] == other_key[i] for i in range(26) if chr(ord('A') + i) in present)
+
+
+def test_lru_eviction(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("AAAA", "columnar", None, [0], 1.0, "a")
+    cache.put("BBBB", "columnar", None, [1], 2.0, "b")
+    # o acesso renova "AAAA"; "BBBB" passa a ser o menos usado
+    assert cache.get("AAAA", "columnar")["key"] == [0]
+    cache.put("CCCC", "columnar", None, [2], 3.0, "c")
+    assert len(cache) == 2
+    assert cache.get("BBBB", "columnar") is None
+    assert cache.get("AAAA", "columnar")["plaintext"] == "a"
+    assert cache.get("CCCC", "columnar", {"key_length": 4}) is None
+    cache.close()
+
+    # o arquivo sobrevive ao processo
+    reopened = ResultCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    assert reopened.get("CCCC", "columnar")["score"] == 3.0
+    reopened.close()
+
+
+def test_lote_cache_hit_and_warm_start(cached_worker, english_text, encrypt):
+    plaintext = english_text[:400]
+    ciphertext, _ = encrypt(plaintext, seed=3)
+    job = {"id": "a", "mode": "substitution", "seed": 0, "iterations_per_temp": 200, "ciphertext": ciphertext}
+    first = lote.run_job(job, None)
+    assert "cached" not in first
+    assert first["plaintext"] == plaintext
+
+    # mesmas letras com outra caixa e pontuação: acerto do cache, texto do cifrado atual
+    again = lote.run_job(dict(job, ciphertext=ciphertext.lower().replace(",", ";")), None)
+    assert again["cached"]
+    assert again["plaintext"] == plaintext.lower().replace(",", ";")
+
+    # mesmo texto claro com outra chave: parte da chave traduzida do isomorfo
+    other, _ = encrypt(plaintext, seed=4)
+    warm = lote.run_job(dict(job, id="b", ciphertext=other), None)
+    assert warm["warm_start"]
+    assert warm["plaintext"] == plaintext
+    assert len(cached_worker) == 2
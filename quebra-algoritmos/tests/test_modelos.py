@@ -0,0 +1,68 @@
+import lote
+import pytest
+from benchmark import letter_accuracy
+from modelos import ModelRegistry
+
+# amostras fora dos corpora de exemplo
+SAMPLES = {
+    "pt": (
+        "Quando a chuva chegou ao fim da tarde, as ruas da cidade ficaram vazias e o cheiro de terra "
+        "molhada entrou pelas janelas abertas. A velha senhora que morava no segundo andar desceu devagar "
+        "a escada, segurando o corrimão com as duas mãos, e foi sentar-se no banco da praça como fazia "
+        "todos os dias. Os meninos da vizinhança corriam atrás de uma bola murcha, gritando nomes de "
+        "jogadores famosos, enquanto o padeiro fechava a porta da loja e contava as moedas do dia. "
+        "Ninguém reparou no homem de chapéu cinzento que esperava na esquina, olhando o relógio a cada "
+        "minuto, como quem aguarda uma notícia importante que nunca chega."
+    ),
+    "es": (
+        "Cuando llegó la noche, el viejo pescador volvió a su casa con las redes vacías y el corazón "
+        "lleno de tristeza. Su mujer lo esperaba junto al fuego, preparando una sopa de pescado con lo "
+        "poco que quedaba en la despensa. Los niños dormían en la habitación del fondo, y el viento del "
+        "mar golpeaba las ventanas con fuerza. Mañana saldré otra vez, dijo el hombre, porque el mar "
+        "siempre devuelve lo que quita a quien tiene paciencia."
+    ),
+    "en": (
+        "When the train finally stopped at the small station, the old doctor stepped down onto the "
+        "platform and looked around for the carriage that was supposed to meet him. There was nobody "
+        "there except a boy selling newspapers and a dog sleeping in the shade of the water tower."
+    ),
+}
+# frases curtas: com pouco texto, o modelo de um corpus pequeno perde para o inglês
+SENTENCES = [
+    ("pt", "O gato subiu no telhado e ficou olhando a lua durante a noite inteira."),
+    ("pt", "Os trabalhadores pediram melhores salários e condições de trabalho mais justas para todos."),
+    ("es", "Los estudiantes pidieron más tiempo para terminar el examen de historia."),
+    ("es", "Ayer fuimos al mercado a comprar frutas y verduras frescas para la cena."),
+    ("en", "She walked along the river every morning before breakfast."),
+]
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(root=tmp_path)
+
+
+@pytest.mark.parametrize("order", [None, 2, 3, 4])
+@pytest.mark.parametrize("language, sample", sorted(SAMPLES.items()) + SENTENCES)
+def test_detect_language(registry, language, sample, order):
+    if order is None:
+        ranking = registry.detect_language(sample)
+    else:
+        ranking = registry.detect_language(sample, order)
+    assert ranking[0][0] == language
+
+
+def test_smoothed_model_is_a_distribution(registry):
+    for order in (1, 2, 3):
+        probs = 10.0 ** registry.get("pt", order).log_probs.astype("float64")
+        assert probs.sum() == pytest.approx(1.0, rel=1e-3)
+        assert probs.min() > 0
+
+
+def test_lote_breaks_portuguese_substitution(registry, encrypt, monkeypatch):
+    monkeypatch.setattr(lote, "_registry", registry)
+    monkeypatch.setattr(lote, "_language_models", {})
+    ciphertext, _ = encrypt(SAMPLES["pt"], seed=1)
+    result = lote.run_job({"id": "pt", "ciphertext": ciphertext, "language": "pt", "seed": 0}, None)
+    assert result["language"] == "pt"
+    assert letter_accuracy(result["plaintext"], SAMPLES["pt"]) >= 0.98
@@ -0,0 +1,43 @@
+import pytest
+
+from conftest import QUADGRAMS
+from paralelo import ParallelAnnealingRunner, derive_seed
+
+
+def test_derive_seed_is_deterministic():
+    seeds = [derive_seed(7, chain) for chain in range(50)]
+    assert seeds == [derive_seed(7, chain) for chain in range(50)]
+    assert len(set(seeds)) == 50
+    assert all(0 <= seed < 1 << 64 for seed in seeds)
+    assert derive_seed(8, 0) != seeds[0]
+
+
+@pytest.fixture
+def ciphertext(english_text, encrypt):
+    return encrypt(english_text[:400], seed=6)[0]
+
+
+def runner(ciphertext, **kwargs):
+    return ParallelAnnealingRunner(ciphertext, str(QUADGRAMS), workers=2, random_seed=1,
+                                   iterations_per_temp=200, **kwargs)
+
+
+def test_results_sorted_and_reproducible(ciphertext, english_text):
+    # sem parada por concordância, todas as cadeias rodam até o fim
+    results = runner(ciphertext, n_chains=3, agreement=0).run()
+    assert len(results) == 3
+    assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
+    assert sorted(r.seed for r in results) == sorted(derive_seed(1, chain) for chain in range(3))
+    assert results[0].plaintext == english_text[:400]
+    assert runner(ciphertext, n_chains=3, agreement=0).run() == results
+
+
+def test_agreement_stops_early(ciphertext, english_text):
+    # duas cadeias na mesma chave cancelam as que ainda não começaram
+    parallel = runner(ciphertext, n_chains=12, agreement=2)
+    results = parallel.run()
+    assert 2 <= len(results) < 12
+    assert results[0].plaintext == english_text[:400]
+    # a concordância só olha as letras presentes no texto
+    best = parallel._signature(results[0].key)
+    assert sum(parallel._signature(r.key) == best for r in results) >= 2
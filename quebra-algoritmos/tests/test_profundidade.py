@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from artefato1 import IncrementalQuadgramState, SimulatedAnnealingDecoder, SubstitutionCipher, random_pair
+from artefato2 import NgramScorer, PermutationBreaker, break_transposition_sweep
+from transposicao import transposition_encrypt
+
+# modo de profundidade: o score de uma chave é a soma dos scores das
+# mensagens, sem janelas entre uma mensagem e a seguinte
+
+
+def split_messages(text: str, lengths):
+    messages, start = [], 0
+    for length in lengths:
+        messages.append(text[start:start + length])
+        start += length
+    return messages
+
+
+@pytest.fixture(scope="module")
+def substitution_messages(english_text):
+    plaintexts = split_messages(english_text, [70, 55, 90, 64, 81])
+    key = SubstitutionCipher.random_key(random.Random(5))
+    return plaintexts, [SubstitutionCipher(key).encrypt(p) for p in plaintexts]
+
+
+def summed_score(scorer, ciphertexts, key) -> float:
+    cipher = SubstitutionCipher(list(key))
+    return sum(scorer.score(cipher.decrypt(c)) for c in ciphertexts)
+
+
+def test_incremental_state_sums_messages(scorer, substitution_messages):
+    _, ciphertexts = substitution_messages
+    state = IncrementalQuadgramState(ciphertexts, scorer)
+    rng = random.Random(2)
+    key = SubstitutionCipher.random_key(rng)
+    assert state.reset(key) == pytest.approx(summed_score(scorer, ciphertexts, key), abs=1e-3)
+    joined = SubstitutionCipher(key).decrypt("".join(ciphertexts))
+    assert state.total != pytest.approx(scorer.score(joined), abs=1e-3)
+
+    for step in range(200):
+        delta = state.try_swap(*random_pair(rng))
+        expected = summed_score(scorer, ciphertexts, state.key.key())
+        assert state.total + delta == pytest.approx(expected, abs=1e-3)
+        if step % 2:
+            state.reject()
+        else:
+            state.accept(delta)
+
+
+@pytest.mark.parametrize("engine", ["incremental", "full", "batch"])
+def test_annealing_score_is_sum_of_messages(scorer, substitution_messages, engine):
+    _, ciphertexts = substitution_messages
+    decoder = SimulatedAnnealingDecoder(
+        ciphertexts,
+        scorer,
+        random_seed=0,
+        iterations_per_temp=200,
+        incremental=engine == "incremental",
+        batch=engine == "batch",
+    )
+    key, score, found = decoder.run()
+    assert isinstance(found, list) and len(found) == len(ciphertexts)
+    assert score == pytest.approx(sum(scorer.score(text) for text in found), abs=1e-2)
+    assert score == pytest.approx(summed_score(scorer, ciphertexts, key), abs=1e-2)
+
+
+@pytest.mark.parametrize("mode, lengths", [
+    ("columnar", [48, 60, 42]),
+    ("columnar", [47, 53, 61, 44]),
+    ("block", [48, 60, 42]),
+])
+def test_transposition_score_is_sum_of_messages(table, english_text, mode, lengths):
+    breaker = PermutationBreaker(NgramScorer(table=table), random_seed=0)
+    letters = "".join(ch for ch in english_text.upper() if ch.isalpha())
+    key = [3, 0, 5, 1, 4, 2]
+    ciphertexts = [transposition_encrypt(p, key, mode) for p in split_messages(letters, lengths)]
+
+    for candidate in (key, [0, 1, 2, 3, 4, 5]):
+        alone = sum(breaker.score_keys(c, [candidate], mode)[0] for c in ciphertexts)
+        assert breaker.score_keys(ciphertexts, [candidate], mode)[0] == pytest.approx(alone, abs=1e-3)
+
+    broken = breaker.break_columnar(ciphertexts, 6) if mode == "columnar" else breaker.break_block(ciphertexts, 6)
+    texts, _, score = broken
+    assert isinstance(texts, list) and len(texts) == len(ciphertexts)
+    assert score == pytest.approx(sum(breaker.scorer.score(text) for text in texts), abs=1e-2)
+
+
+def test_sweep_preview_shows_first_message(table, english_text, capsys):
+    breaker = PermutationBreaker(NgramScorer(table=table), random_seed=0)
+    letters = "".join(ch for ch in english_text.upper() if ch.isalpha())
+    plaintexts = split_messages(letters, [48, 60, 42])
+    ciphertexts = [transposition_encrypt(p, [2, 0, 3, 1], "columnar") for p in plaintexts]
+    candidates = break_transposition_sweep(breaker, ciphertexts, 4, 4, verbose=True)
+    assert candidates["columnar_4"]["text"] == plaintexts
+    line = next(row for row in capsys.readouterr().out.splitlines() if row.startswith("[COLUNAR]"))
+    assert line.endswith(f"preview={plaintexts[0]}")
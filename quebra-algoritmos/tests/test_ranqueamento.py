@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import pytest
+
+from ranqueamento import LLMRanker, StubBackend, Verdict, parse_verdict
+
+
+def candidates(*scores):
+    return {
+        f"cand{i}": {"mode": "columnar", "key_len": 5, "text": f"TEXT NUMBER {i}", "score": score}
+        for i, score in enumerate(scores)
+    }
+
+
+class LoopBoundBackend(StubBackend):
+    # imita o cliente assíncrono do genai: falha fora do loop da primeira chamada
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+
+    async def complete(self, prompt, candidates):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif loop is not self.loop:
+            raise RuntimeError("Event loop is closed")
+        return await super().complete(prompt, candidates)
+
+
+class ScriptedBackend:
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    async def complete(self, prompt, candidates):
+        self.calls += 1
+        return self.answers.pop(0)
+
+
+@pytest.fixture
+def ranker():
+    rankers = []
+
+    def make(backend, **kwargs):
+        rankers.append(LLMRanker(backend, **kwargs))
+        return rankers[-1]
+
+    yield make
+    for r in rankers:
+        r.close()
+
+
+def test_ranks_by_backend_answer_and_caches(ranker):
+    backend = StubBackend(choose=lambda c: min(c, key=lambda lab: c[lab]["score"]))
+    rank = ranker(backend)
+    batch = candidates(-10.0, -50.0, -30.0)
+    assert rank.choose(batch) == Verdict("cand1", "TEXT NUMBER 1", "llm")
+    assert rank.choose(batch).source == "cache"
+    assert backend.calls == 1
+
+
+def test_only_top_candidates_go_to_the_backend(ranker):
+    seen = []
+    rank = ranker(StubBackend(choose=lambda c: seen.append(sorted(c)) or next(iter(c))), top=2)
+    rank.choose(candidates(-40.0, -10.0, -20.0))
+    assert seen == [["cand1", "cand2"]]
+
+
+def test_single_candidate_skips_backend(ranker):
+    backend = StubBackend()
+    verdict = ranker(backend, top=1).choose(candidates(-10.0, -5.0))
+    assert verdict == Verdict("cand1", "TEXT NUMBER 1", "ngram")
+    assert backend.calls == 0
+
+
+def test_invalid_answers_fall_back_to_best_ngram_score(ranker):
+    backend = ScriptedBackend(["not json", json.dumps({"best_label": "other", "suggestion": "x y"})])
+    verdict = ranker(backend, retries=1).choose(candidates(-30.0, -20.0))
+    assert verdict == Verdict("cand1", "TEXT NUMBER 1", "ngram")
+    assert backend.calls == 2
+
+
+def test_retry_after_invalid_answer(ranker):
+    backend = ScriptedBackend(["{}", json.dumps({"best_label": "cand0", "suggestion": "text number zero"})])
+    assert ranker(backend, retries=1).choose(candidates(-30.0, -20.0)).source == "llm"
+
+
+def test_tie_falls_back_to_first_candidate(ranker):
+    backend = ScriptedBackend(["```json\n{\"best_label\": 3}\n```"])
+    verdict = ranker(backend, retries=0).choose(candidates(-20.0, -20.0, -20.0))
+    assert verdict.label == "cand0" and verdict.source == "ngram"
+
+
+def test_timeout_falls_back(ranker):
+    backend = StubBackend(choose=lambda c: "cand0", delay=1.0)
+    verdict = ranker(backend, timeout=0.05).choose(candidates(-30.0, -20.0))
+    assert verdict == Verdict("cand1", "TEXT NUMBER 1", "ngram")
+
+
+def test_batch_shares_calls_for_equal_shortlists(ranker):
+    backend = StubBackend(delay=0.01)
+    first, second = candidates(-10.0, -20.0), candidates(-20.0, -10.0)
+    verdicts = ranker(backend).choose_many([first, second, dict(first)])
+    assert [v.label for v in verdicts] == ["cand0", "cand1", "cand0"]
+    assert [v.source for v in verdicts] == ["llm", "llm", "cache"]
+    assert backend.calls == 2
+
+
+def test_sync_calls_reuse_one_event_loop(ranker):
+    backend = LoopBoundBackend()
+    rank = ranker(backend)
+    assert rank.choose(candidates(-10.0, -20.0)).source == "llm"
+    assert rank.choose(candidates(-20.0, -10.0)).source == "llm"
+    verdicts = rank.choose_many([candidates(-1.0, -2.0, -3.0), candidates(-3.0, -2.0, -1.0)])
+    assert [v.source for v in verdicts] == ["llm", "llm"]
+    assert backend.calls == 4
+
+
+def test_parse_verdict_strips_code_fence():
+    raw = "```json\n" + json.dumps({"best_label": "a", "suggestion": "hello world"}) + "\n```"
+    assert parse_verdict(raw, ["a", "b"]) == Verdict("a", "hello world", "llm")
@@ -0,0 +1,94 @@
+import json
+import random
+
+import pytest
+
+from artefato1 import SimulatedAnnealingDecoder
+from artefato2 import NgramScorer, PermutationBreaker
+from retomada import Checkpoint
+from transposicao import transposition_encrypt
+
+
+def stop_after(levels: int):
+    # should_stop é consultado uma vez por nível de temperatura
+    calls = []
+
+    def should_stop() -> bool:
+        calls.append(None)
+        return len(calls) >= levels
+
+    return should_stop
+
+
+@pytest.mark.parametrize("engine", ["incremental", "full", "batch"])
+def test_resume_matches_uninterrupted_run(scorer, english_text, encrypt, tmp_path, engine):
+    ciphertext, _ = encrypt(english_text[:300], seed=4)
+
+    def decoder(**kwargs):
+        return SimulatedAnnealingDecoder(
+            ciphertext,
+            scorer,
+            random_seed=7,
+            iterations_per_temp=200,
+            incremental=engine == "incremental",
+            batch=engine == "batch",
+            **kwargs,
+        )
+
+    uninterrupted = decoder()
+    expected = uninterrupted.run()
+
+    path = tmp_path / "ponto.json"
+    # duas interrupções antes de terminar
+    for levels in (3, 4):
+        interrupted = decoder(checkpoint=Checkpoint(path, interval=0), should_stop=stop_after(levels))
+        interrupted.run()
+        assert interrupted.iterations_run < uninterrupted.iterations_run
+        with open(path, "r", encoding="utf-8") as f:
+            assert json.load(f)["done"] is False
+    resumed = decoder(checkpoint=Checkpoint(path, interval=0)).run()
+    assert resumed == expected
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f)["done"] is True
+
+    # busca concluída: a retomada devolve o mesmo resultado
+    assert decoder(checkpoint=Checkpoint(path, interval=0)).run() == expected
+
+
+def test_checkpoint_rejects_other_ciphertext(scorer, english_text, encrypt, tmp_path):
+    path = tmp_path / "ponto.json"
+    first, _ = encrypt(english_text[:200], seed=1)
+    SimulatedAnnealingDecoder(first, scorer, random_seed=0, iterations_per_temp=100,
+                              checkpoint=Checkpoint(path, interval=0), should_stop=stop_after(1)).run()
+    other, _ = encrypt(english_text[200:400], seed=1)
+    with pytest.raises(ValueError):
+        SimulatedAnnealingDecoder(other, scorer, random_seed=0, iterations_per_temp=100,
+                                  checkpoint=Checkpoint(path, interval=0)).run()
+
+
+def test_transposition_resume_matches_uninterrupted_run(table, english_text, tmp_path):
+    # chave longa: têmpera paralela, consultando should_stop uma vez por rodada
+    key = list(range(20))
+    random.Random(5).shuffle(key)
+    letters = "".join(ch for ch in english_text.upper() if ch.isalpha())
+    ciphertext = transposition_encrypt(letters[:400], key, "columnar")
+
+    def breaker():
+        return PermutationBreaker(NgramScorer(table=table), random_seed=3)
+
+    # sem interrupção, o ponto final guarda o estado completo das réplicas
+    reference = tmp_path / "referencia.json"
+    expected = breaker().break_columnar(ciphertext, len(key), checkpoint=Checkpoint(reference, interval=0))
+
+    path = tmp_path / "ponto.json"
+    for rounds in (2, 3):
+        breaker().break_columnar(ciphertext, len(key), stop_after(rounds), Checkpoint(path, interval=0))
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        assert snapshot["done"] is False
+        assert len(snapshot["keys"]) == len(snapshot["temperatures"])
+    resumed = breaker().break_columnar(ciphertext, len(key), checkpoint=Checkpoint(path, interval=0))
+    assert resumed == expected
+    with open(path, "r", encoding="utf-8") as f, open(reference, "r", encoding="utf-8") as g:
+        assert json.load(f) == json.load(g)
+    assert breaker().break_columnar(ciphertext, len(key), checkpoint=Checkpoint(path, interval=0)) == expected
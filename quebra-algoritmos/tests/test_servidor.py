@@ -0,0 +1,123 @@
+import asyncio
+import json
+import random
+import time
+
+from conftest import QUADGRAMS, read_example
+from servidor import FINISHED, BreakServer, BreakService
+from transposicao import transposition_encrypt
+
+LONG_TEXT = read_example("corpus_ingles.txt").upper()
+
+
+async def request(port: int, method: str, path: str, payload=None, client: str = "a", raw: bytes = None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = raw if raw is not None else (json.dumps(payload).encode("utf-8") if payload is not None else b"")
+    writer.write((
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nX-Client-Id: {client}\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(content)
+
+
+def run_with_service(scenario, **kwargs):
+    async def main():
+        service = BreakService(str(QUADGRAMS), **kwargs)
+        await service.start()
+        server = await asyncio.start_server(BreakServer(service).handle, "127.0.0.1", 0)
+        try:
+            return await scenario(service, server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await service.close()
+
+    return asyncio.run(main())
+
+
+async def wait_finished(port: int, job_id: str) -> dict:
+    for _ in range(600):
+        status, summary = await request(port, "GET", f"/jobs/{job_id}")
+        assert status == 200
+        if summary["status"] in FINISHED:
+            return summary
+        await asyncio.sleep(0.05)
+    raise AssertionError("job não terminou")
+
+
+def test_warm_up_starts_every_worker():
+    async def scenario(service, port):
+        return service.worker_pids
+
+    assert len(run_with_service(scenario, workers=2)) == 2
+
+
+def test_submit_validation_limits_and_cancel():
+    async def scenario(service, port):
+        long_job = {"ciphertext": LONG_TEXT, "mode": "substitution"}
+        results = {
+            "missing": await request(port, "POST", "/jobs", {"mode": "substitution"}),
+            "bad_mode": await request(port, "POST", "/jobs", {"ciphertext": "ABC", "mode": "enigma"}),
+            "bad_json": await request(port, "POST", "/jobs", raw=b"{nope"),
+            "unknown": await request(port, "GET", "/jobs/nada"),
+        }
+        first = await request(port, "POST", "/jobs", long_job, client="a")
+        results["first"] = first
+        results["same_client"] = await request(port, "POST", "/jobs", long_job, client="a")
+        second = await request(port, "POST", "/jobs", long_job, client="b")
+        results["other_client"] = second
+        results["full"] = await request(port, "POST", "/jobs", long_job, client="c")
+        results["health"] = await request(port, "GET", "/health")
+        for status, job in (first, second):
+            results.setdefault("cancel", []).append(await request(port, "DELETE", f"/jobs/{job['id']}"))
+            results.setdefault("final", []).append(await wait_finished(port, job["id"]))
+        results["after_cancel"] = await request(port, "POST", "/jobs", {"ciphertext": "WKH TXLFN EURZQ IRA"}, client="a")
+        results["done"] = await wait_finished(port, results["after_cancel"][1]["id"])
+        return results
+
+    results = run_with_service(scenario, workers=1, max_queue=2, max_per_client=1)
+    assert results["missing"][0] == 400
+    assert results["bad_mode"][0] == 400
+    assert results["bad_json"][0] == 400
+    assert results["unknown"][0] == 404
+    assert results["first"][0] == 202 and results["first"][1]["status"] == "queued"
+    assert results["same_client"][0] == 429
+    assert results["other_client"][0] == 202
+    assert results["full"][0] == 503
+    assert results["health"] == (200, {"workers": 1, "queued": 2 - results["health"][1]["running"],
+                                       "running": results["health"][1]["running"]})
+    assert all(status == 200 for status, _ in results["cancel"])
+    assert [summary["status"] for summary in results["final"]] == ["cancelled", "cancelled"]
+    assert results["after_cancel"][0] == 202
+    assert results["done"]["status"] == "done"
+    assert results["done"]["result"]["mode"] == "substitution"
+
+
+def test_cancel_running_transposition():
+    # chave longa: têmpera de vários segundos; o cancelamento chega a ela pelo should_stop
+    letters = "".join(ch for ch in LONG_TEXT if ch.isalpha())
+    key = list(range(40))
+    random.Random(3).shuffle(key)
+    job = {"ciphertext": transposition_encrypt((letters * 3)[:2000], key, "columnar"),
+           "mode": "columnar", "key_length": 40, "seed": 0}
+
+    async def scenario(service, port):
+        status, state = await request(port, "POST", "/jobs", job)
+        assert status == 202
+        for _ in range(200):
+            if service.get(state["id"]).status == "running":
+                break
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.2)
+        started = time.monotonic()
+        await request(port, "DELETE", f"/jobs/{state['id']}")
+        summary = await wait_finished(port, state["id"])
+        return summary, time.monotonic() - started
+
+    summary, elapsed = run_with_service(scenario, workers=1)
+    assert summary["status"] == "cancelled"
+    assert elapsed < 1.5
+    assert sorted(summary["result"]["key"]) == list(range(40))
@@ -0,0 +1,374 @@
+import math
+from functools import lru_cache
+from typing import List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from ngramas import ALPHABET_SIZE, QuadgramTable, encode_text
+
+# Busca de chaves de transposição por adjacência de colunas.
+#
+# Nos dois modos do artefato 2 a chave é a sequência de "unidades" do texto
+# cifrado que ocupam as posições 0..n-1 do texto claro:
+#   - colunar: a unidade s é o s-ésimo segmento lido do texto cifrado;
+#   - blocos:  a unidade j é a j-ésima letra de cada bloco completo.
+# Pontuar um par (a, b) como vizinhos (soma dos bigramas linha a linha) torna
+# o problema um caminho hamiltoniano de peso máximo, resolvido exatamente por
+# programação dinâmica sobre subconjuntos quando os segmentos têm tamanho fixo.
+
+def normalize_ciphertext(ciphertext: str) -> str:
+    return ciphertext.upper().replace(' ', '').replace('\n', '')
+
+
+def text_to_array(text: str) -> np.ndarray:
+    # um inteiro por caractere (UTF-32), para decifrar por indexação
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+def array_to_text(chars: np.ndarray) -> str:
+    return np.ascontiguousarray(chars, dtype=np.uint32).tobytes().decode("utf-32-le")
+
+
+def _as_key_matrix(keys) -> np.ndarray:
+    keys = np.asarray(keys)
+    return keys[None, :] if keys.ndim == 1 else keys
+
+
+@lru_cache(maxsize=64)
+def _columnar_layout(length: int, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # linha e coluna de cada posição do texto claro e tamanho de cada coluna
+    # (as `length % n` primeiras colunas têm uma linha a mais)
+    n_rows = math.ceil(length / n)
+    remainder = length % n
+    col_lengths = np.full(n, n_rows)
+    if remainder:
+        col_lengths[remainder:] = n_rows - 1
+    rows, cols = np.divmod(np.arange(length), n)
+    return rows, cols, col_lengths
+
+
+def columnar_permutations(length: int, keys) -> np.ndarray:
+    # perm[b] tal que texto_claro = texto_cifrado[perm[b]] para a chave keys[b]:
+    # a coluna c recebe o segmento de ordem rank(keys[b][c])
+    keys = _as_key_matrix(keys)
+    rows, cols, col_lengths = _columnar_layout(length, keys.shape[1])
+
+    # ordena de forma estável, como o sorted() de _columnar_decrypt
+    order = np.argsort(keys, axis=1, kind="stable")
+    read_lengths = col_lengths[order]
+    read_starts = np.cumsum(read_lengths, axis=1) - read_lengths
+    col_starts = np.empty_like(read_starts)
+    np.put_along_axis(col_starts, order, read_starts, axis=1)
+    return col_starts[:, cols] + rows
+
+
+def block_permutations(length: int, keys) -> np.ndarray:
+    # blocos completos são permutados; o bloco final incompleto fica como está
+    keys = _as_key_matrix(keys)
+    n = keys.shape[1]
+    full = (length // n) * n
+    perms = np.broadcast_to(np.arange(length), (keys.shape[0], length)).copy()
+    if full:
+        block_starts = np.arange(0, full, n)
+        perms[:, :full] = (block_starts[None, :, None] + keys[:, None, :]).reshape(keys.shape[0], full)
+    return perms
+
+
+def transposition_permutations(mode: str, length: int, keys) -> np.ndarray:
+    if mode == "columnar":
+        return columnar_permutations(length, keys)
+    if mode == "block":
+        return block_permutations(length, keys)
+    raise ValueError(f"Modo desconhecido: {mode}")
+
+
+def transposition_encrypt(plaintext: str, key: List[int], mode: str) -> str:
+    # inverso das decifrações do artefato 2: espalha o texto claro pelas
+    # posições que a permutação lê
+    chars = text_to_array(normalize_ciphertext(plaintext))
+    perm = transposition_permutations(mode, len(chars), key)[0]
+    cipher = np.empty_like(chars)
+    cipher[perm] = chars
+    return array_to_text(cipher)
+
+
+EXACT_MAX_LENGTH = 16
+# no colunar irregular, quantos conjuntos de colunas longas (vindos do beam)
+# são resolvidos exatamente
+RAGGED_LONG_SETS = 4
+
+
+def _popcounts(n: int) -> np.ndarray:
+    masks = np.arange(1 << n, dtype=np.int64)
+    counts = np.zeros(1 << n, dtype=np.int8)
+    for bit in range(n):
+        counts += ((masks >> bit) & 1).astype(np.int8)
+    return counts
+
+
+def held_karp_paths(adjacency: np.ndarray, first: Optional[Set[int]] = None) -> List[List[int]]:
+    # Caminho de adjacência máxima terminando em cada vértice (n caminhos).
+    # Com `first`, só são aceitos caminhos que visitam esses vértices antes
+    # de todos os outros.
+    n = adjacency.shape[0]
+    if n == 1:
+        return [[0]]
+
+    full = (1 << n) - 1
+    dp = np.full((1 << n, n), -np.inf)
+    parent = np.full((1 << n, n), -1, dtype=np.int8)
+    in_first = [first is None or v in first for v in range(n)]
+    n_first = len(first) if first else 0
+    for v in range(n):
+        if in_first[v] or n_first == 0:
+            dp[1 << v, v] = 0.0
+
+    popcount = _popcounts(n)
+    for k in range(1, n):
+        masks = np.flatnonzero(popcount == k)
+        # vals[m, v, w]: caminho em `masks[m]` terminando em v, estendido até w
+        vals = dp[masks][:, :, None] + adjacency[None, :, :]
+        best_v = vals.argmax(axis=1)
+        best = np.take_along_axis(vals, best_v[:, None, :], axis=1)[:, 0, :]
+        for w in range(n):
+            if first is not None and n_first and in_first[w] != (k < n_first):
+                continue
+            free = ((masks >> w) & 1) == 0
+            targets = masks[free] | (1 << w)
+            dp[targets, w] = best[free, w]
+            parent[targets, w] = best_v[free, w]
+
+    paths = []
+    for end in np.argsort(-dp[full]):
+        if not np.isfinite(dp[full, end]):
+            break
+        path = [int(end)]
+        mask, v = full, int(end)
+        while parent[mask, v] >= 0:
+            prev = int(parent[mask, v])
+            mask ^= 1 << v
+            v = prev
+            path.append(v)
+        paths.append(path[::-1])
+    return paths
+
+
+class TranspositionKeySearch:
+    def __init__(self, table: QuadgramTable, ciphertext: str, key_length: int, mode: str):
+        if mode not in ("columnar", "block"):
+            raise ValueError(f"Modo desconhecido: {mode}")
+        self.n = key_length
+        self.mode = mode
+
+        codes = encode_text(ciphertext)
+        # bigramas com uma linha/coluna extra para caracteres que não são letras
+        bigrams = np.full((ALPHABET_SIZE + 1, ALPHABET_SIZE + 1), table.floor)
+        bigrams[:ALPHABET_SIZE, :ALPHABET_SIZE] = table.bigram_log_probs()
+        self.bigrams = bigrams
+        self.codes = np.minimum(codes, ALPHABET_SIZE).astype(np.intp)
+
+        length = len(self.codes)
+        self.n_rows = math.ceil(length / key_length) if length else 0
+        self.remainder = length % key_length
+        self.ragged = mode == "columnar" and self.remainder != 0
+
+    def _unit_positions(self) -> np.ndarray:
+        # posições (n, linhas) de cada unidade, para layouts de tamanho fixo
+        n = self.n
+        if self.mode == "block":
+            n_blocks = len(self.codes) // n
+            return np.arange(n)[:, None] + n * np.arange(n_blocks)[None, :]
+        return np.arange(n)[:, None] * self.n_rows + np.arange(self.n_rows)[None, :]
+
+    def adjacency_matrix(self) -> np.ndarray:
+        units = self.codes[self._unit_positions()]
+        adjacency = self.bigrams[units[:, None, :], units[None, :, :]].sum(axis=2)
+        np.fill_diagonal(adjacency, -np.inf)
+        return adjacency
+
+    def ragged_adjacency(self, long_units: Set[int]) -> np.ndarray:
+        # adjacência exata para um conjunto conhecido de segmentos longos
+        n, rows = self.n, self.n_rows
+        is_long = np.array([s in long_units for s in range(n)])
+        offsets = np.arange(n) * (rows - 1) + np.cumsum(is_long) - is_long
+        units = self.codes[offsets[:, None] + np.arange(rows - 1)[None, :]]
+        adjacency = self.bigrams[units[:, None, :], units[None, :, :]].sum(axis=2)
+        # última linha: só existe entre colunas longas (as r primeiras)
+        last = self.codes[np.minimum(offsets + rows - 1, len(self.codes) - 1)]
+        both_long = is_long[:, None] & is_long[None, :]
+        adjacency += np.where(both_long, self.bigrams[last[:, None], last[None, :]], 0.0)
+        np.fill_diagonal(adjacency, -np.inf)
+        return adjacency
+
+    def _ragged_offsets(self, seqs: np.ndarray, placed: np.ndarray) -> np.ndarray:
+        # Início de cada segmento no texto cifrado, por estado do beam.
+        # Os segmentos longos são os das r primeiras colunas; enquanto o
+        # prefixo não cobre essas colunas, os longos ainda não colocados são
+        # estimados como distribuídos uniformemente entre as unidades livres.
+        n, r = self.n, self.remainder
+        n_states, k = seqs.shape
+        is_long = np.zeros((n_states, n))
+        long_cols = min(k, r)
+        if long_cols:
+            np.put_along_axis(is_long, seqs[:, :long_cols], 1.0, axis=1)
+        free = ~placed
+        n_free = free.sum(axis=1, keepdims=True)
+        missing = (r - long_cols) / np.maximum(n_free, 1)
+        expected = is_long + free * missing
+        before = np.cumsum(expected, axis=1) - expected
+        return np.arange(n)[None, :] * (self.n_rows - 1) + np.rint(before).astype(np.intp)
+
+    def _ragged_pair_scores(self, offsets: np.ndarray, last: np.ndarray) -> np.ndarray:
+        # score de colocar cada unidade logo após `last`, linhas 0..R-2
+        rows = np.arange(self.n_rows - 1)
+        chars = self.codes[np.minimum(offsets[:, :, None] + rows, len(self.codes) - 1)]
+        last_chars = np.take_along_axis(chars, last[:, None, None], axis=1)
+        return self.bigrams[last_chars, chars].sum(axis=2)
+
+    def beam_search(self, width: int = 2000) -> List[List[int]]:
+        n = self.n
+        seqs = np.arange(n)[:, None]
+        placed = np.eye(n, dtype=bool)
+        scores = np.zeros(n)
+
+        for k in range(1, n):
+            offsets = self._ragged_offsets(seqs, placed)
+            if k == self.remainder and k > 1:
+                # os segmentos longos acabaram de ficar conhecidos: recalcula
+                # o prefixo com os deslocamentos exatos
+                scores = np.zeros(len(seqs))
+                for i in range(k - 1):
+                    pair = self._ragged_pair_scores(offsets, seqs[:, i])
+                    scores += np.take_along_axis(pair, seqs[:, i + 1:i + 2], axis=1)[:, 0]
+
+            pair = self._ragged_pair_scores(offsets, seqs[:, -1])
+            cand = np.where(placed, -np.inf, scores[:, None] + pair)
+            flat = cand.ravel()
+            keep = min(width, int(np.isfinite(flat).sum()))
+            top = np.argpartition(-flat, keep - 1)[:keep]
+            state, unit = np.divmod(top, n)
+
+            seqs = np.concatenate([seqs[state], unit[:, None]], axis=1)
+            placed = placed[state].copy()
+            placed[np.arange(len(unit)), unit] = True
+            scores = flat[top]
+
+        order = np.argsort(-scores)
+        return [seqs[i].tolist() for i in order]
+
+    def candidates(self, beam_width: int = 2000, limit: Optional[int] = None) -> List[List[int]]:
+        if self.n > EXACT_MAX_LENGTH and not self.ragged:
+            raise ValueError(f"Busca exata limitada a chaves de até {EXACT_MAX_LENGTH} posições.")
+        if self.ragged:
+            # o beam costuma acertar o conjunto de colunas longas mesmo quando
+            # erra a ordem; para os melhores conjuntos, resolve a ordem exatamente
+            beam_keys = self.beam_search(beam_width)
+            long_sets: List[Set[int]] = []
+            for key in beam_keys:
+                long_units = set(key[:self.remainder])
+                if long_units not in long_sets:
+                    long_sets.append(long_units)
+                if len(long_sets) == RAGGED_LONG_SETS:
+                    break
+            keys = []
+            if self.n <= EXACT_MAX_LENGTH:
+                for long_units in long_sets:
+                    keys.extend(held_karp_paths(self.ragged_adjacency(long_units), long_units))
+            keys.extend(beam_keys)
+        else:
+            keys = held_karp_paths(self.adjacency_matrix())
+        return keys[:limit] if limit is not None else keys
+
+
+def depth_candidates(
+    table: QuadgramTable,
+    ciphertexts: Sequence[str],
+    key_length: int,
+    mode: str,
+    limit: Optional[int] = None,
+    beam_width: int = 2000,
+) -> List[List[int]]:
+    # Candidatos para várias mensagens com a mesma chave. Nos layouts de
+    # tamanho fixo (blocos, colunar sem sobra) a adjacência de cada par de
+    # unidades é a soma das adjacências das mensagens, resolvida uma única vez;
+    # as mensagens de colunar irregular, cujas colunas longas dependem do
+    # tamanho, contribuem com os próprios candidatos.
+    searches = [
+        TranspositionKeySearch(table, ct, key_length, mode)
+        for ct in ciphertexts
+        if len(ct) >= key_length
+    ]
+    fixed = [s for s in searches if not s.ragged]
+    keys: List[List[int]] = []
+    if fixed:
+        keys.extend(held_karp_paths(sum(s.adjacency_matrix() for s in fixed))[:limit])
+    for search in searches:
+        if search.ragged:
+            keys.extend(search.candidates(beam_width=beam_width, limit=limit))
+    unique = list({tuple(k): k for k in keys}.values())
+    return unique if unique else [list(range(key_length))]
+
+
+def with_rotations(keys: Sequence[List[int]]) -> List[List[int]]:
+    # cada chave seguida das suas rotações, sem repetir: a adjacência não vê a
+    # junção entre a última e a primeira unidade, e uma rotação da chave
+    # certa pode ficar com o caminho de adjacência máxima
+    unique = {}
+    for key in keys:
+        for shift in range(len(key)):
+            rotated = list(key[shift:]) + list(key[:shift])
+            unique.setdefault(tuple(rotated), rotated)
+    return list(unique.values())
+
+
+def greedy_paths(adjacency: np.ndarray) -> List[List[int]]:
+    # um caminho por vértice inicial, sempre para o vizinho de maior adjacência
+    n = adjacency.shape[0]
+    paths = []
+    for start in range(n):
+        path, free = [start], np.ones(n, dtype=bool)
+        free[start] = False
+        while len(path) < n:
+            row = np.where(free, adjacency[path[-1]], -np.inf)
+            nxt = int(row.argmax())
+            path.append(nxt)
+            free[nxt] = False
+        paths.append(path)
+    return paths
+
+
+def long_key_seeds(
+    table: QuadgramTable,
+    ciphertexts: Sequence[str],
+    key_length: int,
+    mode: str,
+    beam_width: int = 2000,
+    limit: Optional[int] = None,
+) -> List[List[int]]:
+    # Chaves iniciais para as buscas de chaves longas, onde a programação
+    # dinâmica exata não cabe: caminhos gulosos na adjacência (somada entre as
+    # mensagens) nos layouts fixos e o beam nas mensagens de colunar irregular.
+    searches = [
+        TranspositionKeySearch(table, ct, key_length, mode)
+        for ct in ciphertexts
+        if len(ct) >= key_length
+    ]
+    fixed = [s for s in searches if not s.ragged]
+    keys: List[List[int]] = []
+    if fixed:
+        adjacency = sum(s.adjacency_matrix() for s in fixed)
+        paths = greedy_paths(adjacency)
+        # ordena pela adjacência total do caminho
+        paths.sort(key=lambda p: -sum(adjacency[a, b] for a, b in zip(p, p[1:])))
+        keys.extend(paths)
+    for search in searches:
+        if search.ragged:
+            keys.extend(search.beam_search(beam_width)[:key_length])
+    if not keys:
+        # mensagens mais curtas que a chave: sem adjacência entre colunas, a
+        # identidade serve de partida (as demais réplicas partem de chaves
+        # aleatórias)
+        keys.append(list(range(key_length)))
+    unique = list({tuple(k): k for k in keys}.values())
+    return unique[:limit] if limit is not None else unique
+
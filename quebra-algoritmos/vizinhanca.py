@@ -0,0 +1,181 @@
+import random
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from ngramas import swap_neighbours, swap_pairs
+from recozimento import AnnealingSchedule
+from retomada import Checkpoint
+from telemetria import Telemetry
+
+# Avaliação em lote da vizinhança de uma chave, comum à substituição (chave de
+# 26 letras, artefato1.substitution_key_scorer) e à transposição (permutação
+# das colunas, artefato2.transposition_key_scorer).
+#
+# Em vez de sortear uma troca e decifrar e pontuar uma chave por vez, cada
+# passo monta a matriz de chaves vizinhas por troca de duas posições, e
+# `score_keys(matriz) -> scores` decifra todas por indexação e pontua a matriz
+# inteira de uma vez na tabela densa. O custo do interpretador é dividido pelo
+# lote. A próxima chave sai de uma de duas regras:
+#
+# - hill_climb: a melhor das vizinhas, enquanto alguma melhora;
+# - anneal: vizinhas sorteadas (com reposição, como as trocas da cadeia de
+#   uma troca por vez) e a primeira aceita pelo critério de Metropolis vira
+#   a chave atual; as que vêm depois dela no lote são descartadas. É o mesmo
+#   passeio da cadeia de uma troca por vez, e o nível de temperatura conta as
+#   vizinhas examinadas até a aceita. O tamanho do lote segue o inverso da
+#   fração de passos aceitos no nível anterior: poucas vizinhas enquanto
+#   quase tudo é aceito (quente), a vizinhança toda perto de congelar, quando
+#   quase nada se descarta.
+#
+# O ganho vem do custo fixo por chave (laço Python, decifrar, chamar o
+# score): nas transposições ele domina e o lote é bem mais rápido; na
+# substituição de textos longos o custo é a própria consulta à tabela, e o
+# lote só empata com a cadeia de uma troca por vez (por isso é opcional em
+# artefato1.SimulatedAnnealingDecoder, `batch=True`).
+
+ScoreKeys = Callable[[np.ndarray], np.ndarray]
+# lote mínimo e passos aceitos esperados por lote no recozimento
+MIN_BATCH = 4
+BATCH_ACCEPTED = 1
+
+
+def hill_climb(
+    key: np.ndarray,
+    score_keys: ScoreKeys,
+    score: Optional[float] = None,
+    max_steps: Optional[int] = None,
+    neighbours: Callable[[np.ndarray], np.ndarray] = swap_neighbours,
+) -> Tuple[np.ndarray, float, int]:
+    # subida mais íngreme; devolve (chave, score, passos dados). `neighbours`
+    # monta a vizinhança (por padrão, as trocas de duas posições)
+    key = np.array(key)
+    if score is None:
+        score = float(score_keys(key[None])[0])
+    steps = 0
+    if len(key) < 2:
+        return key, score, steps
+    while max_steps is None or steps < max_steps:
+        candidates = neighbours(key)
+        scores = score_keys(candidates)
+        best = int(scores.argmax())
+        if scores[best] <= score:
+            break
+        key, score = candidates[best], float(scores[best])
+        steps += 1
+    return key, score, steps
+
+
+def metropolis_first(deltas: np.ndarray, uniforms: np.ndarray, temperature: float) -> Tuple[int, int]:
+    # critério de Metropolis aplicado às vizinhas na ordem dada: (índice da
+    # primeira aceita ou -1, pioras examinadas até ela)
+    worse = deltas <= 0
+    if temperature > 0:
+        accepted = ~worse | (uniforms < np.exp(np.minimum(deltas, 0.0) / temperature))
+    else:
+        accepted = ~worse
+    hits = np.flatnonzero(accepted)
+    if len(hits) == 0:
+        return -1, int(worse.sum())
+    first = int(hits[0])
+    return first, int(worse[:first + 1].sum())
+
+
+def anneal(
+    key: np.ndarray,
+    score_keys: ScoreKeys,
+    schedule: AnnealingSchedule,
+    rng: random.Random,
+    length: int = 1,
+    should_stop: Optional[Callable[[], bool]] = None,
+    telemetry: Optional[Telemetry] = None,
+    describe: Callable[[np.ndarray], object] = lambda key: key.tolist(),
+    checkpoint: Optional[Checkpoint] = None,
+    problem: str = "",
+) -> Tuple[np.ndarray, float]:
+    # recozimento com lotes de vizinhas; `length` é o tamanho do texto (alvo
+    # por letra do cronograma) e `describe` formata a melhor chave na
+    # telemetria. Com `checkpoint`, grava o estado entre níveis e, se o
+    # arquivo já existe (mesmo `problem`), continua dele (retomada.py)
+    generator = np.random.default_rng(rng.getrandbits(64))
+    key = np.array(key)
+    all_i, all_j = swap_pairs(len(key))
+    total = len(all_i)
+    current_score = float(score_keys(key[None])[0])
+    best_key, best_score = key.copy(), current_score
+    if total == 0:
+        return best_key, best_score
+
+    def snapshot() -> Dict:
+        return {
+            "key": key.tolist(),
+            "score": current_score,
+            "best_key": best_key.tolist(),
+            "best_score": best_score,
+            "schedule": schedule.state(),
+            "generator": generator.bit_generator.state,
+            "batch": batch,
+            "evaluated": evaluated,
+        }
+
+    resumed = checkpoint.load(problem) if checkpoint is not None else None
+    if resumed is None:
+        # a vizinhança inteira da chave inicial calibra a temperatura
+        schedule.calibrate((score_keys(swap_neighbours(key)) - current_score).tolist())
+        schedule.start(current_score, length)
+        batch = int(BATCH_ACCEPTED / schedule.initial_acceptance)
+        evaluated = 0
+    else:
+        key = np.array(resumed["key"], dtype=key.dtype)
+        current_score = resumed["score"]
+        best_key = np.array(resumed["best_key"], dtype=key.dtype)
+        best_score = resumed["best_score"]
+        schedule.restore(resumed["schedule"])
+        generator.bit_generator.state = resumed["generator"]
+        batch = resumed["batch"]
+        evaluated = resumed["evaluated"]
+    neighbour_time = score_time = 0.0
+
+    running = resumed is None or not resumed["done"]
+    while running:
+        examined = moves = 0
+        while examined < schedule.iterations_per_temp:
+            size = min(total, max(MIN_BATCH, batch), schedule.iterations_per_temp - examined)
+            started = time.perf_counter()
+            picked = generator.integers(total, size=size)
+            neighbours = swap_neighbours(key, (all_i[picked], all_j[picked]))
+            built = time.perf_counter()
+            scores = score_keys(neighbours)
+            neighbour_time += built - started
+            score_time += time.perf_counter() - built
+            evaluated += size
+
+            first, attempts = metropolis_first(scores - current_score, generator.random(size), schedule.temperature)
+            schedule.record(attempts, int(first >= 0 and scores[first] <= current_score))
+            if first < 0:
+                examined += size
+                continue
+            examined += first + 1
+            moves += 1
+            key, current_score = neighbours[first].copy(), float(scores[first])
+            if current_score > best_score:
+                best_key, best_score = key.copy(), current_score
+
+        if telemetry is not None:
+            telemetry.level(schedule, current_score, best_score, best_key=describe(best_key), evaluated=evaluated)
+        if not schedule.next_level(best_score):
+            break
+        batch = int(BATCH_ACCEPTED * examined / moves) if moves else total
+        if should_stop is not None and should_stop():
+            break
+        if checkpoint is not None:
+            checkpoint.maybe_save(problem, snapshot)
+
+    if checkpoint is not None:
+        # `done` só quando o cronograma parou; parada por should_stop continua depois
+        checkpoint.save(problem, snapshot(), done=schedule.stop_reason is not None)
+    if telemetry is not None:
+        telemetry.add_phase("neighbours", neighbour_time)
+        telemetry.add_phase("score", score_time)
+    return best_key, best_score